@@ -0,0 +1,65 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.bulk import BulkReport, BulkTranscriber, expand_inputs, read_manifest
+
+
+class Command(BaseCommand):
+    help = (
+        "Transcribe audio files, directories or a manifest into a JSONL file. "
+        "Re-running with the same --output skips files that already succeeded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "inputs",
+            nargs="*",
+            help="audio files or directories (searched recursively)",
+        )
+        parser.add_argument(
+            "--manifest", help="file listing one path per line, or JSONL with 'path'"
+        )
+        parser.add_argument(
+            "--output", required=True, help="JSONL results file (appended to)"
+        )
+        parser.add_argument("--align", action="store_true", help="word-level alignment")
+        parser.add_argument(
+            "--diarize", action="store_true", help="speaker diarization"
+        )
+        parser.add_argument(
+            "--readers", type=int, default=None, help="prefetch threads (BATCH_READERS)"
+        )
+
+    def handle(self, *args, **options):
+        inputs = list(options["inputs"])
+        if options["manifest"]:
+            try:
+                inputs.extend(read_manifest(options["manifest"]))
+            except (OSError, ValueError, KeyError) as exc:
+                raise CommandError(f"Could not read manifest: {exc}")
+        paths = expand_inputs(inputs)
+        if not paths:
+            raise CommandError(
+                "No audio files given; pass files, directories or --manifest."
+            )
+
+        def on_progress(report: BulkReport) -> None:
+            done = report.completed + report.skipped + report.failed
+            self.stderr.write(
+                f"\r{done}/{report.total} done ({report.skipped} skipped, "
+                f"{report.failed} failed), {report.audio_hours_per_hour:.1f} audio-h/h",
+                ending="",
+            )
+            sys.stderr.flush()
+
+        transcriber = BulkTranscriber(
+            options["output"],
+            align=options["align"],
+            perform_diarization=options["diarize"],
+            readers=options["readers"],
+        )
+        report = transcriber.run(paths, on_progress=on_progress)
+        self.stderr.write("")
+        self.stdout.write(json.dumps(report.to_dict()))
@@ -1,14 +1,27 @@
-from typing import Iterable
+import time
+from typing import Dict, Iterable, Optional, Union
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
+from django.http import HttpRequest, HttpResponseBase, JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 
+from api.services.admission import (
+    Ticket,
+    get_admission_controller,
+    summary_cost,
+    transcription_cost,
+)
+from api.services.metrics import begin_timings
+
+
 class SimpleCORSMiddleware(MiddlewareMixin):
-    '''A tiny CORS layer that mirrors the former FastAPI config.
+    """A tiny CORS layer that mirrors the former FastAPI config.
 
     - If BACKEND_CORS_ALLOW_ALL is true, allow '*'.
     - Otherwise, echo back only configured origins.
     - Always include typical method/header allowances.
-    '''
+    """
 
     def process_response(self, request, response):
         allow_all: bool = getattr(settings, "BACKEND_CORS_ALLOW_ALL", False)
@@ -28,3 +41,175 @@ class SimpleCORSMiddleware(MiddlewareMixin):
             "Authorization, Content-Type, X-Requested-With, Accept, Origin"
         )
         return response
+
+
+class AdmissionControlMiddleware:
+    """Global and per-client cost limits on the note endpoints.
+
+    POSTs to `/note/transcribe`, `/note/pipeline` and `/note/summarize[/multi]`
+    are charged a cost estimated from the body size (audio duration for
+    uploads, transcript length for summaries). Job and batch submissions
+    (`/note/transcribe/jobs`, `/note/transcribe/batch`) are charged the same
+    way while their uploads are received and spooled; the work they queue is
+    bounded by the job queue instead, and their short durations are kept out
+    of the Retry-After estimate. When the global
+    (ADMISSION_CAPACITY) or the client's (ADMISSION_CLIENT_CAPACITY) budget
+    is used up the request gets `429` with `Retry-After` straight away.
+    Everything else, health and readiness checks included, passes through
+    untouched. The budget is held until a streamed response has finished or
+    been closed.
+    Clients are told apart by ADMISSION_CLIENT_HEADER when set, else by
+    REMOTE_ADDR.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        prefix = settings.API_V1_STR.rstrip("/")
+        self.costs = {
+            f"{prefix}/note/transcribe": transcription_cost,
+            f"{prefix}/note/pipeline": transcription_cost,
+            f"{prefix}/note/summarize": summary_cost,
+            f"{prefix}/note/summarize/multi": summary_cost,
+            f"{prefix}/note/transcribe/jobs": transcription_cost,
+            f"{prefix}/note/transcribe/batch": transcription_cost,
+        }
+        # Endpoints that only enqueue work and return 202 right away.
+        self.enqueues = {
+            f"{prefix}/note/transcribe/jobs",
+            f"{prefix}/note/transcribe/batch",
+        }
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        admitted = self._admit(request)
+        if isinstance(admitted, HttpResponseBase):
+            return admitted
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            if admitted is not None:
+                admitted.release()
+            raise
+        return self._release_after(response, admitted)
+
+    async def __acall__(self, request):
+        admitted = self._admit(request)
+        if isinstance(admitted, HttpResponseBase):
+            return admitted
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            if admitted is not None:
+                admitted.release()
+            raise
+        return self._release_after(response, admitted)
+
+    def _admit(self, request: HttpRequest) -> Union[None, Ticket, HttpResponseBase]:
+        if not settings.ADMISSION_CONTROL or request.method != "POST":
+            return None
+        path = request.path_info.rstrip("/")
+        cost_of = self.costs.get(path)
+        if cost_of is None:
+            return None
+        try:
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            length = 0
+        ticket, reason, retry_after = get_admission_controller().acquire(
+            self._client(request), cost_of(length), observe=path not in self.enqueues
+        )
+        if ticket is not None:
+            return ticket
+        detail = (
+            "Too many requests from this client in progress."
+            if reason == "client"
+            else "Server is at capacity."
+        )
+        response = JsonResponse(
+            {"detail": f"{detail} Retry later.", "retry_after": retry_after}, status=429
+        )
+        response["Retry-After"] = str(retry_after)
+        return response
+
+    def _client(self, request: HttpRequest) -> str:
+        header = settings.ADMISSION_CLIENT_HEADER
+        if header:
+            value = request.headers.get(header)
+            if value:
+                return f"header:{value}"
+        return request.META.get("REMOTE_ADDR") or "unknown"
+
+    def _release_after(self, response, ticket: Optional[Ticket]):
+        if ticket is None:
+            return response
+        if not response.streaming:
+            ticket.release()
+            return response
+        wrap = _arelease_when_done if response.is_async else _release_when_done
+        response.streaming_content = wrap(response.streaming_content, ticket)
+        # A body that is never iterated (client gone before the first chunk)
+        # never reaches the generator's finally; the handler still closes it.
+        response._resource_closers.append(ticket.release)
+        return response
+
+
+async def _arelease_when_done(content, ticket: Ticket):
+    try:
+        async for chunk in content:
+            yield chunk
+    finally:
+        ticket.release()
+
+
+def _release_when_done(content, ticket: Ticket):
+    try:
+        yield from content
+    finally:
+        ticket.release()
+
+
+class ServerTimingMiddleware:
+    """Report the stages timed during a request in a `Server-Timing` header.
+
+    Starts a fresh stage-timing context per request (see
+    `api.services.metrics.stage`) and emits e.g.
+    `decode;dur=812.4, transcribe;dur=5120.0, total;dur=6011.2` in ms.
+    Streamed responses only include the stages finished before streaming.
+    Works for both the sync (DRF) and native async views.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        timings = begin_timings()
+        response = self.get_response(request)
+        return self._annotate(response, timings, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        timings = begin_timings()
+        response = await self.get_response(request)
+        return self._annotate(response, timings, started)
+
+    def _annotate(self, response, timings: Dict[str, float], started: float):
+        entries = [
+            f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()
+        ]
+        entries.append(f"total;dur={(time.perf_counter() - started) * 1000:.1f}")
+        response["Server-Timing"] = ", ".join(entries)
+        return response
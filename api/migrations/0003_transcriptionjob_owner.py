@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_transcriptionbatch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transcriptionjob",
+            name="owner",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+    ]
@@ -0,0 +1,99 @@
+import uuid
+
+from django.db import models
+
+
+class TranscriptionJob(models.Model):
+    """A queued transcription request processed by the background worker pool.
+
+    The row doubles as the queue entry: workers claim the oldest QUEUED job by
+    flipping its status, and the finished transcript is stored in `result`.
+    `owner` names the process (``host:pid``) that claimed a RUNNING job.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        RUNNING = "running"
+        SUCCEEDED = "succeeded"
+        FAILED = "failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.QUEUED, db_index=True
+    )
+    audio_path = models.CharField(max_length=1024)
+    align = models.BooleanField(default=False)
+    perform_diarization = models.BooleanField(default=False)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    owner = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("created_at",)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": str(self.id),
+            "status": self.status,
+            "align": self.align,
+            "perform_diarization": self.perform_diarization,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error or None,
+        }
+
+
+class TranscriptionBatch(models.Model):
+    """A bulk transcription run over many files, processed in the background.
+
+    Progress counters are updated as files finish; results are appended to the
+    JSONL file at `output_path`, which can be downloaded while the run is going.
+    `owner` names the process (``host:pid``) running it, as for jobs.
+    """
+
+    Status = TranscriptionJob.Status
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.QUEUED, db_index=True
+    )
+    inputs = models.JSONField(default=list)
+    output_path = models.CharField(max_length=1024)
+    align = models.BooleanField(default=False)
+    perform_diarization = models.BooleanField(default=False)
+    total = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    audio_seconds = models.FloatField(default=0.0)
+    audio_hours_per_hour = models.FloatField(default=0.0)
+    error = models.TextField(blank=True, default="")
+    owner = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("created_at",)
+
+    def to_dict(self) -> dict:
+        return {
+            "batch_id": str(self.id),
+            "status": self.status,
+            "align": self.align,
+            "perform_diarization": self.perform_diarization,
+            "total": self.total,
+            "completed": self.completed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "audio_seconds": round(self.audio_seconds, 1),
+            "audio_hours_per_hour": round(self.audio_hours_per_hour, 2),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error or None,
+        }
@@ -1,13 +1,22 @@
 from rest_framework import serializers
 
+
 class TranscriptionRequestSerializer(serializers.Serializer):
     # Flags that mirror the previous endpoint's query/form options.
     align = serializers.BooleanField(default=False)
     perform_diarization = serializers.BooleanField(default=False)
 
+
 class SummaryRequestSerializer(serializers.Serializer):
     # We accept an arbitrary transcript JSON object. The service will normalize it.
     transcript = serializers.JSONField()
 
+
+class MultiSummaryRequestSerializer(SummaryRequestSerializer):
+    # Several note formats produced from the same transcript in one request.
+    # Values are NoteFormat names, e.g. ["Text", "SOAP"]; the view validates them.
+    formats = serializers.ListField(child=serializers.CharField(), allow_empty=False)
+
+
 class SummaryResponseSerializer(serializers.Serializer):
     note = serializers.JSONField()
@@ -0,0 +1,166 @@
+# Admission control for the expensive note endpoints.
+# Each request is charged an estimated cost (audio duration or transcript
+# length, in units of one "typical" request) against a global and a
+# per-client budget. When either is exhausted the request is turned away
+# immediately with 429 + Retry-After instead of queueing behind the work
+# that exhausted it, so one client's burst of long uploads cannot starve
+# everyone else (or the health checks).
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+from api.services.metrics import REGISTRY
+
+REJECTED = REGISTRY.counter(
+    "notetaker_admission_rejected",
+    "Requests turned away with 429, by exhausted budget (global, client).",
+    labelnames=("reason",),
+)
+
+GLOBAL = "global"
+CLIENT = "client"
+
+
+class Ticket:
+    """An admitted request's share of the budget; release it exactly once.
+
+    With *observe* off, the request's duration is left out of the Retry-After
+    estimate (e.g. uploads that only enqueue work and return at once).
+    """
+
+    def __init__(
+        self,
+        controller: "AdmissionController",
+        client: str,
+        cost: float,
+        observe: bool = True,
+    ) -> None:
+        self.controller = controller
+        self.client = client
+        self.cost = cost
+        self.observe = observe
+        self.started = time.monotonic()
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.controller._release(self)
+
+
+class AdmissionController:
+    """Global and per-client cost budgets, shared by sync and async requests.
+
+    A request costing more than a whole budget is charged the full budget,
+    so it is still admitted once nothing else is running.
+    """
+
+    # Weight of the newest sample in the seconds-per-unit average.
+    ALPHA = 0.2
+
+    def __init__(
+        self, capacity: float, client_capacity: float, retry_after: int
+    ) -> None:
+        self.capacity = max(1.0, capacity)
+        self.client_capacity = max(1.0, min(client_capacity, self.capacity))
+        self.default_retry_after = max(1, retry_after)
+        self._in_use = 0.0
+        self._clients: Dict[str, float] = {}
+        self._seconds_per_unit: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def acquire(
+        self, client: str, cost: float, observe: bool = True
+    ) -> Tuple[Optional[Ticket], str, int]:
+        """Return ``(ticket, "", 0)``, or ``(None, reason, retry_after_seconds)``."""
+        with self._lock:
+            charged = min(cost, self.client_capacity)
+            used = self._clients.get(client, 0.0)
+            if used and used + charged > self.client_capacity:
+                reason, short = CLIENT, used + charged - self.client_capacity
+            elif self._in_use and self._in_use + charged > self.capacity:
+                reason, short = GLOBAL, self._in_use + charged - self.capacity
+            else:
+                self._in_use += charged
+                self._clients[client] = used + charged
+                return Ticket(self, client, charged, observe), "", 0
+            retry_after = self._retry_after(short)
+        REJECTED.labels(reason=reason).inc()
+        return None, reason, retry_after
+
+    def _retry_after(self, units: float) -> int:
+        # Caller holds the lock. Roughly how long it takes running work to
+        # free *units* of budget, from observed request durations.
+        if self._seconds_per_unit is None:
+            return self.default_retry_after
+        return int(min(300, max(1, math.ceil(self._seconds_per_unit * units))))
+
+    def _release(self, ticket: Ticket) -> None:
+        elapsed = time.monotonic() - ticket.started
+        with self._lock:
+            self._in_use = max(0.0, self._in_use - ticket.cost)
+            left = self._clients.get(ticket.client, 0.0) - ticket.cost
+            if left > 1e-9:
+                self._clients[ticket.client] = left
+            else:
+                self._clients.pop(ticket.client, None)
+            if not ticket.observe:
+                return
+            sample = elapsed / ticket.cost
+            previous = self._seconds_per_unit
+            self._seconds_per_unit = (
+                sample
+                if previous is None
+                else previous + self.ALPHA * (sample - previous)
+            )
+
+    @property
+    def in_use(self) -> float:
+        with self._lock:
+            return self._in_use
+
+
+def transcription_cost(content_length: int) -> float:
+    """Cost of an upload, from its size as a proxy for audio duration."""
+    seconds = content_length / max(1, settings.ADMISSION_AUDIO_BYTES_PER_SECOND)
+    return round(1.0 + seconds / max(1.0, settings.ADMISSION_AUDIO_SECONDS_PER_UNIT), 2)
+
+
+def summary_cost(content_length: int) -> float:
+    """Cost of a summarization request, from the size of the transcript JSON."""
+    return round(
+        1.0 + content_length / max(1, settings.ADMISSION_TRANSCRIPT_CHARS_PER_UNIT), 2
+    )
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide controller configured from settings."""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(
+                    settings.ADMISSION_CAPACITY,
+                    settings.ADMISSION_CLIENT_CAPACITY,
+                    settings.ADMISSION_RETRY_AFTER,
+                )
+    return _controller
+
+
+REGISTRY.gauge(
+    "notetaker_admission_in_use",
+    "Estimated cost units of the note requests currently admitted.",
+    fn=lambda: _controller.in_use if _controller is not None else 0,
+)
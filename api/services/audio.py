@@ -0,0 +1,298 @@
+# Audio ingest helpers: decode uploads with ffmpeg into 16 kHz mono float32 PCM.
+# Unlike whisperx.load_audio, decoding is streamed: the source is piped through
+# ffmpeg and PCM is yielded in fixed-size chunks, so callers that consume audio
+# window by window never hold the whole recording in memory.
+from __future__ import annotations
+
+import asyncio
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from numpy.typing import NDArray
+from django.core.files.uploadedfile import UploadedFile
+
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2  # ffmpeg emits signed 16-bit little-endian
+
+AudioSource = Union[str, UploadedFile]
+
+
+class AudioDecodeError(RuntimeError):
+    """Raised when ffmpeg cannot decode the given source."""
+
+
+def _ffmpeg_cmd(input_spec: str, input_args: Sequence[str] = ()) -> List[str]:
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-threads",
+        "0",
+        *input_args,
+        "-i",
+        input_spec,
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        str(SAMPLE_RATE),
+        "pipe:1",
+    ]
+
+
+def _drain(stream, errors: Deque[bytes]) -> None:
+    for line in stream:
+        errors.append(line)
+
+
+def _pump(stdin, feed: Iterable[bytes]) -> None:
+    try:
+        for block in feed:
+            stdin.write(block)
+    except (BrokenPipeError, ValueError):
+        pass  # ffmpeg exited early; its stderr explains why
+    finally:
+        try:
+            stdin.close()
+        except OSError:
+            pass
+
+
+def _read_pcm(stdout, chunk_samples: int) -> Iterator[NDArray[np.float32]]:
+    chunk_bytes = chunk_samples * BYTES_PER_SAMPLE
+    while True:
+        buf = stdout.read(chunk_bytes)
+        if not buf:
+            return
+        # read() on a pipe returns short only at EOF, but guard odd lengths.
+        usable = len(buf) - len(buf) % BYTES_PER_SAMPLE
+        pcm = np.frombuffer(buf[:usable], np.int16)
+        yield pcm.astype(np.float32) / 32768.0
+
+
+def _decode(
+    input_spec: str, feed: Optional[Iterable[bytes]], chunk_samples: int
+) -> Iterator[NDArray[np.float32]]:
+    proc = subprocess.Popen(
+        _ffmpeg_cmd(input_spec),
+        stdin=subprocess.PIPE if feed is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    errors: Deque[bytes] = deque(maxlen=20)
+    threads = [threading.Thread(target=_drain, args=(proc.stderr, errors), daemon=True)]
+    if feed is not None:
+        threads.append(
+            threading.Thread(target=_pump, args=(proc.stdin, feed), daemon=True)
+        )
+    for t in threads:
+        t.start()
+
+    try:
+        yield from _read_pcm(proc.stdout, chunk_samples)
+    finally:
+        proc.stdout.close()  # type: ignore[union-attr]
+        returncode = proc.wait()
+        for t in threads:
+            t.join(timeout=1.0)
+    if returncode != 0:
+        detail = b"".join(errors).decode("utf-8", "replace").strip()
+        raise AudioDecodeError(f"ffmpeg exited with {returncode}: {detail}")
+
+
+def iter_pcm(
+    source: AudioSource, chunk_seconds: float
+) -> Iterator[NDArray[np.float32]]:
+    """Yield *source* as consecutive float32 chunks of *chunk_seconds* each.
+
+    *source* is a filesystem path or a Django upload. Uploads Django already
+    spooled to disk are decoded from that file; in-memory uploads are piped to
+    ffmpeg's stdin. Containers that are not streamable from a pipe (e.g. m4a
+    with the index at the end) are retried from a named temporary file, which
+    is deleted once decoding finishes.
+    """
+    chunk_samples = max(1, int(chunk_seconds * SAMPLE_RATE))
+    if isinstance(source, str):
+        yield from _decode(source, None, chunk_samples)
+    elif hasattr(source, "temporary_file_path"):
+        yield from _decode(source.temporary_file_path(), None, chunk_samples)
+    else:
+        yield from _decode_in_memory(source, chunk_samples)
+
+
+def _decode_in_memory(
+    upload: UploadedFile, chunk_samples: int
+) -> Iterator[NDArray[np.float32]]:
+    produced = False
+    try:
+        upload.seek(0)
+        for chunk in _decode("pipe:0", upload.chunks(), chunk_samples):
+            produced = True
+            yield chunk
+    except AudioDecodeError:
+        if produced:
+            raise
+        upload.seek(0)
+        with tempfile.NamedTemporaryFile() as fh:
+            for block in upload.chunks():
+                fh.write(block)
+            fh.flush()
+            yield from _decode(fh.name, None, chunk_samples)
+
+
+def load_pcm(source: AudioSource, chunk_seconds: float = 30.0) -> NDArray[np.float32]:
+    """Decode all of *source* into a single array (needed for align/diarize)."""
+    chunks = list(iter_pcm(source, chunk_seconds))
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks)
+
+
+class StreamDecoder:
+    """Incrementally decode a live byte stream with one long-running ffmpeg.
+
+    Bytes passed to :meth:`write` are piped to ffmpeg; a reader task collects
+    the decoded PCM, which :meth:`take` hands out. *input_args* describe the
+    input (e.g. ``-f s16le -ar 48000 -ac 1`` for raw PCM); by default the
+    container (WebM or Ogg Opus, as sent by browsers) is probed, with probing
+    kept short so the first audio comes out promptly.
+    """
+
+    LIVE_INPUT_ARGS = (
+        "-fflags",
+        "nobuffer",
+        "-probesize",
+        "32768",
+        "-analyzeduration",
+        "0",
+    )
+
+    def __init__(self, input_args: Sequence[str] = ()) -> None:
+        self.input_args = [*self.LIVE_INPUT_ARGS, *input_args]
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional["asyncio.Task[None]"] = None
+        self._chunks: List[NDArray[np.float32]] = []
+        self._carry = b""
+
+    async def start(self) -> None:
+        self._proc = await asyncio.create_subprocess_exec(
+            *_ffmpeg_cmd("pipe:0", self.input_args),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        assert self._proc is not None and self._proc.stdout is not None
+        while True:
+            buf = await self._proc.stdout.read(65536)
+            if not buf:
+                break
+            buf = self._carry + buf
+            usable = len(buf) - len(buf) % BYTES_PER_SAMPLE
+            self._carry = buf[usable:]
+            pcm = np.frombuffer(buf[:usable], np.int16)
+            self._chunks.append(pcm.astype(np.float32) / 32768.0)
+
+    async def write(self, data: bytes) -> None:
+        assert self._proc is not None and self._proc.stdin is not None
+        try:
+            self._proc.stdin.write(data)
+            await self._proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as exc:
+            raise AudioDecodeError("ffmpeg stopped accepting input") from exc
+
+    def take(self) -> NDArray[np.float32]:
+        """Return (and forget) the PCM decoded so far."""
+        chunks, self._chunks = self._chunks, []
+        if not chunks:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(chunks)
+
+    async def close(self) -> NDArray[np.float32]:
+        """End the input, wait for ffmpeg to drain and return the remaining PCM."""
+        assert self._proc is not None and self._proc.stdin is not None
+        self._proc.stdin.close()
+        if self._reader is not None:
+            await self._reader
+        returncode = await self._proc.wait()
+        if returncode != 0:
+            raise AudioDecodeError(f"ffmpeg exited with {returncode}")
+        return self.take()
+
+    def kill(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._proc is not None and self._proc.returncode is None:
+            self._proc.kill()
+
+
+def pcm16_to_float(data: bytes) -> NDArray[np.float32]:
+    """Convert complete s16le samples in *data* to float32 in [-1, 1)."""
+    usable = len(data) - len(data) % BYTES_PER_SAMPLE
+    return np.frombuffer(data[:usable], np.int16).astype(np.float32) / 32768.0
+
+
+def frame_energy(audio: NDArray[np.float32], frame_ms: int = 30) -> NDArray[np.float32]:
+    """RMS energy of consecutive *frame_ms* frames of *audio*.
+
+    A trailing partial frame is ignored.
+    """
+    frame = max(1, SAMPLE_RATE * frame_ms // 1000)
+    n_frames = len(audio) // frame
+    frames = audio[: n_frames * frame].reshape(n_frames, frame)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def find_quiet_point(audio: NDArray[np.float32], frame_ms: int = 30) -> int:
+    """Return the sample index at the centre of the quietest frame in *audio*.
+
+    Used to cut windows at low-energy points instead of in the middle of a word.
+    """
+    frame = max(1, SAMPLE_RATE * frame_ms // 1000)
+    energy = frame_energy(audio, frame_ms)
+    if len(energy) == 0:
+        return len(audio)
+    return int(np.argmin(energy)) * frame + frame // 2
+
+
+def iter_windows(
+    chunks: Iterable[NDArray[np.float32]],
+    window_seconds: float,
+    search_seconds: float = 2.0,
+) -> Iterator[Tuple[float, NDArray[np.float32]]]:
+    """Regroup decoded *chunks* into ``(offset_seconds, window)`` pairs.
+
+    Each window is about *window_seconds* long and ends at the quietest point
+    within its last *search_seconds*; the remainder is carried into the next
+    window. At most one window plus one chunk is buffered at a time.
+    """
+    window = int(window_seconds * SAMPLE_RATE)
+    search = min(window, int(search_seconds * SAMPLE_RATE))
+    pending: List[NDArray[np.float32]] = []
+    pending_len = 0
+    offset = 0
+
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_len += len(chunk)
+        while pending_len >= window:
+            buf = np.concatenate(pending)
+            cut = window - search + find_quiet_point(buf[window - search : window])
+            yield offset / SAMPLE_RATE, buf[:cut]
+            offset += cut
+            rest = buf[cut:].copy()  # don't pin the concatenated buffer
+            pending = [rest] if len(rest) else []
+            pending_len = len(rest)
+
+    if pending_len:
+        yield offset / SAMPLE_RATE, np.concatenate(pending)
@@ -0,0 +1,226 @@
+# Cross-request micro-batching for Whisper inference.
+# whisperx batches the VAD segments of a single call, so under concurrent load
+# short clips from different requests each run as small, mostly empty batches.
+# The scheduler splits every request into VAD segments in the calling thread,
+# queues the segments' log-mel features, and a single dispatcher thread runs
+# whatever has accumulated within WHISPER_BATCH_WAIT_MS (up to
+# WHISPER_BATCH_SIZE segments of one language) as one CTranslate2 batch,
+# handing each result back to the request it came from.
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+from django.conf import settings
+
+from api.services.audio import SAMPLE_RATE
+from api.services.metrics import REGISTRY
+from api.services.registry import get_registry, get_whisper_model, whisper_key
+
+# Longest merged VAD segment, as in whisperx' own transcribe.
+CHUNK_SECONDS = 30
+
+BATCH_OCCUPANCY = REGISTRY.histogram(
+    "notetaker_whisper_batch_occupancy_ratio",
+    "Segments per Whisper batch divided by WHISPER_BATCH_SIZE.",
+    buckets=(0.125, 0.25, 0.375, 0.5, 0.625, 0.75, 0.875, 1.0),
+)
+BATCH_QUEUE_DELAY = REGISTRY.histogram(
+    "notetaker_whisper_batch_queue_seconds",
+    "Time a VAD segment waited in the batching queue before inference started.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+@dataclass
+class _Segment:
+    features: NDArray[np.float32]
+    language: str
+    future: "Future[str]" = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class BatchScheduler:
+    """Coalesce VAD segments from concurrent :meth:`transcribe` calls.
+
+    :meth:`transcribe` is a drop-in for the whisperx pipeline's
+    ``transcribe(audio, language=...)`` and returns the same
+    ``{"segments", "language"}`` result. Segments of different languages are
+    never mixed, since the tokenizer fixes the language of a batch.
+    """
+
+    def __init__(self, max_batch: int, max_wait: float) -> None:
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self.model_key = whisper_key()
+        self._queue: Deque[_Segment] = deque()
+        self._cond = threading.Condition()
+        self._vad_lock = threading.Lock()
+        self._tokenizers: Dict[str, Any] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------
+    # Request side
+    # ------------------------------------------------------------
+    def transcribe(
+        self, audio: NDArray[np.float32], language: Optional[str] = None
+    ) -> dict:
+        model = get_whisper_model()
+        if language is None:
+            with get_registry().lock(self.model_key):
+                language = model.detect_language(audio)
+        vad_segments = self._vad(model, audio)
+        queued = []
+        for seg in vad_segments:
+            clip = audio[
+                int(seg["start"] * SAMPLE_RATE) : int(seg["end"] * SAMPLE_RATE)
+            ]
+            features = model.preprocess({"inputs": clip})["inputs"]
+            queued.append((seg, self._submit(_Segment(features, language))))
+        segments = [
+            {
+                "text": future.result(),
+                "start": round(seg["start"], 3),
+                "end": round(seg["end"], 3),
+            }
+            for seg, future in queued
+        ]
+        return {"segments": segments, "language": language}
+
+    def _vad(self, model: Any, audio: NDArray[np.float32]) -> List[dict]:
+        import torch
+        from whisperx.vad import merge_chunks
+
+        with self._vad_lock:
+            scores = model.vad_model(
+                {
+                    "waveform": torch.from_numpy(audio).unsqueeze(0),
+                    "sample_rate": SAMPLE_RATE,
+                }
+            )
+        return merge_chunks(
+            scores,
+            CHUNK_SECONDS,
+            onset=model._vad_params["vad_onset"],
+            offset=model._vad_params["vad_offset"],
+        )
+
+    def _submit(self, item: _Segment) -> "Future[str]":
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._dispatch_loop, name="whisper-batcher", daemon=True
+                )
+                self._thread.start()
+            self._queue.append(item)
+            self._cond.notify()
+        return item.future
+
+    # ------------------------------------------------------------
+    # Dispatcher
+    # ------------------------------------------------------------
+    def _dispatch_loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                self._run(batch)
+            except Exception as exc:  # pragma: no cover
+                for item in batch:
+                    item.future.set_exception(exc)
+
+    def _next_batch(self) -> List[_Segment]:
+        """Wait for work, then for up to max_wait past the oldest segment or
+        until a full batch of its language is queued."""
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            language = self._queue[0].language
+            deadline = self._queue[0].enqueued_at + self.max_wait
+            while self._count(language) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch: List[_Segment] = []
+            rest: Deque[_Segment] = deque()
+            for item in self._queue:
+                if item.language == language and len(batch) < self.max_batch:
+                    batch.append(item)
+                else:
+                    rest.append(item)
+            self._queue = rest
+            return batch
+
+    def _count(self, language: str) -> int:
+        return sum(1 for item in self._queue if item.language == language)
+
+    def _run(self, batch: List[_Segment]) -> None:
+        started = time.monotonic()
+        for item in batch:
+            BATCH_QUEUE_DELAY.observe(started - item.enqueued_at)
+        BATCH_OCCUPANCY.observe(len(batch) / self.max_batch)
+
+        model = get_whisper_model()
+        features = np.stack([item.features for item in batch])
+        with get_registry().lock(self.model_key):
+            texts = model.model.generate_segment_batched(
+                features, self._tokenizer(model, batch[0].language), model.options
+            )
+        for item, text in zip(batch, texts):
+            item.future.set_result(text)
+
+    def _tokenizer(self, model: Any, language: str) -> Any:
+        # Built per language instead of mutating the pipeline's shared tokenizer.
+        tokenizer = self._tokenizers.get(language)
+        if tokenizer is None:
+            from faster_whisper.tokenizer import Tokenizer
+
+            tokenizer = self._tokenizers[language] = Tokenizer(
+                model.model.hf_tokenizer,
+                model.model.model.is_multilingual,
+                task="transcribe",
+                language=language,
+            )
+        return tokenizer
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._queue)
+        return {
+            "max_batch": self.max_batch,
+            "wait_ms": round(self.max_wait * 1000, 1),
+            "pending": pending,
+            "occupancy": BATCH_OCCUPANCY.snapshot(),
+            "queue_seconds": BATCH_QUEUE_DELAY.snapshot(),
+        }
+
+
+_scheduler: Optional[BatchScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_batch_scheduler() -> Optional[BatchScheduler]:
+    """Return the shared scheduler, or None unless WHISPER_DYNAMIC_BATCHING is on."""
+    global _scheduler
+    if not settings.WHISPER_DYNAMIC_BATCHING:
+        return None
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = BatchScheduler(
+                    settings.WHISPER_BATCH_SIZE, settings.WHISPER_BATCH_WAIT_MS / 1000
+                )
+    return _scheduler
+
+
+REGISTRY.gauge(
+    "notetaker_whisper_batch_queue_depth",
+    "VAD segments waiting for a Whisper batch.",
+    fn=lambda: _scheduler.stats()["pending"] if _scheduler is not None else 0,
+)
@@ -0,0 +1,356 @@
+# Bulk transcription of archived recordings.
+# Models are loaded once per run; a small pool of reader threads hashes the
+# next few files (and checks the transcript cache) while Whisper works on the
+# current one, and every finished file is appended to a JSONL output right
+# away. Plain transcription streams each file through the windowed decoder;
+# runs with alignment or diarization need whole waveforms, so readers decode
+# ahead too, within BATCH_PREFETCH_SECONDS of audio. Re-running with the same
+# output skips files whose content hash already has a successful line, so an
+# interrupted backfill resumes where it stopped.
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import numpy as np
+from numpy.typing import NDArray
+from django.conf import settings
+
+from api.services.audio import SAMPLE_RATE, iter_pcm, load_pcm
+from api.services.metrics import record_cache, stage
+from api.services.preprocess import Route
+from api.services.serialization import dumps, loads
+from api.services.transcription import (
+    TranscriptionService,
+    content_hash,
+    get_transcript_cache,
+    transcript_cache_key,
+)
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a", ".flac", ".ogg", ".opus", ".webm", ".mp4")
+
+
+def expand_inputs(items: Iterable[str]) -> List[str]:
+    """Resolve files and directories (searched recursively for audio) into
+    a list of file paths, preserving order and dropping duplicates."""
+    paths: List[str] = []
+    for item in items:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                paths.extend(
+                    os.path.join(root, name)
+                    for name in sorted(files)
+                    if name.lower().endswith(AUDIO_EXTENSIONS)
+                )
+        else:
+            paths.append(item)
+    return list(dict.fromkeys(paths))
+
+
+def read_manifest(path: str) -> List[str]:
+    """Read a manifest: one path per line, or JSONL objects with a ``path`` key.
+
+    Relative paths are resolved against the manifest's directory; blank lines
+    and ``#`` comments are ignored.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    paths = []
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                line = json.loads(line)["path"]
+            paths.append(os.path.join(base, line))
+    return paths
+
+
+@dataclass
+class BulkReport:
+    total: int = 0
+    completed: int = 0
+    skipped: int = 0
+    failed: int = 0
+    # Audio actually run through the models; cache hits are not counted.
+    audio_seconds: float = 0.0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def wall_seconds(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def audio_hours_per_hour(self) -> float:
+        wall = self.wall_seconds
+        return self.audio_seconds / wall if wall > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "audio_seconds": round(self.audio_seconds, 1),
+            "wall_seconds": round(self.wall_seconds, 1),
+            "audio_hours_per_hour": round(self.audio_hours_per_hour, 2),
+        }
+
+
+@dataclass
+class _Prefetched:
+    index: int
+    path: str
+    digest: Optional[str] = None
+    audio: Optional[NDArray[np.float32]] = None
+    cached: Optional[dict] = None
+    skipped: bool = False
+    error: Optional[str] = None
+
+
+class _DecodeBudget:
+    """Seconds of decoded audio readers may hold ahead of the transcriber.
+
+    A reader waits before decoding while the budget is used up, except for
+    the file the transcriber needs next, so the run can never stall. Held
+    audio therefore stays within the budget plus the files being decoded.
+    """
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self._held = 0.0
+        self._next = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def acquire(self, index: int) -> None:
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._held < self.seconds or index <= self._next or self._closed
+            )
+
+    def add(self, seconds: float) -> None:
+        with self._cond:
+            self._held += seconds
+
+    def release(self, seconds: float, next_index: int) -> None:
+        with self._cond:
+            self._held -= seconds
+            self._next = next_index
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """Let waiting readers through so the pool can shut down."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class BulkTranscriber:
+    """Transcribe many files into the JSONL file *output_path*.
+
+    Each output line is ``{"path", "sha256", "status": "ok", "audio_seconds",
+    "cache", "transcript"}`` or ``{"path", "sha256", "status": "error",
+    "error"}``. Failed files are retried on the next run. Readers work at
+    most ``2 * readers`` files ahead; decoded audio held for alignment or
+    diarization is further limited to BATCH_PREFETCH_SECONDS.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        align: bool = False,
+        perform_diarization: bool = False,
+        readers: Optional[int] = None,
+    ) -> None:
+        self.output_path = output_path
+        self.align = align
+        self.perform_diarization = perform_diarization
+        self.readers = max(1, readers or settings.BATCH_READERS)
+        # Plain transcription decodes each file as it is transcribed.
+        self.streaming = not (align or perform_diarization)
+
+    def done_hashes(self) -> Set[str]:
+        """Content hashes that already have a successful line in the output."""
+        done: Set[str] = set()
+        try:
+            with open(self.output_path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        entry = loads(line)
+                    except ValueError:
+                        continue  # a line cut short by an interrupted run
+                    if entry.get("status") == "ok" and entry.get("sha256"):
+                        done.add(entry["sha256"])
+        except FileNotFoundError:
+            pass
+        return done
+
+    def run(
+        self,
+        paths: List[str],
+        on_progress: Optional[Callable[[BulkReport], None]] = None,
+    ) -> BulkReport:
+        svc = TranscriptionService()  # loads the models once for the whole run
+        done = self.done_hashes()
+        report = BulkReport(total=len(paths))
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+
+        remaining = iter(enumerate(paths))
+        in_flight: Deque["Future[_Prefetched]"] = deque()
+        budget = _DecodeBudget(settings.BATCH_PREFETCH_SECONDS)
+        with open(self.output_path, "ab") as out, ThreadPoolExecutor(
+            max_workers=self.readers, thread_name_prefix="bulk-reader"
+        ) as pool:
+
+            def prefetch() -> None:
+                while len(in_flight) < 2 * self.readers:
+                    index, path = next(remaining, (0, None))
+                    if path is None:
+                        return
+                    item = _Prefetched(index, path)
+                    in_flight.append(pool.submit(self._read, item, done, budget))
+
+            try:
+                prefetch()
+                while in_flight:
+                    item = in_flight.popleft().result()
+                    prefetch()
+                    self._complete(svc, item, report, done, budget, out)
+                    if on_progress is not None:
+                        on_progress(report)
+            finally:
+                for future in in_flight:
+                    future.cancel()
+                budget.close()
+        return report
+
+    def _complete(
+        self,
+        svc: TranscriptionService,
+        item: _Prefetched,
+        report: BulkReport,
+        done: Set[str],
+        budget: _DecodeBudget,
+        out: BinaryIO,
+    ) -> None:
+        """Transcribe one prefetched file, free its audio and write its line."""
+        entry = self._process(svc, item, report)
+        held = len(item.audio) / SAMPLE_RATE if item.audio is not None else 0.0
+        item.audio = None
+        budget.release(held, item.index + 1)
+        if entry is None:
+            return
+        if item.digest and entry["status"] == "ok":
+            done.add(item.digest)  # duplicates later in this run
+        out.write(dumps(entry) + b"\n")
+        out.flush()
+
+    def _read(
+        self, item: _Prefetched, done: Set[str], budget: _DecodeBudget
+    ) -> _Prefetched:
+        path = item.path
+        try:
+            item.digest = content_hash(path)
+            if item.digest in done:
+                item.skipped = True
+                return item
+            cache = get_transcript_cache()
+            if cache is not None:
+                key = transcript_cache_key(
+                    item.digest, self.align, self.perform_diarization
+                )
+                item.cached = cache.get(key)
+                if item.cached is not None:
+                    return item
+            if self.streaming:
+                return item
+            budget.acquire(item.index)
+            with stage("decode"):
+                item.audio = load_pcm(path)
+            budget.add(len(item.audio) / SAMPLE_RATE)
+        except Exception as exc:
+            item.error = f"Could not read audio: {exc}"
+        return item
+
+    def _process(
+        self, svc: TranscriptionService, item: _Prefetched, report: BulkReport
+    ) -> Optional[Dict[str, Any]]:
+        if item.skipped:
+            report.skipped += 1
+            return None
+        entry: Dict[str, Any] = {"path": item.path, "sha256": item.digest}
+        if item.error is not None:
+            report.failed += 1
+            return {**entry, "status": "error", "error": item.error}
+        if item.cached is not None:
+            record_cache("transcript", "hit")
+            report.completed += 1
+            return {**entry, "status": "ok", "cache": "hit", "transcript": item.cached}
+
+        try:
+            result, seconds, route = self._transcribe(svc, item)
+        except Exception as exc:
+            report.failed += 1
+            return {**entry, "status": "error", "error": f"Transcription failed: {exc}"}
+        report.completed += 1
+        report.audio_seconds += seconds
+        return {
+            **entry,
+            "status": "ok",
+            "audio_seconds": round(seconds, 2),
+            "cache": self._store(item, result, route),
+            "transcript": result,
+        }
+
+    def _store(self, item: _Prefetched, result: dict, route: Route) -> str:
+        """Cache a fresh default-model *result*; returns the cache status."""
+        cache = get_transcript_cache()
+        if cache is not None and item.digest:
+            record_cache("transcript", "miss")
+            if route.is_default:
+                key = transcript_cache_key(
+                    item.digest, self.align, self.perform_diarization
+                )
+                cache.set(key, result)
+        return "miss" if cache is not None else "off"
+
+    def _transcribe(
+        self, svc: TranscriptionService, item: _Prefetched
+    ) -> Tuple[dict, float, Route]:
+        # Returns (result, audio seconds, route used).
+        if item.audio is None:
+            route = svc.choose_route(item.path)
+            decoded = [0]
+
+            def chunks() -> Iterator[NDArray[np.float32]]:
+                for chunk in iter_pcm(item.path, settings.AUDIO_DECODE_CHUNK_SECONDS):
+                    decoded[0] += len(chunk)
+                    yield chunk
+
+            result = svc.transcribe_chunks(chunks(), route=route)
+            return result, decoded[0] / SAMPLE_RATE, route
+        route = svc.choose_route(item.audio)
+        result = svc.process_audio(
+            item.audio, self.align, self.perform_diarization, route=route
+        )
+        return result, len(item.audio) / SAMPLE_RATE, route
@@ -0,0 +1,183 @@
+# Small local caches for expensive results.
+# Entries are JSON documents stored under a content-derived key; the disk tier
+# keeps files under a byte budget, evicting the least recently used first, and
+# an optional in-memory tier with TTL sits in front of it.
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, List, Optional, Tuple
+
+from api.services.serialization import dumps, loads
+
+
+def make_key(*parts: Any) -> str:
+    """Hash *parts* (JSON-serializable) into a stable hex cache key."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def hash_chunks(chunks: Iterable[bytes]) -> str:
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """JSON values stored as files under *directory*, bounded by *max_bytes*.
+
+    Reads refresh a file's mtime, so eviction (oldest mtime first) is LRU.
+    Writes go through a temp file and ``os.replace`` so concurrent readers,
+    including other server processes, never see partial entries.
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max(0, max_bytes)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total = sum(size for _, _, size in self._entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                value = loads(fh.read())
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = dumps(value)
+        if self.max_bytes and len(data) > self.max_bytes:
+            return
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            self._total += len(data)
+            if self.max_bytes and self._total > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _entries(self) -> List[Tuple[str, float, int]]:
+        entries = []
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, st.st_mtime, st.st_size))
+        return entries
+
+    def _evict(self) -> None:
+        # Caller holds self._lock. Rescan so files written by other processes
+        # count too, then drop the stalest entries down to 90% of the budget.
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, _mtime, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total = total
+
+
+class MemoryCache:
+    """In-process LRU of at most *max_entries* values, each living *ttl* seconds.
+
+    A *ttl* of 0 disables expiry. Values are stored by reference, so callers
+    must not mutate what they put in or get out.
+    """
+
+    def __init__(self, max_entries: int, ttl: float = 0) -> None:
+        self.max_entries = max(0, max_entries)
+        self.ttl = max(0.0, ttl)
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if not self.max_entries:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else 0.0
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+class TieredCache:
+    """A :class:`MemoryCache` in front of an optional :class:`DiskCache`.
+
+    Disk entries are wrapped with their write time so the same *ttl* applies
+    across restarts; fresh disk hits are promoted to memory.
+    """
+
+    def __init__(
+        self, memory: MemoryCache, disk: Optional[DiskCache] = None, ttl: float = 0
+    ) -> None:
+        self.memory = memory
+        self.disk = disk
+        self.ttl = max(0.0, ttl)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        entry = self.disk.get(key)
+        if not isinstance(entry, dict) or "value" not in entry:
+            return None
+        if self.ttl and time.time() - entry.get("stored_at", 0) > self.ttl:
+            self.disk.delete(key)
+            return None
+        self.memory.set(key, entry["value"])
+        return entry["value"]
+
+    def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, {"stored_at": time.time(), "value": value})
@@ -0,0 +1,20 @@
+# Request options shared by the views and the summarization service.
+# Kept apart from summarization.py so parsing a request does not import the
+# LLM stack.
+from __future__ import annotations
+
+from enum import Enum
+
+
+class NoteFormat(str, Enum):
+    TEXT = "Text"
+    SOAP = "SOAP"
+    PKI_HL7_CDA = "PKI HL7 CDA"
+    THERAPY_ASSESSMENT = "Therapy Assessment"
+
+
+class SummaryMode(str, Enum):
+    # AUTO switches to HIERARCHICAL only when the transcript exceeds the budget.
+    AUTO = "auto"
+    SINGLE = "single"
+    HIERARCHICAL = "hierarchical"
@@ -0,0 +1,416 @@
+# Background transcription jobs backed by the local SQLite database.
+# POST handlers spool the upload to disk and insert a QUEUED row; a bounded pool
+# of worker threads claims rows in FIFO order and runs the full whisperx
+# pipeline. Because the queue lives in the database, jobs queued before a
+# restart are picked up again once the pool starts. Bulk batches (many files
+# per row) are run the same way by a separate single-thread runner.
+#
+# Several uvicorn worker processes may share the database. Each claimed row
+# records the claiming process (host and pid), and a starting process only
+# requeues RUNNING rows whose owner is no longer alive, so it never takes over
+# a job that a sibling process is still transcribing.
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import socket
+import threading
+import uuid
+from typing import List, Optional, Sequence
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import close_old_connections
+from django.utils import timezone
+
+from api.models import TranscriptionBatch, TranscriptionJob
+from api.services.bulk import BulkReport, BulkTranscriber
+from api.services.metrics import REGISTRY
+from api.services.transcription import TranscriptionService
+
+logger = logging.getLogger(__name__)
+
+
+def process_owner() -> str:
+    """Identify this process as ``host:pid`` for claimed queue rows."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def owner_alive(owner: str) -> bool:
+    """Whether the process that claimed a row may still be running.
+
+    Only processes on this host can be checked; rows claimed on another host
+    are assumed alive so they are never taken over from here.
+    """
+    host, _, pid = owner.rpartition(":")
+    if not host or not pid.isdigit():
+        return False
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the job queue is at capacity; callers should retry later."""
+
+
+class TranscriptionJobQueue:
+    """Bounded FIFO of transcription jobs drained by *workers* threads.
+
+    At most *max_pending* jobs (queued plus running) are accepted; beyond that
+    :meth:`submit` raises :class:`QueueFullError` so a burst of uploads is
+    turned away instead of piling up on the node.
+    """
+
+    def __init__(self, workers: int, max_pending: int, spool_dir: str) -> None:
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.spool_dir = spool_dir
+        self._wakeup = threading.Condition()
+        self._submit_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._started = False
+
+    # ------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------
+    def submit(
+        self,
+        upload: UploadedFile,
+        align: bool = False,
+        perform_diarization: bool = False,
+    ) -> TranscriptionJob:
+        self.start()
+        # Serialize the capacity check with the insert so concurrent uploads
+        # cannot both squeeze into the last slot.
+        with self._submit_lock:
+            if self.pending() >= self.max_pending:
+                raise QueueFullError("Transcription queue is full.")
+            job_id = uuid.uuid4()
+            path = self._spool(job_id, upload)
+            job = TranscriptionJob.objects.create(
+                id=job_id,
+                audio_path=path,
+                align=align,
+                perform_diarization=perform_diarization,
+            )
+        with self._wakeup:
+            self._wakeup.notify()
+        return job
+
+    def pending(self) -> int:
+        return TranscriptionJob.objects.filter(
+            status__in=(TranscriptionJob.Status.QUEUED, TranscriptionJob.Status.RUNNING)
+        ).count()
+
+    def _spool(self, job_id: uuid.UUID, upload: UploadedFile) -> str:
+        os.makedirs(self.spool_dir, exist_ok=True)
+        _, ext = os.path.splitext(upload.name or "")
+        path = os.path.join(self.spool_dir, f"{job_id}{ext}")
+        with open(path, "wb") as fh:
+            for chunk in upload.chunks():
+                fh.write(chunk)
+        return path
+
+    # ------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------
+    def start(self) -> None:
+        """Start the worker threads once per process (idempotent).
+
+        No database access happens here: this runs at ASGI import time, on
+        the event loop thread, where Django forbids ORM calls. The first
+        worker requeues orphaned jobs before it starts claiming.
+        """
+        with self._submit_lock:
+            if self._started:
+                return
+            self._started = True
+            for i in range(self.workers):
+                t = threading.Thread(
+                    target=self._worker_loop,
+                    args=(i == 0,),
+                    name=f"transcription-job-{i}",
+                    daemon=True,
+                )
+                t.start()
+                self._threads.append(t)
+
+    def _requeue_orphans(self) -> None:
+        """Retry jobs left RUNNING by a process that has since exited."""
+        try:
+            running = TranscriptionJob.objects.filter(
+                status=TranscriptionJob.Status.RUNNING
+            ).values_list("pk", "owner")
+            orphans = [pk for pk, owner in running if not owner_alive(owner)]
+            if orphans:
+                TranscriptionJob.objects.filter(
+                    pk__in=orphans, status=TranscriptionJob.Status.RUNNING
+                ).update(
+                    status=TranscriptionJob.Status.QUEUED, started_at=None, owner=""
+                )
+        except Exception:
+            logger.exception("Could not requeue orphaned transcription jobs")
+        finally:
+            close_old_connections()
+
+    def _worker_loop(self, requeue: bool = False) -> None:
+        if requeue:
+            self._requeue_orphans()
+        while True:
+            try:
+                job = self._claim_next()
+                if job is None:
+                    with self._wakeup:
+                        # Re-poll periodically in case a notify was missed.
+                        self._wakeup.wait(timeout=5.0)
+                    continue
+                self._run(job)
+            except Exception:
+                # Never let one bad job or a database hiccup end the worker.
+                logger.exception("Transcription job worker error")
+                with self._wakeup:
+                    self._wakeup.wait(timeout=5.0)
+            finally:
+                close_old_connections()
+
+    def _claim_next(self) -> Optional[TranscriptionJob]:
+        close_old_connections()
+        while True:
+            candidate = (
+                TranscriptionJob.objects.filter(status=TranscriptionJob.Status.QUEUED)
+                .order_by("created_at")
+                .first()
+            )
+            if candidate is None:
+                return None
+            # Conditional update: only one worker can win a given row.
+            claimed = TranscriptionJob.objects.filter(
+                pk=candidate.pk, status=TranscriptionJob.Status.QUEUED
+            ).update(
+                status=TranscriptionJob.Status.RUNNING,
+                started_at=timezone.now(),
+                owner=process_owner(),
+            )
+            if claimed:
+                candidate.refresh_from_db()
+                return candidate
+
+    def _run(self, job: TranscriptionJob) -> None:
+        try:
+            # Built inside the try: a failed model load must fail the job,
+            # not leave it RUNNING with the worker gone.
+            svc = TranscriptionService()
+            job.result, _ = svc.process_cached(
+                job.audio_path,
+                align=job.align,
+                perform_diarization=job.perform_diarization,
+            )
+            job.status = TranscriptionJob.Status.SUCCEEDED
+        except Exception as exc:
+            logger.exception("Transcription job %s failed", job.pk)
+            job.error = f"Transcription failed: {exc}"
+            job.status = TranscriptionJob.Status.FAILED
+        finally:
+            TranscriptionService.cleanup_file(job.audio_path)
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "result", "error", "finished_at"])
+
+
+class TranscriptionBatchRunner:
+    """Runs queued :class:`TranscriptionBatch` rows one at a time.
+
+    A single thread is enough: each batch already keeps Whisper busy with its
+    own prefetching readers. Batches are claimed like jobs, so with several
+    processes each batch runs once; batches whose process exited are
+    requeued and resume from their JSONL output, skipping files already done.
+    """
+
+    def __init__(self, output_dir: str) -> None:
+        self.output_dir = output_dir
+        self._wakeup = threading.Condition()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def submit(
+        self,
+        inputs: List[str],
+        uploads: Sequence[UploadedFile] = (),
+        align: bool = False,
+        perform_diarization: bool = False,
+    ) -> TranscriptionBatch:
+        """Queue a batch over server-side *inputs* plus spooled *uploads*."""
+        self.start()
+        batch_id = uuid.uuid4()
+        inputs = list(inputs)
+        for i, upload in enumerate(uploads):
+            inputs.append(self._spool(batch_id, i, upload))
+        batch = TranscriptionBatch.objects.create(
+            id=batch_id,
+            inputs=inputs,
+            output_path=os.path.join(self.output_dir, f"{batch_id}.jsonl"),
+            align=align,
+            perform_diarization=perform_diarization,
+            total=len(inputs),
+        )
+        with self._wakeup:
+            self._wakeup.notify()
+        return batch
+
+    def _spool(self, batch_id: uuid.UUID, index: int, upload: UploadedFile) -> str:
+        directory = self._upload_dir(batch_id)
+        os.makedirs(directory, exist_ok=True)
+        _, ext = os.path.splitext(upload.name or "")
+        path = os.path.join(directory, f"{index:05d}{ext}")
+        with open(path, "wb") as fh:
+            for chunk in upload.chunks():
+                fh.write(chunk)
+        return path
+
+    def _upload_dir(self, batch_id: uuid.UUID) -> str:
+        return os.path.join(self.output_dir, f"{batch_id}-uploads")
+
+    def start(self) -> None:
+        """Start the runner thread once per process (idempotent).
+
+        Like :meth:`TranscriptionJobQueue.start`, this touches no database
+        rows; the thread requeues orphaned batches before it starts claiming.
+        """
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            threading.Thread(
+                target=self._loop, name="transcription-batch", daemon=True
+            ).start()
+
+    def _requeue_orphans(self) -> None:
+        """Resume batches left RUNNING by a process that has since exited."""
+        try:
+            running = TranscriptionBatch.objects.filter(
+                status=TranscriptionBatch.Status.RUNNING
+            ).values_list("pk", "owner")
+            orphans = [pk for pk, owner in running if not owner_alive(owner)]
+            if orphans:
+                TranscriptionBatch.objects.filter(
+                    pk__in=orphans, status=TranscriptionBatch.Status.RUNNING
+                ).update(status=TranscriptionBatch.Status.QUEUED, owner="")
+        except Exception:
+            logger.exception("Could not requeue orphaned transcription batches")
+        finally:
+            close_old_connections()
+
+    def _loop(self) -> None:
+        self._requeue_orphans()
+        while True:
+            try:
+                batch = self._claim_next()
+                if batch is None:
+                    with self._wakeup:
+                        self._wakeup.wait(timeout=5.0)
+                    continue
+                self._run(batch)
+            except Exception:
+                logger.exception("Transcription batch runner error")
+                with self._wakeup:
+                    self._wakeup.wait(timeout=5.0)
+            finally:
+                close_old_connections()
+
+    def _claim_next(self) -> Optional[TranscriptionBatch]:
+        close_old_connections()
+        while True:
+            candidate = (
+                TranscriptionBatch.objects.filter(
+                    status=TranscriptionBatch.Status.QUEUED
+                )
+                .order_by("created_at")
+                .first()
+            )
+            if candidate is None:
+                return None
+            claimed = TranscriptionBatch.objects.filter(
+                pk=candidate.pk, status=TranscriptionBatch.Status.QUEUED
+            ).update(status=TranscriptionBatch.Status.RUNNING, owner=process_owner())
+            if claimed:
+                candidate.refresh_from_db()
+                return candidate
+
+    def _run(self, batch: TranscriptionBatch) -> None:
+        batch.started_at = batch.started_at or timezone.now()
+        batch.save(update_fields=["started_at"])
+        progress_fields = [
+            "completed",
+            "skipped",
+            "failed",
+            "audio_seconds",
+            "audio_hours_per_hour",
+        ]
+
+        def on_progress(report: BulkReport) -> None:
+            batch.completed, batch.skipped, batch.failed = (
+                report.completed,
+                report.skipped,
+                report.failed,
+            )
+            batch.audio_seconds = report.audio_seconds
+            batch.audio_hours_per_hour = report.audio_hours_per_hour
+            batch.save(update_fields=progress_fields)
+
+        runner = BulkTranscriber(
+            batch.output_path,
+            align=batch.align,
+            perform_diarization=batch.perform_diarization,
+        )
+        try:
+            runner.run(batch.inputs, on_progress=on_progress)
+            batch.status = TranscriptionBatch.Status.SUCCEEDED
+            # Uploaded copies are only needed to resume; results are in the JSONL.
+            shutil.rmtree(self._upload_dir(batch.id), ignore_errors=True)
+        except Exception as exc:
+            batch.error = f"Batch failed: {exc}"
+            batch.status = TranscriptionBatch.Status.FAILED
+        batch.finished_at = timezone.now()
+        batch.save(update_fields=["status", "error", "finished_at"])
+
+
+_queue: Optional[TranscriptionJobQueue] = None
+_batch_runner: Optional[TranscriptionBatchRunner] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> TranscriptionJobQueue:
+    """Return the process-wide job queue configured from settings."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = TranscriptionJobQueue(
+                    workers=settings.TRANSCRIPTION_JOB_WORKERS,
+                    max_pending=settings.TRANSCRIPTION_JOB_QUEUE_MAX,
+                    spool_dir=settings.TRANSCRIPTION_JOB_DIR,
+                )
+    return _queue
+
+
+def get_batch_runner() -> TranscriptionBatchRunner:
+    global _batch_runner
+    if _batch_runner is None:
+        with _queue_lock:
+            if _batch_runner is None:
+                _batch_runner = TranscriptionBatchRunner(settings.BATCH_OUTPUT_DIR)
+    return _batch_runner
+
+
+REGISTRY.gauge(
+    "notetaker_transcription_jobs_pending",
+    "Transcription jobs queued or running.",
+    fn=lambda: get_job_queue().pending(),
+)
@@ -0,0 +1,82 @@
+# Transcript layouts.
+# whisperx returns nested segments with a dict per word, and after alignment
+# the same words again under `word_segments`. For long recordings that is
+# millions of small dicts. The columnar layout stores each field once, as
+# parallel arrays, and is what clients can request with `layout=columnar`.
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+NESTED = "nested"
+COLUMNAR = "columnar"
+LAYOUTS = (NESTED, COLUMNAR)
+
+
+def is_columnar(transcript: Any) -> bool:
+    return isinstance(transcript, dict) and transcript.get("layout") == COLUMNAR
+
+
+def to_columnar(result: dict) -> Dict[str, Any]:
+    """Convert a whisperx result to the columnar layout::
+
+        {"layout": "columnar", "language": ...,
+         "segments": {"start": [...], "end": [...], "text": [...], "speaker": [...]},
+         "words": {"start": [...], "end": [...], "word": [...], "score": [...],
+                   "speaker": [...], "segment": [...]}}
+
+    ``words.segment`` is the index of the segment each word belongs to, so
+    ``word_segments`` is not repeated. ``speaker`` columns are present only
+    for diarized transcripts and ``words`` only for aligned ones; values a
+    model did not produce (e.g. timestamps of unalignable tokens) are null.
+    """
+    if is_columnar(result):
+        return result
+    segments = result.get("segments") or []
+    diarized = any("speaker" in seg for seg in segments)
+    aligned = any("words" in seg for seg in segments)
+
+    speaker = ["speaker"] if diarized else []
+    seg_cols = _empty_columns("start", "end", "text", *speaker)
+    word_cols = _empty_columns("start", "end", "word", "score", *speaker, "segment")
+    _fill_columns(segments, seg_cols, word_cols)
+
+    out: Dict[str, Any] = {"layout": COLUMNAR, "language": result.get("language")}
+    out["segments"] = seg_cols
+    if aligned:
+        out["words"] = word_cols
+    return out
+
+
+def _empty_columns(*names: str) -> Dict[str, List[Any]]:
+    return {name: [] for name in names}
+
+
+def _fill_columns(
+    segments: List[dict],
+    seg_cols: Dict[str, List[Any]],
+    word_cols: Dict[str, List[Any]],
+) -> None:
+    for index, seg in enumerate(segments):
+        for name, column in seg_cols.items():
+            column.append(seg.get(name))
+        for word in seg.get("words") or ():
+            for name, column in word_cols.items():
+                column.append(index if name == "segment" else word.get(name))
+
+
+def apply_layout(result: Any, layout: str) -> Any:
+    """Return *result* in *layout*; nested results pass through unchanged."""
+    if layout == COLUMNAR and isinstance(result, dict):
+        return to_columnar(result)
+    return result
+
+
+def segment_texts(transcript: Any) -> List[str]:
+    """Segment texts of a nested or columnar transcript (empty if neither)."""
+    if is_columnar(transcript):
+        return [
+            str(t or "") for t in (transcript.get("segments") or {}).get("text") or []
+        ]
+    if isinstance(transcript, dict) and isinstance(transcript.get("segments"), list):
+        return [str(seg.get("text", "")) for seg in transcript["segments"]]
+    return []
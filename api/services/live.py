@@ -0,0 +1,221 @@
+# Incremental transcription of a live audio stream.
+# Audio arrives in small frames and is kept in a fixed-size buffer. An energy
+# VAD tracks speech and trailing silence; the buffered utterance is re-run
+# through the shared Whisper model every LIVE_PARTIAL_SECONDS of new audio to
+# produce partial segments, and finalized once the speaker pauses or the
+# buffer reaches LIVE_WINDOW_SECONDS. Memory and per-step inference cost are
+# therefore bounded by the window, regardless of how long the session runs.
+# When Whisper falls behind, stale partials are skipped and audio waiting to
+# be processed is capped at LIVE_MAX_BACKLOG_SECONDS (see AudioBacklog), so
+# latency stays bounded too.
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+from django.conf import settings
+
+from api.services.audio import SAMPLE_RATE, find_quiet_point, frame_energy
+from api.services.longform import shift_segments
+from api.services.preprocess import get_router
+from api.services.transcription import TranscriptionService
+
+FRAME_MS = 30
+# Incoming audio is fed through the state machine at most this much at a time,
+# so one large client message cannot overflow the buffer.
+STEP_SECONDS = 1.0
+# How far back from the window end to look for a quiet cut point.
+CUT_SEARCH_SECONDS = 2.0
+
+
+class LiveTranscriber:
+    """Turn a stream of 16 kHz float32 PCM into partial and final transcripts.
+
+    :meth:`push` and :meth:`finish` return messages shaped like
+    ``{"type": "partial" | "final", "segments": [...], "language": ...}``
+    where segments use the same whisperx layout as ``/note/transcribe``, with
+    times relative to the start of the stream. A partial covers the utterance
+    in progress and is superseded by the next partial or final; finals are
+    never revised. Each :meth:`push` first feeds all of its audio through
+    the VAD (finalizing utterances as they end) and then runs at most one
+    partial, on the newest buffer; partials for audio that has since been
+    superseded are never computed.
+    """
+
+    def __init__(self, language: Optional[str] = None) -> None:
+        self.svc = TranscriptionService()
+        self.language = language
+        # One route for the whole session, sized for the longest utterance, so
+        # partials and finals never switch models mid-stream.
+        self.route = get_router().choose(settings.LIVE_WINDOW_SECONDS)
+        self._window = max(1, int(settings.LIVE_WINDOW_SECONDS * SAMPLE_RATE))
+        self._step = int(STEP_SECONDS * SAMPLE_RATE)
+        self._partial = int(settings.LIVE_PARTIAL_SECONDS * SAMPLE_RATE)
+        self._silence_end = int(settings.LIVE_SILENCE_SECONDS * SAMPLE_RATE)
+        self._frame = SAMPLE_RATE * FRAME_MS // 1000
+        self._buf = np.zeros(self._window + self._step, dtype=np.float32)
+        self._len = 0
+        self._offset = 0  # samples finalized or dropped before _buf[0]
+        self._scanned = 0  # samples of _buf already seen by the VAD
+        self._speech = False
+        self._silence = 0
+        self._since_partial = 0
+
+    async def push(self, pcm: NDArray[np.float32]) -> List[dict]:
+        messages: List[dict] = []
+        for start in range(0, len(pcm), self._step):
+            messages.extend(await self._advance(pcm[start : start + self._step]))
+        if self._speech and self._since_partial >= self._partial:
+            self._since_partial = 0
+            result = await self._transcribe(self._buf[: self._len])
+            messages.append(self._message("partial", result))
+        return messages
+
+    async def skip(self, samples: int) -> List[dict]:
+        """Account for *samples* of audio dropped before reaching :meth:`push`.
+
+        The utterance in progress is finalized as if the speaker paused, and
+        the timeline moves past the gap so later segments keep their times.
+        """
+        messages: List[dict] = []
+        if self._speech and self._len:
+            messages = await self._finalize(self._len)
+        self._discard(self._len)
+        self._offset += samples
+        self._speech, self._silence, self._scanned, self._since_partial = False, 0, 0, 0
+        return messages
+
+    async def finish(self) -> List[dict]:
+        """Finalize whatever is still buffered at the end of the stream."""
+        if self._speech and self._len:
+            return await self._finalize(self._len)
+        return []
+
+    async def _advance(self, pcm: NDArray[np.float32]) -> List[dict]:
+        self._buf[self._len : self._len + len(pcm)] = pcm
+        self._len += len(pcm)
+        self._since_partial += len(pcm)
+        self._scan()
+
+        if self._speech and self._silence >= self._silence_end:
+            return await self._finalize(self._len)
+        if self._len >= self._window:
+            search = min(self._len, int(CUT_SEARCH_SECONDS * SAMPLE_RATE))
+            tail = self._buf[self._len - search : self._len]
+            return await self._finalize(self._len - search + find_quiet_point(tail))
+        if not self._speech:
+            # Only silence so far: keep a short tail so speech onsets aren't clipped.
+            self._discard(max(0, self._len - self._silence_end))
+        return []
+
+    def _scan(self) -> None:
+        """Run the VAD over whole frames added since the last scan."""
+        end = self._scanned + (self._len - self._scanned) // self._frame * self._frame
+        for rms in frame_energy(self._buf[self._scanned : end], FRAME_MS):
+            if rms >= settings.LIVE_VAD_THRESHOLD:
+                self._speech, self._silence = True, 0
+            else:
+                self._silence += self._frame
+        self._scanned = end
+
+    async def _finalize(self, cut: int) -> List[dict]:
+        messages: List[dict] = []
+        if self._speech:
+            result = await self._transcribe(self._buf[:cut])
+            self.language = self.language or result.get("language")
+            messages.append(self._message("final", result))
+        self._discard(cut)
+        # Re-scan what is left (at most the cut search span) from a clean state.
+        self._speech, self._silence, self._scanned, self._since_partial = False, 0, 0, 0
+        self._scan()
+        return messages
+
+    def _discard(self, n: int) -> None:
+        if n <= 0:
+            return
+        rest = self._len - n
+        self._buf[:rest] = self._buf[n : self._len]
+        self._len = rest
+        self._offset += n
+        self._scanned = max(0, self._scanned - n)
+
+    async def _transcribe(self, audio: NDArray[np.float32]) -> dict:
+        # The buffer is not touched until this returns, so no copy is needed.
+        return await asyncio.to_thread(
+            self.svc.transcribe_audio, audio, self.language, self.route
+        )
+
+    def _message(self, kind: str, result: dict) -> dict:
+        return {
+            "type": kind,
+            "segments": shift_segments(
+                result.get("segments", []), self._offset / SAMPLE_RATE
+            ),
+            "language": result.get("language") or self.language,
+        }
+
+
+class AudioBacklog:
+    """Bounded hand-off of decoded audio from the socket reader to the transcriber.
+
+    The socket reader puts frames without ever waiting on Whisper; the
+    transcriber takes everything pending as one coalesced array.
+    Beyond *max_samples* the oldest audio is dropped and reported, so memory
+    per connection and the delay before new audio is seen both stay bounded.
+    """
+
+    def __init__(self, max_samples: int) -> None:
+        self.max_samples = max(1, max_samples)
+        self._frames: Deque[NDArray[np.float32]] = deque()
+        self._pending = 0
+        self._dropped = 0
+        self._closed = False
+        self._ready = asyncio.Event()
+
+    def put(self, pcm: NDArray[np.float32]) -> None:
+        if not len(pcm):
+            return
+        self._frames.append(pcm)
+        self._pending += len(pcm)
+        excess = self._pending - self.max_samples
+        while excess > 0:
+            oldest = self._frames[0]
+            if len(oldest) <= excess:
+                self._frames.popleft()
+                n = len(oldest)
+            else:
+                self._frames[0] = oldest[excess:]
+                n = excess
+            self._pending -= n
+            self._dropped += n
+            excess -= n
+        self._ready.set()
+
+    def close(self, discard: bool = False) -> None:
+        """No more audio will come; :meth:`take` drains (unless *discard*) and
+        then reports the end."""
+        if discard:
+            self._frames.clear()
+            self._pending = self._dropped = 0
+        self._closed = True
+        self._ready.set()
+
+    async def take(self) -> Optional[Tuple[int, NDArray[np.float32]]]:
+        """Wait for audio and return ``(dropped_samples, pcm)``, or None once closed
+        and drained. *dropped_samples* precede *pcm* on the stream timeline."""
+        while not (self._frames or self._dropped or self._closed):
+            self._ready.clear()
+            await self._ready.wait()
+        if not (self._frames or self._dropped):
+            return None
+        if self._frames:
+            pcm = np.concatenate(self._frames)
+        else:
+            pcm = np.zeros(0, dtype=np.float32)
+        dropped = self._dropped
+        self._frames.clear()
+        self._pending = self._dropped = 0
+        return dropped, pcm
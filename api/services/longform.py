@@ -0,0 +1,135 @@
+# Parallel transcription for long recordings.
+# A single whisperx call only parallelizes within WHISPER_BATCH_SIZE, which
+# leaves most cores of a large CPU box idle on one long file. Here the audio
+# is split at quiet points into chunks that are transcribed concurrently by
+# several Whisper replicas, each pinned to an explicit CTranslate2 thread
+# count, and the segments are stitched back together on the original timeline.
+from __future__ import annotations
+
+import queue
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Iterable, List, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+from django.conf import settings
+
+from api.services.audio import SAMPLE_RATE
+from api.services.metrics import AUDIO_SECONDS
+from api.services.preprocess import trim_silence
+from api.services.registry import get_registry, get_whisper_model, whisper_key
+
+# Receives each chunk's segments, already shifted onto the recording timeline.
+SegmentsCallback = Callable[[List[dict]], None]
+
+
+class LongFormTranscriber:
+    """Transcribe ``(offset, audio)`` windows on *workers* Whisper replicas.
+
+    At most ``2 * workers`` windows are in flight, so when fed from the
+    streaming decoder memory stays bounded by the chunk size, not the length
+    of the recording. Replicas live in the shared model registry, which is
+    sized from WHISPER_LONGFORM_WORKERS to keep them all resident.
+    """
+
+    def __init__(self, workers: int, threads: Optional[int] = None) -> None:
+        self.workers = max(1, workers)
+        self.threads = threads
+        self._keys = [
+            whisper_key(threads=threads, replica=i) for i in range(self.workers)
+        ]
+        self._free: "queue.Queue[int]" = queue.Queue()
+        for i in range(self.workers):
+            self._free.put(i)
+
+    def _replica(self, index: int) -> Any:
+        return get_whisper_model(threads=self.threads, replica=index)
+
+    def detect_language(self, audio: NDArray[np.float32]) -> Optional[str]:
+        index = self._free.get()
+        try:
+            with get_registry().lock(self._keys[index]):
+                return self._replica(index).detect_language(audio)
+        finally:
+            self._free.put(index)
+
+    def _transcribe_chunk(
+        self, audio: NDArray[np.float32], language: Optional[str]
+    ) -> dict:
+        # Replicas all run the default model, so only silence trimming applies.
+        speech, offsets = trim_silence(audio)
+        AUDIO_SECONDS.inc(len(speech) / SAMPLE_RATE)
+        index = self._free.get()
+        try:
+            with get_registry().lock(self._keys[index]):
+                result = self._replica(index).transcribe(
+                    speech, batch_size=settings.WHISPER_BATCH_SIZE, language=language
+                )
+        finally:
+            self._free.put(index)
+        return offsets.restore(result)
+
+    def transcribe(
+        self,
+        windows: Iterable[Tuple[float, NDArray[np.float32]]],
+        language: Optional[str] = None,
+        on_segments: Optional[SegmentsCallback] = None,
+    ) -> dict:
+        """Return a merged whisperx-style ``{"segments", "language"}`` result.
+
+        The language is detected once on the first window (unless given) and
+        forced on every chunk so replicas agree. *on_segments* is called with
+        each chunk's segments in timeline order as soon as they are available.
+        """
+        in_flight: Deque[Tuple[float, "Future[dict]"]] = deque()
+        merged: List[dict] = []
+
+        def collect_oldest() -> None:
+            offset, fut = in_flight.popleft()
+            shifted = shift_segments(fut.result().get("segments", []), offset)
+            if on_segments is not None:
+                on_segments(shifted)
+            merged.extend(shifted)
+
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="whisper-longform"
+        ) as pool:
+            for offset, audio in windows:
+                if language is None:
+                    language = self.detect_language(audio)
+                if len(in_flight) >= 2 * self.workers:
+                    collect_oldest()
+                in_flight.append(
+                    (offset, pool.submit(self._transcribe_chunk, audio, language))
+                )
+            while in_flight:
+                collect_oldest()
+
+        return {"segments": merged, "language": language}
+
+
+def shift_segments(segments: Iterable[dict], offset: float) -> List[dict]:
+    """Return copies of whisperx *segments* with times moved by *offset* seconds."""
+    if not offset:
+        return list(segments)
+    shifted = []
+    for seg in segments:
+        seg = dict(seg)
+        for key in ("start", "end"):
+            if seg.get(key) is not None:
+                seg[key] = round(seg[key] + offset, 3)
+        if "words" in seg:
+            seg["words"] = shift_segments(seg["words"], offset)
+        shifted.append(seg)
+    return shifted
+
+
+def get_longform_transcriber() -> Optional[LongFormTranscriber]:
+    """Return a transcriber if long-form mode is on (WHISPER_LONGFORM_WORKERS > 1)."""
+    if settings.WHISPER_LONGFORM_WORKERS <= 1:
+        return None
+    return LongFormTranscriber(
+        workers=settings.WHISPER_LONGFORM_WORKERS,
+        threads=settings.WHISPER_LONGFORM_THREADS or None,
+    )
@@ -0,0 +1,371 @@
+# In-process metrics for the hot paths.
+# Deliberately tiny: thread-safe counters, gauges and histograms kept per
+# process and rendered in the Prometheus text format, with no external client
+# dependency, plus per-request stage timings carried in a context var.
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-10ms up to the 360s LLM timeout.
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    360.0,
+)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+class _Metric:
+    """Shared plumbing: a metric, plus one child per label set.
+
+    A metric declared with *labelnames* is a family: only its children, made
+    by :meth:`labels`, hold values.
+    """
+
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: LabelSet = (),
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.label_set = labels
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelSet, "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: str):
+        """Return the child for *labels*, e.g. ``STAGE_SECONDS.labels(stage="x")``."""
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._child(key)
+            return child
+
+    def _child(self, labels: LabelSet) -> "_Metric":
+        raise NotImplementedError
+
+    def _members(self) -> List["_Metric"]:
+        with self._lock:
+            children = list(self._children.values())
+        return children if self.labelnames else [self, *children]
+
+    def _samples(self) -> List[Tuple[str, LabelSet, float]]:
+        raise NotImplementedError
+
+    def _family(self) -> str:
+        return self.name
+
+    def render(self) -> List[str]:
+        family = self._family()
+        lines = [f"# HELP {family} {self.help}", f"# TYPE {family} {self.kind}"]
+        for member in self._members():
+            for suffix, labels, value in member._samples():
+                labelled = f"{family}{suffix}{_format_labels(labels)}"
+                lines.append(f"{labelled} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: LabelSet = (),
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, help, labels, labelnames)
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def _child(self, labels: LabelSet) -> "Counter":
+        return Counter(self.name, self.help, labels)
+
+    def _family(self) -> str:
+        # The 0.0.4 text format names a counter's family after its sample.
+        return f"{self.name}_total"
+
+    def _samples(self) -> List[Tuple[str, LabelSet, float]]:
+        return [("", self.label_set, self._value)]
+
+
+class Gauge(_Metric):
+    """A settable value, or one computed by *fn* at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        fn: Optional[Callable[[], float]] = None,
+        labels: LabelSet = (),
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, help, labels, labelnames)
+        self._fn = fn
+        self._value = 0.0
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def _child(self, labels: LabelSet) -> "Gauge":
+        return Gauge(self.name, self.help, labels=labels)
+
+    def _samples(self) -> List[Tuple[str, LabelSet, float]]:
+        if self._fn is not None:
+            try:
+                return [("", self.label_set, float(self._fn()))]
+            except Exception:
+                return []  # a failing probe must not break the scrape
+        return [("", self.label_set, self._value)]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observed values."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        labels: LabelSet = (),
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, help, labels, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            cumulative: List[int] = []
+            running = 0
+            for c in self._counts:
+                running += c
+                cumulative.append(running)
+            return {
+                "buckets": dict(zip([*map(str, self.buckets), "+Inf"], cumulative)),
+                "sum": self._sum,
+                "count": self._count,
+            }
+
+    def _child(self, labels: LabelSet) -> "Histogram":
+        return Histogram(self.name, self.help, self.buckets, labels)
+
+    def _samples(self) -> List[Tuple[str, LabelSet, float]]:
+        snap = self.snapshot()
+        samples = [
+            ("_bucket", (*self.label_set, ("le", le)), float(count))
+            for le, count in snap["buckets"].items()  # type: ignore[union-attr]
+        ]
+        total = float(snap["sum"])  # type: ignore[arg-type]
+        count = float(snap["count"])  # type: ignore[arg-type]
+        samples.append(("_sum", self.label_set, total))
+        samples.append(("_count", self.label_set, count))
+        return samples
+
+
+def _format_labels(labels: LabelSet) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name: str, factory: Callable[[], _Metric]) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        buckets: Optional[Sequence[float]] = None,
+        labelnames: Sequence[str] = (),
+    ) -> Histogram:
+        """Return the histogram called *name*, creating it on first use."""
+        return self._get_or_create(  # type: ignore[return-value]
+            name,
+            lambda: Histogram(
+                name, help, buckets or DEFAULT_BUCKETS, labelnames=labelnames
+            ),
+        )
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(  # type: ignore[return-value]
+            name, lambda: Counter(name, help, labelnames=labelnames)
+        )
+
+    def gauge(
+        self, name: str, help: str, fn: Optional[Callable[[], float]] = None
+    ) -> Gauge:
+        gauge = self._get_or_create(name, lambda: Gauge(name, help, fn))
+        return gauge  # type: ignore[return-value]
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            metrics = [m for m in self._metrics.values() if isinstance(m, Histogram)]
+        return {m.name: m.snapshot() for m in metrics}
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+SUMMARY_TTFT = REGISTRY.histogram(
+    "notetaker_summary_ttft_seconds",
+    "Time from summarize request to the first streamed token.",
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "notetaker_stage_seconds",
+    "Latency of pipeline stages (upload, decode, model_load, transcribe, align, ...).",
+    labelnames=("stage",),
+)
+AUDIO_SECONDS = REGISTRY.counter(
+    "notetaker_whisper_audio_seconds",
+    "Seconds of audio run through Whisper (live partials count every re-run).",
+)
+MODEL_LOADS = REGISTRY.counter(
+    "notetaker_model_loads",
+    "Models loaded into the registries, by kind (whisper, align, diarization).",
+    labelnames=("kind",),
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "notetaker_cache_requests",
+    "Result cache lookups by cache (transcript, summary) and result "
+    "(hit, partial, miss).",
+    labelnames=("cache", "result"),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "notetaker_llm_tokens",
+    "LLM tokens by direction (prompt, completion), counted with the local tokenizer.",
+    labelnames=("direction",),
+)
+LLM_IN_FLIGHT = REGISTRY.gauge(
+    "notetaker_llm_in_flight",
+    "LLM calls currently running in this process.",
+)
+
+
+def record_cache(cache: str, result: str) -> None:
+    """Count a result-cache lookup; ``"off"`` (no cache configured) is ignored."""
+    if result != "off":
+        CACHE_REQUESTS.labels(cache=cache, result=result).inc()
+
+
+# ------------------------------------------------------------
+# Per-request stage timings
+# ------------------------------------------------------------
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "notetaker_stage_timings", default=None
+)
+
+
+def begin_timings() -> Dict[str, float]:
+    """Start collecting stage durations (seconds) for the current context.
+
+    ``asyncio.to_thread`` copies the context, so stages timed inside worker
+    threads started that way land in the same dict.
+    """
+    timings: Dict[str, float] = {}
+    _timings.set(timings)
+    return timings
+
+
+def current_timings() -> Dict[str, float]:
+    """The timings being collected for this context, starting them if needed."""
+    timings = _timings.get()
+    return timings if timings is not None else begin_timings()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as *name*; repeated stages accumulate.
+
+    Every stage also feeds the ``notetaker_stage_seconds`` histogram, whether
+    or not the current request collects timings.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage=name).observe(elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
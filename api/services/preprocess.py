@@ -0,0 +1,299 @@
+# Audio preprocessing ahead of Whisper.
+# Uploads often carry long silent stretches (waiting rooms, muted stretches
+# of a call) that still cost Whisper time. A cheap frame-energy pass drops
+# silent runs longer than AUDIO_TRIM_MIN_SILENCE_SECONDS and keeps an offset
+# map, so segment times are mapped back onto the original recording. The
+# router then picks the Whisper model for the remaining speech by its
+# duration and, with a latency target, by the real-time factor observed for
+# each model so far.
+from __future__ import annotations
+
+import bisect
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+from django.conf import settings
+
+from api.services.audio import SAMPLE_RATE, frame_energy
+from api.services.metrics import REGISTRY
+
+FRAME_MS = 30
+
+TRIMMED_SECONDS = REGISTRY.counter(
+    "notetaker_audio_trimmed_seconds",
+    "Seconds of silence dropped before Whisper.",
+)
+ROUTED = REGISTRY.counter(
+    "notetaker_whisper_routed",
+    "Whisper calls by the model and compute type the router picked.",
+    labelnames=("model", "compute_type"),
+)
+
+
+@dataclass
+class OffsetMap:
+    """Maps times in trimmed audio back to the original recording.
+
+    Kept spans are contiguous in trimmed time; span *i* starts at
+    ``trimmed[i]`` there and at ``original[i]`` in the recording.
+    """
+
+    trimmed: List[float] = field(default_factory=lambda: [0.0])
+    original: List[float] = field(default_factory=lambda: [0.0])
+
+    def to_original(self, t: float, end: bool = False) -> float:
+        # An end time on a span boundary belongs to the span it closes, so a
+        # segment never stretches over the silence that was cut after it.
+        find = bisect.bisect_left if end else bisect.bisect_right
+        i = max(0, find(self.trimmed, t) - 1)
+        return self.original[i] + (t - self.trimmed[i])
+
+    def restore(self, result: dict) -> dict:
+        """Return *result* with segment (and word) times on the original timeline."""
+        if len(self.trimmed) == 1 and not self.original[0]:
+            return result
+        return dict(
+            result, segments=[self._restore(seg) for seg in result.get("segments", [])]
+        )
+
+    def _restore(self, seg: dict) -> dict:
+        seg = dict(seg)
+        for key in ("start", "end"):
+            if seg.get(key) is not None:
+                seg[key] = round(self.to_original(seg[key], end=key == "end"), 3)
+        if "words" in seg:
+            seg["words"] = [self._restore(word) for word in seg["words"]]
+        return seg
+
+
+def trim_silence(
+    audio: NDArray[np.float32],
+    threshold: Optional[float] = None,
+    min_silence: Optional[float] = None,
+    pad: Optional[float] = None,
+) -> Tuple[NDArray[np.float32], OffsetMap]:
+    """Drop silent runs longer than *min_silence* seconds from *audio*.
+
+    A frame is silent when its RMS is below *threshold*; *pad* seconds of
+    each dropped run are kept on either side so word onsets and tails
+    survive. Returns the audio unchanged (with an identity map) when
+    AUDIO_TRIM_SILENCE is off, nothing qualifies, or everything is silent.
+    """
+    spans = _speech_spans(audio, threshold, min_silence, pad)
+    if spans is None:
+        return audio, OffsetMap()
+    offsets = OffsetMap([], [])
+    kept = 0
+    for start, stop in spans:
+        offsets.trimmed.append(kept / SAMPLE_RATE)
+        offsets.original.append(start / SAMPLE_RATE)
+        kept += stop - start
+    TRIMMED_SECONDS.inc((len(audio) - kept) / SAMPLE_RATE)
+    return np.concatenate([audio[start:stop] for start, stop in spans]), offsets
+
+
+def speech_seconds(audio: NDArray[np.float32]) -> float:
+    """Seconds of *audio* that :func:`trim_silence` would keep."""
+    spans = _speech_spans(audio)
+    if spans is None:
+        return len(audio) / SAMPLE_RATE
+    return sum(stop - start for start, stop in spans) / SAMPLE_RATE
+
+
+def _speech_spans(
+    audio: NDArray[np.float32],
+    threshold: Optional[float] = None,
+    min_silence: Optional[float] = None,
+    pad: Optional[float] = None,
+) -> Optional[List[Tuple[int, int]]]:
+    # Sample ranges to keep, or None when nothing would be trimmed.
+    if not settings.AUDIO_TRIM_SILENCE:
+        return None
+    if threshold is None:
+        threshold = settings.AUDIO_TRIM_THRESHOLD
+    if min_silence is None:
+        min_silence = settings.AUDIO_TRIM_MIN_SILENCE_SECONDS
+    pad = settings.AUDIO_TRIM_PAD_SECONDS if pad is None else pad
+
+    silent = frame_energy(audio, FRAME_MS) < threshold
+    if not len(silent) or silent.all() or not silent.any():
+        return None
+    min_frames = max(1, int(min_silence * 1000 / FRAME_MS))
+    cuts = _silent_cuts(silent, len(audio), min_frames, int(pad * SAMPLE_RATE))
+    if not cuts:
+        return None
+    return _between(cuts, len(audio))
+
+
+def _silent_cuts(
+    silent: NDArray[np.bool_], length: int, min_frames: int, pad_samples: int
+) -> List[Tuple[int, int]]:
+    # Sample ranges of silent runs of at least *min_frames*, less the padding.
+    frame = SAMPLE_RATE * FRAME_MS // 1000
+    # Start/end frame of every silent run.
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], silent.astype(np.int8), [0]))))
+    cuts: List[Tuple[int, int]] = []
+    for a, b in zip(edges[::2].tolist(), edges[1::2].tolist()):
+        if b - a < min_frames:
+            continue
+        start = 0 if a == 0 else a * frame + pad_samples
+        stop = length if b == len(silent) else b * frame - pad_samples
+        if stop > start:
+            cuts.append((start, stop))
+    return cuts
+
+
+def _between(cuts: List[Tuple[int, int]], length: int) -> List[Tuple[int, int]]:
+    # The ranges of [0, length) not covered by the ordered *cuts*.
+    spans: List[Tuple[int, int]] = []
+    position = 0
+    for start, stop in cuts:
+        if start > position:
+            spans.append((position, start))
+        position = stop
+    if position < length:
+        spans.append((position, length))
+    return spans
+
+
+# ------------------------------------------------------------
+# Duration- and latency-aware model routing
+# ------------------------------------------------------------
+@dataclass(frozen=True)
+class Route:
+    model: str
+    compute_type: str
+    # Longest speech (seconds) this route takes; None for no limit.
+    max_seconds: Optional[float] = None
+
+    @property
+    def is_default(self) -> bool:
+        return (self.model, self.compute_type) == (
+            settings.WHISPER_MODEL,
+            settings.WHISPER_COMPUTE_TYPE,
+        )
+
+
+def parse_routes(entries: Sequence[str]) -> List[Route]:
+    """Parse ``model[/compute_type][:max_seconds]`` entries, e.g. ``small/int8:60``."""
+    routes = []
+    for entry in entries:
+        spec, _, limit = entry.partition(":")
+        model, _, compute_type = spec.partition("/")
+        routes.append(
+            Route(
+                model.strip(),
+                compute_type.strip() or settings.WHISPER_COMPUTE_TYPE,
+                float(limit) if limit.strip() else None,
+            )
+        )
+    return routes
+
+
+class ModelRouter:
+    """Pick a Whisper model per request from WHISPER_ROUTES.
+
+    Routes are listed in order of preference (typically most accurate
+    first). A route is eligible when the speech fits its ``max_seconds``
+    and, with a *latency_target*, when its observed real-time factor times
+    the speech duration is within the target; routes not measured yet are
+    assumed to fit. The last route is the fallback when none is eligible.
+    Without routes every call goes to WHISPER_MODEL.
+
+    Callers choose once per request from the speech duration of the whole
+    recording and use that route for every window, so one transcript never
+    mixes models.
+    """
+
+    # Weight of the newest observation in the real-time factor average.
+    ALPHA = 0.2
+
+    def __init__(self, routes: List[Route], latency_target: float = 0.0) -> None:
+        self.routes = routes
+        self.latency_target = max(0.0, latency_target)
+        self._rtf: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def choose(self, speech_seconds: float) -> Route:
+        if not self.routes:
+            return Route(settings.WHISPER_MODEL, settings.WHISPER_COMPUTE_TYPE)
+        with self._lock:
+            rtf = dict(self._rtf)
+        for route in self.routes:
+            if route.max_seconds is not None and speech_seconds > route.max_seconds:
+                continue
+            estimate = rtf.get((route.model, route.compute_type))
+            if self.latency_target and estimate is not None:
+                if estimate * speech_seconds > self.latency_target:
+                    continue
+            return route
+        return self.routes[-1]
+
+    def observe(self, route: Route, speech_seconds: float, elapsed: float) -> None:
+        ROUTED.labels(model=route.model, compute_type=route.compute_type).inc()
+        if speech_seconds <= 0:
+            return
+        key = (route.model, route.compute_type)
+        with self._lock:
+            previous = self._rtf.get(key)
+            rtf = elapsed / speech_seconds
+            self._rtf[key] = (
+                rtf if previous is None else previous + self.ALPHA * (rtf - previous)
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "routes": [
+                    {
+                        "model": r.model,
+                        "compute_type": r.compute_type,
+                        "max_seconds": r.max_seconds,
+                        "rtf": (
+                            round(self._rtf[(r.model, r.compute_type)], 4)
+                            if (r.model, r.compute_type) in self._rtf
+                            else None
+                        ),
+                    }
+                    for r in self.routes
+                ],
+                "latency_target_s": self.latency_target or None,
+            }
+
+
+def preprocess_signature() -> Tuple[Any, ...]:
+    """Trim settings, which change transcripts; part of the transcript cache key.
+
+    Routes are not included: only transcripts made by the default model are
+    cached (see TranscriptionService.process_cached).
+    """
+    trim = (
+        (
+            settings.AUDIO_TRIM_THRESHOLD,
+            settings.AUDIO_TRIM_MIN_SILENCE_SECONDS,
+            settings.AUDIO_TRIM_PAD_SECONDS,
+        )
+        if settings.AUDIO_TRIM_SILENCE
+        else None
+    )
+    return (trim,)
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    """Return the process-wide router configured from settings."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter(
+                    parse_routes(settings.WHISPER_ROUTES),
+                    settings.WHISPER_LATENCY_TARGET_SECONDS,
+                )
+    return _router
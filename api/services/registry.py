@@ -0,0 +1,329 @@
+# Process-wide registry of loaded speech models.
+# Loading a whisperx checkpoint takes seconds on CPU and briefly doubles memory,
+# so every TranscriptionService in the process shares one set of loaded models
+# keyed by the parameters that actually distinguish them. whisperx (and with it
+# torch) is imported by the loaders, not at module import, so processes that
+# never load a model do not pay for it.
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from django.conf import settings
+
+from api.services.metrics import MODEL_LOADS, REGISTRY, stage
+from api.services.preprocess import parse_routes
+
+ModelKey = Tuple[Hashable, ...]
+
+
+class ModelRegistry:
+    """A thread-safe LRU cache of loaded models.
+
+    Models are loaded lazily through the loader passed to :meth:`get`. Callers
+    asking for the same key while it is loading wait on a per-key lock, so a
+    checkpoint is read once; loads for different keys proceed in parallel.
+    When more than *max_models* are resident, or when *max_bytes* is set and
+    the estimated footprint reported by *size_of* exceeds it, least recently
+    used entries are dropped. Threads still holding an evicted model keep it
+    alive until done.
+    """
+
+    def __init__(
+        self,
+        max_models: int,
+        max_bytes: int = 0,
+        size_of: Optional[Callable[[Any], int]] = None,
+    ) -> None:
+        self.max_models = max(1, max_models)
+        self.max_bytes = max(0, max_bytes)
+        self._size_of = size_of or (lambda _model: 0)
+        self._models: "OrderedDict[ModelKey, Any]" = OrderedDict()
+        self._sizes: Dict[ModelKey, int] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[ModelKey, threading.Lock] = {}
+        self._use_locks: Dict[ModelKey, threading.RLock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: ModelKey, loader: Callable[[], Any]) -> Any:
+        """Return the model stored under *key*, loading it on first use."""
+        with self._lock:
+            if key in self._models:
+                self.hits += 1
+                self._models.move_to_end(key)
+                return self._models[key]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                # Another thread may have finished the load while we waited.
+                if key in self._models:
+                    self.hits += 1
+                    self._models.move_to_end(key)
+                    return self._models[key]
+                self.misses += 1
+            with stage("model_load"):
+                model = loader()
+            MODEL_LOADS.labels(kind=key[0]).inc()
+            size = self._size_of(model)
+            with self._lock:
+                self._models[key] = model
+                self._sizes[key] = size
+                self._evict_overflow()
+            return model
+
+    def lock(self, key: ModelKey) -> threading.RLock:
+        """Return the lock serializing stateful calls on the model for *key*.
+
+        whisperx pipelines mutate per-call state (e.g. the tokenizer chosen for
+        the detected language), so concurrent ``transcribe`` calls on one
+        instance must not interleave.
+        """
+        with self._lock:
+            return self._use_locks.setdefault(key, threading.RLock())
+
+    def evict(self, key: ModelKey) -> None:
+        with self._lock:
+            self._models.pop(key, None)
+            self._sizes.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self._sizes.clear()
+
+    def keys(self) -> Tuple[ModelKey, ...]:
+        with self._lock:
+            return tuple(self._models.keys())
+
+    @property
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters and occupancy, suitable for JSON emission."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "resident": len(self._models),
+                "resident_bytes": sum(self._sizes.values()),
+                "max_models": self.max_models,
+                "max_bytes": self.max_bytes,
+                "keys": [list(k) for k in self._models.keys()],
+            }
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._models
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._models)
+
+    def _evict_overflow(self) -> None:
+        # Caller must hold self._lock. The most recent entry is never evicted,
+        # so a single model larger than the budget still gets served.
+        def over_budget() -> bool:
+            if len(self._models) > self.max_models:
+                return True
+            return bool(self.max_bytes) and sum(self._sizes.values()) > self.max_bytes
+
+        while len(self._models) > 1 and over_budget():
+            key, _ = self._models.popitem(last=False)
+            self._sizes.pop(key, None)
+            self.evictions += 1
+
+
+_registry: Optional[ModelRegistry] = None
+_align_cache: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+_torch_budgeted = False
+
+
+def get_registry() -> ModelRegistry:
+    """Return the process-wide registry, creating it from settings on first use.
+
+    It holds at least every model the configuration keeps in use at once (see
+    :func:`configured_models`), so MODEL_REGISTRY_MAX_MODELS only adds room
+    for models loaded on demand.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry(
+                    max(settings.MODEL_REGISTRY_MAX_MODELS, configured_models())
+                )
+    return _registry
+
+
+def configured_models() -> int:
+    """Count the whisper and diarization models the settings keep in use.
+
+    That is the default Whisper model, each routed model, each long-form
+    replica and the diarization pipeline. Evicting any of them would reload a
+    checkpoint on the next request, or on the next chunk of the same one.
+    """
+    keys = {whisper_key()}
+    keys.update(
+        whisper_key(route.model, compute_type=route.compute_type)
+        for route in parse_routes(settings.WHISPER_ROUTES)
+    )
+    if settings.WHISPER_LONGFORM_WORKERS > 1:
+        keys.update(
+            whisper_key(threads=settings.WHISPER_LONGFORM_THREADS or None, replica=i)
+            for i in range(settings.WHISPER_LONGFORM_WORKERS)
+        )
+    keys.add(diarization_key())
+    return len(keys)
+
+
+def get_align_cache() -> ModelRegistry:
+    """Return the per-language cache of wav2vec2 alignment models.
+
+    Align checkpoints are usually larger than the base Whisper model, so they
+    live in their own cache with a memory budget instead of competing for
+    slots in the main registry.
+    """
+    global _align_cache
+    if _align_cache is None:
+        with _registry_lock:
+            if _align_cache is None:
+                _align_cache = ModelRegistry(
+                    settings.ALIGN_CACHE_MAX_MODELS,
+                    max_bytes=settings.ALIGN_CACHE_MAX_MB * 1024 * 1024,
+                    size_of=_align_model_bytes,
+                )
+    return _align_cache
+
+
+def _align_model_bytes(entry: Tuple[Any, dict]) -> int:
+    """Estimate the parameter footprint of a ``(model, metadata)`` align entry."""
+    model = entry[0]
+    try:
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+    except Exception:
+        return 0
+
+
+# ------------------------------------------------------------
+# Keys and loaders for the models used by TranscriptionService
+# ------------------------------------------------------------
+def whisper_key(
+    name: Optional[str] = None,
+    device: Optional[str] = None,
+    compute_type: Optional[str] = None,
+    threads: Optional[int] = None,
+    replica: int = 0,
+) -> ModelKey:
+    """Key for a Whisper pipeline.
+
+    *threads* pins CTranslate2's intra-op thread count (``None`` falls back
+    to WHISPER_THREADS, then the whisperx default) and *replica*
+    distinguishes otherwise identical instances used by parallel workers.
+    """
+    return (
+        "whisper",
+        name or settings.WHISPER_MODEL,
+        device or settings.WHISPER_DEVICE,
+        compute_type or settings.WHISPER_COMPUTE_TYPE,
+        threads or settings.WHISPER_THREADS or None,
+        replica,
+    )
+
+
+def get_whisper_model(
+    name: Optional[str] = None,
+    device: Optional[str] = None,
+    compute_type: Optional[str] = None,
+    threads: Optional[int] = None,
+    replica: int = 0,
+) -> Any:
+    key = whisper_key(name, device, compute_type, threads, replica)
+    _, model_name, model_device, model_compute_type, model_threads, _ = key
+    kwargs: Dict[str, Any] = {
+        "device": model_device,
+        "compute_type": model_compute_type,
+    }
+    if model_threads:
+        kwargs["threads"] = model_threads
+
+    def load() -> Any:
+        import whisperx
+
+        return whisperx.load_model(model_name, **kwargs)
+
+    return get_registry().get(key, load)
+
+
+def align_key(language_code: str, device: Optional[str] = None) -> ModelKey:
+    return ("align", language_code, device or settings.WHISPER_DEVICE)
+
+
+def get_align_model(
+    language_code: str, device: Optional[str] = None
+) -> Tuple[Any, dict]:
+    """Return ``(model, metadata)`` as produced by ``whisperx.load_align_model``."""
+    key = align_key(language_code, device)
+
+    def load() -> Tuple[Any, dict]:
+        import whisperx
+
+        _budget_torch_threads()
+        return whisperx.load_align_model(language_code=key[1], device=key[2])
+
+    return get_align_cache().get(key, load)
+
+
+def _budget_torch_threads() -> None:
+    """Apply TORCH_THREADS once, before the first torch model is loaded.
+
+    torch's intra-op thread count (and MKL's) is process-wide, so diarization
+    and alignment share one budget next to Whisper's CTranslate2 threads.
+    Changing it per call would race between concurrent requests.
+    """
+    global _torch_budgeted
+    if _torch_budgeted or not settings.TORCH_THREADS:
+        return
+    with _registry_lock:
+        if not _torch_budgeted:
+            import torch
+
+            torch.set_num_threads(settings.TORCH_THREADS)
+            _torch_budgeted = True
+
+
+def diarization_key(device: Optional[str] = None) -> ModelKey:
+    return ("diarization", device or settings.WHISPER_DEVICE)
+
+
+def get_diarization_pipeline(device: Optional[str] = None) -> Any:
+    key = diarization_key(device)
+
+    def load() -> Any:
+        import whisperx
+
+        _budget_torch_threads()
+        return whisperx.DiarizationPipeline(
+            use_auth_token=settings.HF_API_KEY, device=key[1]
+        )
+
+    return get_registry().get(key, load)
+
+
+REGISTRY.gauge(
+    "notetaker_models_resident",
+    "Models resident in the shared registry (align models are counted separately).",
+    fn=lambda: len(get_registry()),
+)
+REGISTRY.gauge(
+    "notetaker_align_models_resident",
+    "Alignment models resident in the per-language cache.",
+    fn=lambda: len(get_align_cache()),
+)
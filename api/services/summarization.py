@@ -3,44 +3,233 @@
 # for either plain text or a structured note depending on the requested format.
 from __future__ import annotations
 
-import os
-from enum import Enum
-from typing import Any, Dict, Optional, Type
+import asyncio
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, create_model
 from django.conf import settings
 
-# LlamaIndex LLMs (OpenAI or Ollama)
-from llama_index.core.llms.llm import LLM
-from llama_index.llms.ollama import Ollama
-from llama_index.llms.openai import OpenAI
 from llama_index.core import PromptTemplate
+from llama_index.core.utils import get_tokenizer
 
+from api.services.cache import DiskCache, MemoryCache, TieredCache, make_key
+from api.services.enums import NoteFormat, SummaryMode
+from api.services.layout import is_columnar, segment_texts
+from api.services.metrics import LLM_IN_FLIGHT, LLM_TOKENS, record_cache, stage
 
-def _get_llm() -> LLM:
-    """Return an LLM instance based on environment settings.
+if TYPE_CHECKING:
+    import httpx
+    from llama_index.core.llms.llm import LLM
+
+
+# Process-wide LLM clients keyed by (provider, model, base_url). Each client
+# owns a keep-alive HTTP connection pool, so reusing it across requests skips
+# client construction and the TCP/TLS handshake to the LLM endpoint.
+LLMKey = Tuple[str, str, Optional[str]]
+_llm_pool: Dict[LLMKey, LLM] = {}
+_llm_pool_lock = threading.Lock()
+
+
+def _llm_key() -> LLMKey:
+    if settings.USE_LOCAL_MODELS:
+        return ("ollama", settings.LLM_MODEL, settings.OLLAMA_URL or None)
+    return ("openai", settings.LLM_MODEL, None)
+
+
+def _http_limits() -> "httpx.Limits":
+    import httpx
+
+    return httpx.Limits(
+        max_connections=settings.LLM_HTTP_POOL_SIZE,
+        max_keepalive_connections=settings.LLM_HTTP_POOL_SIZE,
+    )
+
+
+def _build_llm(key: LLMKey) -> LLM:
+    """Construct a client for *key* with a pooled, keep-alive HTTP transport.
 
-    - If USE_LOCAL_MODELS is true, use an Ollama endpoint.
+    - For "ollama", use an Ollama endpoint.
     - Otherwise, default to OpenAI-compatible LLM.
+
+    Only the configured provider's integration is imported.
     """
-    if settings.USE_LOCAL_MODELS:
-        return Ollama(
-            model=settings.LLM_MODEL,
-            request_timeout=360.0,
-            base_url=str(settings.OLLAMA_URL) if settings.OLLAMA_URL else None,
+    provider, model, base_url = key
+    timeout = settings.LLM_REQUEST_TIMEOUT
+    if provider == "ollama":
+        from llama_index.llms.ollama import Ollama
+        from ollama import AsyncClient as OllamaAsyncClient
+        from ollama import Client as OllamaClient
+
+        kwargs: Dict[str, Any] = {}
+        if base_url:
+            kwargs["base_url"] = str(base_url)
+        if settings.LLM_CONTEXT_WINDOW:
+            # Ollama cannot report the model's context size; take it from settings.
+            kwargs["context_window"] = settings.LLM_CONTEXT_WINDOW
+        llm = Ollama(model=model, request_timeout=timeout, **kwargs)
+        # The integration builds its ollama clients lazily with httpx defaults;
+        # install ones sized by LLM_HTTP_POOL_SIZE instead (extra kwargs are
+        # forwarded to httpx).
+        llm._client = OllamaClient(
+            host=llm.base_url, timeout=timeout, limits=_http_limits()
+        )
+        llm._async_client = OllamaAsyncClient(
+            host=llm.base_url, timeout=timeout, limits=_http_limits()
         )
+        return llm
+
+    import httpx
+    from llama_index.llms.openai import OpenAI
+
     return OpenAI(
-        model=settings.LLM_MODEL,
-        request_timeout=360.0,
+        model=model,
+        request_timeout=timeout,
         api_key=settings.OPENAI_API_KEY,
+        http_client=httpx.Client(timeout=timeout, limits=_http_limits()),
+        async_http_client=httpx.AsyncClient(timeout=timeout, limits=_http_limits()),
     )
 
 
-class NoteFormat(str, Enum):
-    TEXT = "Text"
-    SOAP = "SOAP"
-    PKI_HL7_CDA = "PKI HL7 CDA"
-    THERAPY_ASSESSMENT = "Therapy Assessment"
+def _get_llm() -> LLM:
+    """Return the shared LLM client for the configured provider and model."""
+    key = _llm_key()
+    llm = _llm_pool.get(key)
+    if llm is None:
+        with _llm_pool_lock:
+            llm = _llm_pool.get(key)
+            if llm is None:
+                llm = _llm_pool[key] = _build_llm(key)
+    return llm
+
+
+class _Waiter:
+    __slots__ = ("wake", "granted")
+
+    def __init__(self, wake: Callable[[], None]) -> None:
+        self.wake = wake
+        self.granted = False
+
+
+class InFlightLimit:
+    """Caps concurrent LLM calls in this process at *limit*.
+
+    Sync callers (worker threads) and async callers (the async views) draw
+    from one budget: a single counter behind a lock. Sync callers block
+    their thread while waiting, async callers await without blocking their
+    event loop, and freed slots are handed to waiters in arrival order.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(1, limit)
+        self._free = self.limit
+        self._waiters: Deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+
+    def _enqueue(self, wake: Callable[[], None]) -> Optional[_Waiter]:
+        # Take a free slot (None) or queue a waiter to be woken with one.
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return None
+            waiter = _Waiter(wake)
+            self._waiters.append(waiter)
+            return waiter
+
+    def _cancel(self, waiter: _Waiter) -> None:
+        with self._lock:
+            granted = waiter.granted
+            if not granted:
+                self._waiters.remove(waiter)
+        if granted:
+            self.release()
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                self._free += 1
+                return
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+        waiter.wake()
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        """Hold one slot for the block, blocking the calling thread until free."""
+        event = threading.Event()
+        waiter = self._enqueue(event.set)
+        if waiter is not None:
+            event.wait()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def ahold(self) -> AsyncIterator[None]:
+        """Hold one slot for the block, awaiting (not blocking) until free."""
+        await self._aacquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def _aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        waiter = self._enqueue(self._waker(loop, ready))
+        if waiter is not None:
+            try:
+                await ready
+            except BaseException:
+                self._cancel(waiter)
+                raise
+
+    def _waker(
+        self, loop: asyncio.AbstractEventLoop, ready: "asyncio.Future[None]"
+    ) -> Callable[[], None]:
+        # Resolve *ready* on its own loop; called from whichever thread
+        # releases the slot.
+        def grant() -> None:
+            if not ready.done():
+                ready.set_result(None)
+
+        def wake() -> None:
+            try:
+                loop.call_soon_threadsafe(grant)
+            except RuntimeError:  # the loop is gone; pass the slot on
+                self.release()
+
+        return wake
+
+
+_in_flight: Optional[InFlightLimit] = None
+
+
+def _get_in_flight() -> InFlightLimit:
+    global _in_flight
+    if _in_flight is None:
+        with _llm_pool_lock:
+            if _in_flight is None:
+                _in_flight = InFlightLimit(settings.LLM_MAX_IN_FLIGHT)
+    return _in_flight
 
 
 class SOAPNote(BaseModel):
@@ -87,9 +276,99 @@ Transcript:
 )
 
 
+MAP_PROMPT = PromptTemplate(
+    """
+Summarize part {part} of a clinical session transcript. Keep every
+clinically relevant fact (complaints, history, findings, diagnoses, medications,
+plans, follow-up) and who stated it. Use only information explicitly present in
+this part. Do NOT invent details. Respond in the language of the text.
+
+Text:
+{transcript}
+"""
+)
+
+
+REDUCE_PROMPT = PromptTemplate(
+    """
+The notes below summarize consecutive parts of one clinical session transcript,
+in order. Create a concise clinical note for the whole session from them. If a
+target language is provided, respond in that language; otherwise, use the notes'
+language. Use only information explicitly present in the notes. Do NOT invent
+details. For structured outputs, return empty strings for missing fields.
+
+---
+Target Language: {target_language}
+---
+
+Partial summaries:
+{transcript}
+"""
+)
+
+
+STRUCTURED_FORMATS: Dict[NoteFormat, Type[BaseModel]] = {
+    NoteFormat.SOAP: SOAPNote,
+    NoteFormat.PKI_HL7_CDA: PKIHL7CDANote,
+    NoteFormat.THERAPY_ASSESSMENT: TherapyAssessmentNote,
+}
+
+STRUCTURED_UNSUPPORTED = {
+    "detail": (
+        "Selected model cannot produce the requested structured format. "
+        "Try a different format or a stronger model."
+    )
+}
+
+# Field names used for each format in the combined multi-format schema.
+COMBINED_FIELDS: Dict[NoteFormat, str] = {
+    NoteFormat.TEXT: "text",
+    NoteFormat.SOAP: "soap",
+    NoteFormat.PKI_HL7_CDA: "pki_hl7_cda",
+    NoteFormat.THERAPY_ASSESSMENT: "therapy_assessment",
+}
+
+COMBINED_INSTRUCTIONS = """
+Produce every requested note in one response, one per output field: {formats}.
+"text" is a plain-text note; the other fields follow their own schemas.
+"""
+
+_combined_models: Dict[Tuple[NoteFormat, ...], Type[BaseModel]] = {}
+
+
+def combined_note_model(formats: Tuple[NoteFormat, ...]) -> Type[BaseModel]:
+    """Build (once) a schema holding one field per requested note format."""
+    model = _combined_models.get(formats)
+    if model is None:
+        fields: Dict[str, Any] = {}
+        for fmt in formats:
+            if fmt == NoteFormat.TEXT:
+                fields["text"] = (
+                    Optional[str],
+                    Field(None, description="Concise plain-text clinical note"),
+                )
+            else:
+                fields[COMBINED_FIELDS[fmt]] = (Optional[STRUCTURED_FORMATS[fmt]], None)
+        model = _combined_models[formats] = create_model("CombinedNote", **fields)
+    return model
+
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+# Changes to any prompt invalidate cached summaries.
+PROMPT_HASH = make_key(
+    PROMPT.get_template(),
+    MAP_PROMPT.get_template(),
+    REDUCE_PROMPT.get_template(),
+    COMBINED_INSTRUCTIONS,
+)
+
+
 class SummarizationService:
     def __init__(self) -> None:
+        # Shared client: constructing the service per request stays cheap.
         self.llm = _get_llm()
+        self._tokenizer: Callable[[str], List[Any]] = get_tokenizer()
 
     def _to_text(self, transcript: Any) -> str:
         """Normalize various transcript shapes into plain text.
@@ -98,14 +377,220 @@ class SummarizationService:
         - {"text": "...", "language": "en"}
         - {"segments": [{"text": "..."}, ...], "language": "en"}
         - {"segments": [...], "word_segments": [...], "language": "en"}
+        - the columnar layout, {"layout": "columnar", "segments": {"text": [...], ...}}
         """
         if isinstance(transcript, dict):
             if "text" in transcript and isinstance(transcript["text"], str):
                 return transcript["text"]
-            if "segments" in transcript and isinstance(transcript["segments"], list):
-                return " ".join(str(seg.get("text", "")) for seg in transcript["segments"]).strip()
+            if is_columnar(transcript) or isinstance(transcript.get("segments"), list):
+                return " ".join(segment_texts(transcript)).strip()
         return str(transcript)
 
+    def _to_units(self, transcript: Any) -> List[str]:
+        """Split a transcript into the smallest pieces chunking may not cut:
+        segments when available, otherwise sentences of the plain text.
+        """
+        texts = segment_texts(transcript)
+        if texts:
+            units = [text.strip() for text in texts]
+        else:
+            units = _SENTENCE_BREAK.split(self._to_text(transcript))
+        return [u for u in units if u]
+
+    # ------------------------------------------------------------
+    # Token budgeting (map-reduce mode)
+    # ------------------------------------------------------------
+    def _count_tokens(self, text: str) -> int:
+        return len(self._tokenizer(text))
+
+    def _chunk_token_budget(self) -> int:
+        """Tokens of transcript that fit in one call to the configured model.
+
+        Derived from the LLM's reported context window minus its output
+        reservation and the prompt template, scaled by
+        SUMMARY_CHUNK_CONTEXT_FRACTION to leave headroom. SUMMARY_CHUNK_TOKENS
+        overrides the computation.
+        """
+        if settings.SUMMARY_CHUNK_TOKENS:
+            return settings.SUMMARY_CHUNK_TOKENS
+        meta = self.llm.metadata
+        overhead = self._count_tokens(REDUCE_PROMPT.get_template())
+        available = meta.context_window - max(meta.num_output, 0) - overhead
+        return max(256, int(available * settings.SUMMARY_CHUNK_CONTEXT_FRACTION))
+
+    def _pack(self, units: List[str], budget: int) -> List[str]:
+        """Greedily join *units* into chunks of at most *budget* tokens."""
+        chunks: List[str] = []
+        current: List[str] = []
+        used = 0
+        for unit in units:
+            cost = self._count_tokens(unit) + 1
+            if cost > budget:
+                # A single oversized unit: fall back to splitting on words.
+                words = unit.split()
+                step = max(1, len(words) * budget // cost)
+                pieces = [
+                    " ".join(words[i : i + step]) for i in range(0, len(words), step)
+                ]
+                chunks.extend(
+                    self._pack(pieces, budget) if step < len(words) else pieces
+                )
+                continue
+            if current and used + cost > budget:
+                chunks.append(" ".join(current))
+                current, used = [], 0
+            current.append(unit)
+            used += cost
+        if current:
+            chunks.append(" ".join(current))
+        return chunks
+
+    def _map(self, chunks: List[str]) -> List[str]:
+        """Summarize *chunks* concurrently (SUMMARY_MAP_CONCURRENCY), keeping order."""
+
+        def summarize_part(index: int) -> str:
+            resp = self._call(self.llm.complete, self._map_prompt(chunks, index))
+            return resp.text.strip() if resp and resp.text else ""
+
+        workers = max(1, min(settings.SUMMARY_MAP_CONCURRENCY, len(chunks)))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="summary-map"
+        ) as pool:
+            return list(pool.map(summarize_part, range(len(chunks))))
+
+    async def _amap(self, chunks: List[str]) -> List[str]:
+        """Async counterpart of :meth:`_map`."""
+        limit = asyncio.Semaphore(max(1, settings.SUMMARY_MAP_CONCURRENCY))
+
+        async def summarize_part(index: int) -> str:
+            async with limit:
+                resp = await self._acall(
+                    self.llm.acomplete, self._map_prompt(chunks, index)
+                )
+            return resp.text.strip() if resp and resp.text else ""
+
+        return list(
+            await asyncio.gather(*(summarize_part(i) for i in range(len(chunks))))
+        )
+
+    def _map_prompt(self, chunks: List[str], index: int) -> str:
+        return MAP_PROMPT.format(part=index + 1, transcript=chunks[index])
+
+    def _map_reduce_text(self, transcript: Any, budget: int) -> str:
+        """Collapse *transcript* into partial summaries that fit in *budget*."""
+        partials = self._map(self._pack(self._to_units(transcript), budget))
+        # Very long sessions may need more than one round before the partials
+        # fit into a single reduce prompt.
+        for _ in range(3):
+            if self._fits(partials, budget):
+                break
+            partials = self._map(self._pack(partials, budget))
+        return "\n\n".join(p for p in partials if p)
+
+    async def _amap_reduce_text(self, transcript: Any, budget: int) -> str:
+        partials = await self._amap(self._pack(self._to_units(transcript), budget))
+        return await self._acollapse(partials, budget)
+
+    async def _acollapse(self, partials: List[str], budget: int) -> str:
+        for _ in range(3):
+            if self._fits(partials, budget):
+                break
+            partials = await self._amap(self._pack(partials, budget))
+        return "\n\n".join(p for p in partials if p)
+
+    async def amap_stream(
+        self, batches: AsyncIterator[List[dict]], mode: SummaryMode = SummaryMode.AUTO
+    ) -> Tuple[str, bool]:
+        """Map transcript segments while they are still being produced.
+
+        *batches* yields lists of whisperx segments in timeline order. Segments
+        are packed into chunks of the map-reduce token budget and each chunk is
+        sent to the LLM as soon as it is full, so the map phase overlaps with
+        transcription. Returns ``(text, reduced)``: the partial summaries and
+        True when map-reduce ran, else the plain transcript text and False (a
+        transcript that fits in one call is summarized directly, as in
+        :meth:`summarize`).
+        """
+        budget = None if mode == SummaryMode.SINGLE else self._chunk_token_budget()
+        limit = asyncio.Semaphore(max(1, settings.SUMMARY_MAP_CONCURRENCY))
+        tasks: List["asyncio.Task[str]"] = []
+
+        def launch(chunk: str) -> None:
+            part = self._amap_part(limit, len(tasks), chunk)
+            tasks.append(asyncio.create_task(part))
+
+        packer = _ChunkPacker(budget, self._count_tokens, self._pack, launch)
+        try:
+            async for segments in batches:
+                for unit in _segment_texts(segments):
+                    packer.add(unit)
+            if not tasks and mode != SummaryMode.HIERARCHICAL:
+                return " ".join(packer.units), False
+            packer.flush()
+            partials = list(await asyncio.gather(*tasks))
+        except BaseException:
+            _cancel_all(tasks)
+            raise
+        return await self._acollapse(partials, budget), True
+
+    async def _amap_part(self, limit: asyncio.Semaphore, index: int, chunk: str) -> str:
+        async with limit:
+            resp = await self._acall(
+                self.llm.acomplete,
+                MAP_PROMPT.format(part=index + 1, transcript=chunk),
+            )
+        return resp.text.strip() if resp and resp.text else ""
+
+    def _fits(self, partials: List[str], budget: int) -> bool:
+        joined = "\n\n".join(p for p in partials if p)
+        return len(partials) <= 1 or self._count_tokens(joined) <= budget
+
+    def _prepare(self, transcript: Any, mode: SummaryMode) -> Tuple[str, Optional[int]]:
+        """Normalize *transcript* and decide on map-reduce (counting tokens)."""
+        with stage("prompt"):
+            text = self._to_text(transcript)
+            return text, self._map_reduce_budget(text, mode)
+
+    def _map_reduce_budget(self, text: str, mode: SummaryMode) -> Optional[int]:
+        """Return the chunk budget if *mode* calls for map-reduce on *text*."""
+        if mode == SummaryMode.SINGLE:
+            return None
+        budget = self._chunk_token_budget()
+        if mode == SummaryMode.HIERARCHICAL or self._count_tokens(text) > budget:
+            return budget
+        return None
+
+    # ------------------------------------------------------------
+    # LLM calls, bounded by LLM_MAX_IN_FLIGHT
+    # ------------------------------------------------------------
+    def _call(self, fn: Callable[[str], Any], prompt: str) -> Any:
+        with _get_in_flight().hold(), self._instrumented(prompt):
+            resp = fn(prompt)
+        self._count_completion(resp)
+        return resp
+
+    async def _acall(self, fn: Callable[[str], Awaitable[Any]], prompt: str) -> Any:
+        async with _get_in_flight().ahold():
+            with self._instrumented(prompt):
+                resp = await fn(prompt)
+        self._count_completion(resp)
+        return resp
+
+    @contextmanager
+    def _instrumented(self, prompt: str) -> Iterator[None]:
+        LLM_TOKENS.labels(direction="prompt").inc(self._count_tokens(prompt))
+        LLM_IN_FLIGHT.inc()
+        try:
+            with stage("llm"):
+                yield
+        finally:
+            LLM_IN_FLIGHT.dec()
+
+    def _count_completion(self, resp: Any) -> None:
+        text = getattr(resp, "text", None)
+        if isinstance(text, str) and text:
+            LLM_TOKENS.labels(direction="completion").inc(self._count_tokens(text))
+
     def _nullify_empty_strings(self, data: Any) -> Any:
         if isinstance(data, dict):
             return {k: self._nullify_empty_strings(v) for k, v in data.items()}
@@ -115,31 +600,399 @@ class SummarizationService:
             return None
         return data
 
-    def summarize(self, transcript: Any, fmt: NoteFormat, language: Optional[str] = None) -> Any:
-        text = self._to_text(transcript)
-        prompt = PROMPT.format(transcript=text, target_language=language)
+    # ------------------------------------------------------------
+    # Result cache
+    # ------------------------------------------------------------
+    def cache_key(
+        self,
+        transcript: Any,
+        fmt: NoteFormat,
+        language: Optional[str],
+        mode: SummaryMode = SummaryMode.AUTO,
+    ) -> str:
+        """Key on the normalized transcript text, so shape and whitespace
+        differences between equivalent transcripts still hit."""
+        text = " ".join(self._to_text(transcript).split())
+        return make_key(
+            "summary",
+            text,
+            fmt.value,
+            language,
+            mode.value,
+            settings.LLM_MODEL,
+            PROMPT_HASH,
+        )
+
+    def summarize_cached(
+        self,
+        transcript: Any,
+        fmt: NoteFormat,
+        language: Optional[str] = None,
+        mode: SummaryMode = SummaryMode.AUTO,
+    ) -> Tuple[Any, str]:
+        """:meth:`summarize` through the summary cache; returns ``(note, status)``
+        with status ``"hit"``, ``"miss"`` or ``"off"``."""
+        cache = get_summary_cache()
+        if cache is None:
+            return self.summarize(transcript, fmt, language, mode), "off"
+        key = self.cache_key(transcript, fmt, language, mode)
+        note = cache.get(key)
+        if note is not None:
+            record_cache("summary", "hit")
+            return note, "hit"
+        record_cache("summary", "miss")
+        note = self.summarize(transcript, fmt, language, mode)
+        if _cacheable(note):
+            cache.set(key, note)
+        return note, "miss"
+
+    async def asummarize_cached(
+        self,
+        transcript: Any,
+        fmt: NoteFormat,
+        language: Optional[str] = None,
+        mode: SummaryMode = SummaryMode.AUTO,
+    ) -> Tuple[Any, str]:
+        """Async :meth:`summarize_cached`; disk-tier I/O runs off the event loop."""
+        cache = get_summary_cache()
+        if cache is None:
+            return await self.asummarize(transcript, fmt, language, mode), "off"
+        key = self.cache_key(transcript, fmt, language, mode)
+        note = await asyncio.to_thread(cache.get, key)
+        if note is not None:
+            record_cache("summary", "hit")
+            return note, "hit"
+        record_cache("summary", "miss")
+        note = await self.asummarize(transcript, fmt, language, mode)
+        if _cacheable(note):
+            await asyncio.to_thread(cache.set, key, note)
+        return note, "miss"
+
+    # ------------------------------------------------------------
+    # Several formats from one transcript
+    # ------------------------------------------------------------
+    async def asummarize_many(
+        self,
+        transcript: Any,
+        formats: List[NoteFormat],
+        language: Optional[str] = None,
+        mode: SummaryMode = SummaryMode.AUTO,
+    ) -> Tuple[Dict[str, Any], Dict[str, str], str]:
+        """Summarize *transcript* into every format in *formats*.
+
+        Returns ``(notes, cache_status, strategy)`` keyed by format value.
+        Cached formats are served from the summary cache. The rest share one
+        normalized transcript (and, for long inputs, one map phase) and are
+        requested in a single structured call against a combined schema;
+        formats the model leaves empty, or all of them if it cannot produce
+        the combined schema, are then run concurrently one call per format.
+        *strategy* is ``"combined"``, ``"concurrent"`` or ``"cache"``.
+        """
+        ordered = tuple(dict.fromkeys(formats))
+        notes = await self.aget_cached_many(transcript, ordered, language, mode)
+        statuses = {fmt: "hit" for fmt in notes}
+        pending = [fmt for fmt in ordered if fmt.value not in notes]
+        if not pending:
+            return notes, statuses, "cache"
+
+        text, budget = self._prepare(transcript, mode)
+        if budget is not None:
+            partials = await self._amap_reduce_text(transcript, budget)
+            prompt = REDUCE_PROMPT.format(transcript=partials, target_language=language)
+        else:
+            prompt = PROMPT.format(transcript=text, target_language=language)
+
+        fresh, strategy = await self.acomplete_formats(prompt, pending)
+        notes.update(fresh)
+        statuses.update(await self.aset_cached_many(transcript, fresh, language, mode))
+        # Keep the caller's order.
+        return {fmt.value: notes.get(fmt.value) for fmt in ordered}, statuses, strategy
+
+    async def aget_cached_many(
+        self,
+        transcript: Any,
+        formats: Tuple[NoteFormat, ...],
+        language: Optional[str] = None,
+        mode: SummaryMode = SummaryMode.AUTO,
+    ) -> Dict[str, Any]:
+        """Return the cached notes among *formats*, keyed by format value."""
+        cache = get_summary_cache()
+        if cache is None:
+            return {}
+        notes: Dict[str, Any] = {}
+        for fmt in formats:
+            note = await asyncio.to_thread(
+                cache.get, self.cache_key(transcript, fmt, language, mode)
+            )
+            if note is not None:
+                notes[fmt.value] = note
+                record_cache("summary", "hit")
+        return notes
+
+    async def aset_cached_many(
+        self,
+        transcript: Any,
+        notes: Dict[str, Any],
+        language: Optional[str] = None,
+        mode: SummaryMode = SummaryMode.AUTO,
+    ) -> Dict[str, str]:
+        """Store freshly generated *notes*; returns their cache statuses."""
+        cache = get_summary_cache()
+        if cache is None:
+            return {value: "off" for value in notes}
+        for value, note in notes.items():
+            record_cache("summary", "miss")
+            if _cacheable(note):
+                key = self.cache_key(transcript, NoteFormat(value), language, mode)
+                await asyncio.to_thread(cache.set, key, note)
+        return {value: "miss" for value in notes}
+
+    def summary_prompt(self, text: str, reduced: bool, language: Optional[str]) -> str:
+        """The final summary prompt for *text*: partial summaries if *reduced*."""
+        template = REDUCE_PROMPT if reduced else PROMPT
+        return template.format(transcript=text, target_language=language)
 
-        structured: Dict[NoteFormat, Type[BaseModel]] = {
-            NoteFormat.SOAP: SOAPNote,
-            NoteFormat.PKI_HL7_CDA: PKIHL7CDANote,
-            NoteFormat.THERAPY_ASSESSMENT: TherapyAssessmentNote,
-        }
+    async def acomplete_formats(
+        self, prompt: str, formats: List[NoteFormat]
+    ) -> Tuple[Dict[str, Any], str]:
+        """Answer a ready-made summary *prompt* in every format in *formats*.
 
-        if fmt in structured:
+        Returns ``(notes, strategy)`` with notes keyed by format value; the
+        strategy is ``"combined"`` if the combined schema produced any of them.
+        """
+        notes: Dict[str, Any] = {}
+        pending = list(formats)
+        strategy = "concurrent"
+        if len(pending) > 1 and settings.SUMMARY_MULTI_COMBINED:
+            combined = await self._acomplete_combined(prompt, tuple(pending))
+            if combined:
+                strategy = "combined"
+                for fmt, note in combined.items():
+                    notes[fmt.value] = note
+                pending = [fmt for fmt in pending if fmt not in combined]
+
+        results = await asyncio.gather(
+            *(self._acomplete(prompt, fmt) for fmt in pending)
+        )
+        notes.update({fmt.value: note for fmt, note in zip(pending, results)})
+        return notes, strategy
+
+    async def _acomplete_combined(
+        self, prompt: str, formats: Tuple[NoteFormat, ...]
+    ) -> Dict[NoteFormat, Any]:
+        """One structured call for several formats; returns the non-empty notes."""
+        model_cls = combined_note_model(formats)
+        instructions = COMBINED_INSTRUCTIONS.format(
+            formats=", ".join(f'"{COMBINED_FIELDS[f]}" ({f.value})' for f in formats)
+        )
+        try:
+            sllm = self.llm.as_structured_llm(model_cls)
+            resp = await self._acall(sllm.acomplete, prompt + instructions)
+            if not resp or not getattr(resp, "raw", None):
+                return {}
+            combined = model_cls.model_validate(resp.raw)
+        except Exception:
+            return {}
+        return self._split_combined(combined, formats)
+
+    def _split_combined(
+        self, combined: BaseModel, formats: Tuple[NoteFormat, ...]
+    ) -> Dict[NoteFormat, Any]:
+        # Per-format notes from a combined response, dropping empty ones.
+        notes: Dict[NoteFormat, Any] = {}
+        for fmt in formats:
+            value = getattr(combined, COMBINED_FIELDS[fmt], None)
+            if isinstance(value, BaseModel):
+                value = self._nullify_empty_strings(value.model_dump())
+                if not any(v is not None for v in value.values()):
+                    continue
+            if value:
+                notes[fmt] = value
+        return notes
+
+    def summarize(
+        self,
+        transcript: Any,
+        fmt: NoteFormat,
+        language: Optional[str] = None,
+        mode: SummaryMode = SummaryMode.AUTO,
+    ) -> Any:
+        text, budget = self._prepare(transcript, mode)
+        if budget is not None:
+            partials = self._map_reduce_text(transcript, budget)
+            prompt = REDUCE_PROMPT.format(transcript=partials, target_language=language)
+        else:
+            prompt = PROMPT.format(transcript=text, target_language=language)
+        return self._complete(prompt, fmt)
+
+    async def asummarize(
+        self,
+        transcript: Any,
+        fmt: NoteFormat,
+        language: Optional[str] = None,
+        mode: SummaryMode = SummaryMode.AUTO,
+    ) -> Any:
+        """Async :meth:`summarize` built on the LLM's ``acomplete`` APIs."""
+        text, budget = self._prepare(transcript, mode)
+        if budget is not None:
+            partials = await self._amap_reduce_text(transcript, budget)
+            prompt = REDUCE_PROMPT.format(transcript=partials, target_language=language)
+        else:
+            prompt = PROMPT.format(transcript=text, target_language=language)
+        return await self._acomplete(prompt, fmt)
+
+    async def astream_text(
+        self,
+        transcript: Any,
+        language: Optional[str] = None,
+        mode: SummaryMode = SummaryMode.AUTO,
+    ) -> AsyncIterator[str]:
+        """Yield a TEXT note as token deltas via the LLM's streaming API.
+
+        In map-reduce mode the partial summaries are produced first; only the
+        final reduce call is streamed. The in-flight slot is held for the
+        whole stream.
+        """
+        text, budget = self._prepare(transcript, mode)
+        if budget is not None:
+            partials = await self._amap_reduce_text(transcript, budget)
+            prompt = REDUCE_PROMPT.format(transcript=partials, target_language=language)
+        else:
+            prompt = PROMPT.format(transcript=text, target_language=language)
+
+        parts: List[str] = []
+        async with _get_in_flight().ahold():
+            with self._instrumented(prompt):
+                stream = await self.llm.astream_complete(prompt)
+                async for chunk in stream:
+                    if chunk.delta:
+                        parts.append(chunk.delta)
+                        yield chunk.delta
+        if parts:
+            LLM_TOKENS.labels(direction="completion").inc(
+                self._count_tokens("".join(parts))
+            )
+
+    def _complete(self, prompt: str, fmt: NoteFormat) -> Any:
+        """Ask the LLM for *fmt*: plain text, or a validated structured note."""
+        if fmt in STRUCTURED_FORMATS:
+            model_cls = STRUCTURED_FORMATS[fmt]
             try:
-                sllm = self.llm.as_structured_llm(structured[fmt])
-                resp = sllm.complete(prompt)
+                sllm = self.llm.as_structured_llm(model_cls)
+                resp = self._call(sllm.complete, prompt)
             except Exception:
-                return {
-                    "detail": (
-                        "Selected model cannot produce the requested structured format. "
-                        "Try a different format or a stronger model."
-                    )
-                }
-            if resp and getattr(resp, "raw", None):
-                payload = structured[fmt].model_validate(resp.raw).model_dump()
-                return self._nullify_empty_strings(payload)
-            return None
+                return dict(STRUCTURED_UNSUPPORTED)
+            return self._structured_payload(model_cls, resp)
+
+        resp = self._call(self.llm.complete, prompt)
+        return resp.text if resp else None
+
+    async def _acomplete(self, prompt: str, fmt: NoteFormat) -> Any:
+        if fmt in STRUCTURED_FORMATS:
+            model_cls = STRUCTURED_FORMATS[fmt]
+            try:
+                sllm = self.llm.as_structured_llm(model_cls)
+                resp = await self._acall(sllm.acomplete, prompt)
+            except Exception:
+                return dict(STRUCTURED_UNSUPPORTED)
+            return self._structured_payload(model_cls, resp)
 
-        resp = self.llm.complete(prompt)
+        resp = await self._acall(self.llm.acomplete, prompt)
         return resp.text if resp else None
+
+    def _structured_payload(self, model_cls: Type[BaseModel], resp: Any) -> Any:
+        if resp and getattr(resp, "raw", None):
+            payload = model_cls.model_validate(resp.raw).model_dump()
+            return self._nullify_empty_strings(payload)
+        return None
+
+
+class _ChunkPacker:
+    """Collects transcript units and packs them into map chunks as they arrive.
+
+    With a *budget*, each chunk of at most that many tokens goes to *emit* as
+    soon as the next unit would overflow it, so a chunk is only emitted once
+    the transcript exceeds one call's budget, i.e. once map-reduce is
+    certain. Units over the budget on their own are split with *split*.
+    Without one (single-call mode) units are only collected.
+    """
+
+    def __init__(
+        self,
+        budget: Optional[int],
+        count_tokens: Callable[[str], int],
+        split: Callable[[List[str], int], List[str]],
+        emit: Callable[[str], None],
+    ) -> None:
+        self.budget = budget
+        self.units: List[str] = []
+        self._count_tokens = count_tokens
+        self._split = split
+        self._emit = emit
+        self._current: List[str] = []
+        self._used = 0
+
+    def add(self, unit: str) -> None:
+        self.units.append(unit)
+        if self.budget is None:
+            return
+        cost = self._count_tokens(unit) + 1
+        if self._current and self._used + cost > self.budget:
+            self.flush()
+        if cost > self.budget:
+            for piece in self._split([unit], self.budget):
+                self._emit(piece)
+            return
+        self._current.append(unit)
+        self._used += cost
+
+    def flush(self) -> None:
+        if self._current:
+            self._emit(" ".join(self._current))
+            self._current, self._used = [], 0
+
+
+def _segment_texts(segments: List[dict]) -> Iterator[str]:
+    for seg in segments:
+        unit = str(seg.get("text", "")).strip()
+        if unit:
+            yield unit
+
+
+def _cancel_all(tasks: List["asyncio.Task[str]"]) -> None:
+    for task in tasks:
+        task.cancel()
+
+
+def _cacheable(note: Any) -> bool:
+    # Empty results and the "cannot produce this format" notice are not cached.
+    return bool(note) and note != STRUCTURED_UNSUPPORTED
+
+
+_summary_cache: Optional[TieredCache] = None
+_summary_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> Optional[TieredCache]:
+    """Return the summary cache, or None when both tiers are disabled."""
+    global _summary_cache
+    if not (settings.SUMMARY_CACHE_MAX_ENTRIES or settings.SUMMARY_CACHE_DIR):
+        return None
+    if _summary_cache is None:
+        with _summary_cache_lock:
+            if _summary_cache is None:
+                disk = None
+                if settings.SUMMARY_CACHE_DIR:
+                    disk = DiskCache(
+                        settings.SUMMARY_CACHE_DIR,
+                        max_bytes=settings.SUMMARY_CACHE_MAX_MB * 1024 * 1024,
+                    )
+                _summary_cache = TieredCache(
+                    MemoryCache(
+                        settings.SUMMARY_CACHE_MAX_ENTRIES,
+                        ttl=settings.SUMMARY_CACHE_TTL,
+                    ),
+                    disk,
+                    ttl=settings.SUMMARY_CACHE_TTL,
+                )
+    return _summary_cache
@@ -3,84 +3,504 @@
 # endpoint: raw transcription, optional alignment, and optional diarization.
 from __future__ import annotations
 
+import contextvars
 import os
-from typing import Tuple, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 import numpy as np
 from numpy.typing import NDArray
-import whisperx
 from django.conf import settings
 
+from api.services.audio import (
+    SAMPLE_RATE,
+    AudioSource,
+    iter_pcm,
+    iter_windows,
+    load_pcm,
+)
+from api.services.batching import get_batch_scheduler
+from api.services.cache import DiskCache, hash_chunks, make_key
+from api.services.longform import (
+    SegmentsCallback,
+    get_longform_transcriber,
+    shift_segments,
+)
+from api.services.metrics import AUDIO_SECONDS, record_cache, stage
+from api.services.preprocess import (
+    Route,
+    get_router,
+    preprocess_signature,
+    speech_seconds,
+    trim_silence,
+)
+from api.services.registry import (
+    diarization_key,
+    get_align_model,
+    get_diarization_pipeline,
+    get_registry,
+    get_whisper_model,
+    whisper_key,
+)
+
 
 class TranscriptionService:
     """A small façade around whisperx to keep the view clean.
 
-    The instance lazily loads models using configuration drawn from Django settings.
+    Models come from the process-wide registry, so constructing the service
+    per request is cheap once the configured checkpoints are resident.
     """
 
     def __init__(self) -> None:
         self.device = settings.WHISPER_DEVICE
-        # Preload primary model; this keeps behavior similar to the old service.
-        self.model = whisperx.load_model(
-            settings.WHISPER_MODEL,
-            device=self.device,
-            compute_type=settings.WHISPER_COMPUTE_TYPE,
-        )
+        self.model_key = whisper_key()
+        self.model = get_whisper_model()
 
     # ------------------------------------------------------------
     # Core operations
     # ------------------------------------------------------------
-    def transcribe(self, file_path: str) -> Tuple[dict, NDArray[np.float32]]:
-        """Transcribe the audio at *file_path* and return (result, audio_array).
+    def transcribe(
+        self, source: AudioSource, on_segments: Optional[SegmentsCallback] = None
+    ) -> Tuple[dict, NDArray[np.float32]]:
+        """Transcribe *source* (a path or an upload) and return (result, audio_array).
         The result is a dictionary as returned by whisperx for easy JSON emission.
         """
+        with stage("decode"):
+            audio = load_pcm(source)
+        return self._transcribe_loaded(audio, on_segments), audio
+
+    def choose_route(self, source: Union[AudioSource, NDArray[np.float32]]) -> Route:
+        """Pick the Whisper route for a whole request.
+
+        The router sees the speech duration of the entire recording, not of
+        one window. For a path or upload that means one extra decode pass
+        (no audio is kept), which only runs when WHISPER_ROUTES is set.
+        """
+        router = get_router()
+        if not router.routes:
+            return router.choose(0.0)
+        with stage("preprocess"):
+            if isinstance(source, np.ndarray):
+                seconds = speech_seconds(source)
+            else:
+                chunks = iter_pcm(source, settings.AUDIO_DECODE_CHUNK_SECONDS)
+                seconds = sum(speech_seconds(chunk) for chunk in chunks)
+        return router.choose(seconds)
+
+    def _transcribe_loaded(
+        self,
+        audio: NDArray[np.float32],
+        on_segments: Optional[SegmentsCallback] = None,
+        route: Optional[Route] = None,
+    ) -> dict:
+        route = route or self.choose_route(audio)
         try:
-            audio = whisperx.load_audio(file_path)
-            result = self.model.transcribe(
-                audio, batch_size=settings.WHISPER_BATCH_SIZE
-            )
-            return result, audio
+            with stage("transcribe"):
+                longform = get_longform_transcriber() if route.is_default else None
+                if longform is not None:
+                    windows = iter_windows(
+                        [audio], settings.WHISPER_LONGFORM_CHUNK_SECONDS
+                    )
+                    return longform.transcribe(windows, on_segments=on_segments)
+                result = self.transcribe_audio(audio, route=route)
+                if on_segments is not None:
+                    on_segments(result.get("segments", []))
+                return result
         except Exception as exc:  # pragma: no cover
             raise RuntimeError(f"Transcription error: {exc}") from exc
 
-    def align_transcription(self, transcription_result: dict, audio: NDArray[np.float32]) -> dict:
-        """Return a word-aligned transcription for the given *transcription_result*.
+    def transcribe_audio(
+        self,
+        audio: NDArray[np.float32],
+        language: Optional[str] = None,
+        route: Optional[Route] = None,
+    ) -> dict:
+        """Run Whisper on an in-memory *audio* array.
+
+        Long silences are trimmed first; segment times in the result refer
+        to *audio* as given. *route* is the request's route from
+        :meth:`choose_route`; without one the router decides from *audio*
+        alone, which is only right when *audio* is the whole recording.
+        With WHISPER_DYNAMIC_BATCHING on, calls on the default route have
+        their VAD segments batched together with those of concurrent requests.
         """
-        try:
-            model_a, metadata = whisperx.load_align_model(
-                language_code=transcription_result.get("language"),
-                device=self.device,
-            )
-            aligned = whisperx.align(
-                transcription_result["segments"],
-                model_a,
-                metadata,
-                audio,
-                self.device,
-                return_char_alignments=False,
+        with stage("preprocess"):
+            speech, offsets = trim_silence(audio)
+        seconds = len(speech) / SAMPLE_RATE
+        router = get_router()
+        route = route or router.choose(seconds)
+        AUDIO_SECONDS.inc(seconds)
+        started = time.perf_counter()
+        result = self._run_whisper(speech, language, route)
+        router.observe(route, seconds, time.perf_counter() - started)
+        return offsets.restore(result)
+
+    def _run_whisper(
+        self, audio: NDArray[np.float32], language: Optional[str], route: Route
+    ) -> dict:
+        if route.is_default:
+            scheduler = get_batch_scheduler()
+            if scheduler is not None:
+                return scheduler.transcribe(audio, language=language)
+            key, model = self.model_key, self.model
+        else:
+            key = whisper_key(route.model, compute_type=route.compute_type)
+            model = get_whisper_model(route.model, compute_type=route.compute_type)
+        with get_registry().lock(key):
+            return model.transcribe(
+                audio, batch_size=settings.WHISPER_BATCH_SIZE, language=language
             )
+
+    def transcribe_stream(
+        self,
+        source: AudioSource,
+        on_segments: Optional[SegmentsCallback] = None,
+        route: Optional[Route] = None,
+    ) -> dict:
+        """Transcribe *source* window by window without materializing it.
+
+        Audio is decoded in AUDIO_DECODE_CHUNK_SECONDS chunks and regrouped into
+        windows cut at quiet points; peak memory therefore depends on the
+        window size rather than the recording length. With long-form mode on,
+        windows are WHISPER_LONGFORM_CHUNK_SECONDS long and run in parallel.
+        The language detected on the first window is reused for the rest so
+        the merged transcript is consistent. *on_segments*, if given, receives
+        each window's (timeline-shifted) segments in order as they complete.
+        Every window uses the same *route* (by default, :meth:`choose_route`).
+        Long-form replicas run the default model, so other routes are
+        transcribed window by window instead.
+        """
+        route = route or self.choose_route(source)
+        chunks = iter_pcm(source, settings.AUDIO_DECODE_CHUNK_SECONDS)
+        return self.transcribe_chunks(chunks, on_segments, route)
+
+    def transcribe_chunks(
+        self,
+        chunks: Iterable[NDArray[np.float32]],
+        on_segments: Optional[SegmentsCallback] = None,
+        route: Optional[Route] = None,
+    ) -> dict:
+        """Like :meth:`transcribe_stream`, for PCM *chunks* decoded by the caller.
+
+        *route* should come from :meth:`choose_route` on the whole source;
+        without one the default model is used.
+        """
+        route = route or Route(settings.WHISPER_MODEL, settings.WHISPER_COMPUTE_TYPE)
+        try:
+            # Decoding is interleaved with inference here, so both count as
+            # the "transcribe" stage.
+            with stage("transcribe"):
+                longform = get_longform_transcriber() if route.is_default else None
+                if longform is not None:
+                    return longform.transcribe(
+                        iter_windows(chunks, settings.WHISPER_LONGFORM_CHUNK_SECONDS),
+                        on_segments=on_segments,
+                    )
+                windows = iter_windows(chunks, settings.AUDIO_STREAM_WINDOW_SECONDS)
+                return self._transcribe_windows(windows, route, on_segments)
+        except Exception as exc:  # pragma: no cover
+            raise RuntimeError(f"Transcription error: {exc}") from exc
+
+    def _transcribe_windows(
+        self,
+        windows: Iterable[Tuple[float, NDArray[np.float32]]],
+        route: Route,
+        on_segments: Optional[SegmentsCallback] = None,
+    ) -> dict:
+        segments: List[dict] = []
+        language: Optional[str] = None
+        for offset, window in windows:
+            result = self.transcribe_audio(window, language=language, route=route)
+            language = language or result.get("language")
+            shifted = shift_segments(result.get("segments", []), offset)
+            if on_segments is not None:
+                on_segments(shifted)
+            segments.extend(shifted)
+        return {"segments": segments, "language": language}
+
+    def align_transcription(
+        self, transcription_result: dict, audio: NDArray[np.float32]
+    ) -> dict:
+        """Return a word-aligned transcription for the given *transcription_result*."""
+        import whisperx
+
+        try:
+            with stage("align"):
+                model_a, metadata = get_align_model(
+                    transcription_result.get("language"), device=self.device
+                )
+                aligned = whisperx.align(
+                    transcription_result["segments"],
+                    model_a,
+                    metadata,
+                    audio,
+                    self.device,
+                    return_char_alignments=False,
+                )
             return aligned
         except Exception as exc:  # pragma: no cover
             raise RuntimeError(f"Alignment error: {exc}") from exc
 
     def perform_diarization(self, audio: NDArray[np.float32]) -> Any:
-        """Compute diarized segments for *audio* using whisperx' pipeline.
-        """
+        """Compute diarized segments for *audio* using whisperx' pipeline."""
         try:
-            diar = whisperx.DiarizationPipeline(
-                use_auth_token=settings.HF_API_KEY,
-                device=self.device,
-            )
-            return diar(audio)
+            with stage("diarize"):
+                diar = get_diarization_pipeline(self.device)
+                with get_registry().lock(diarization_key(self.device)):
+                    return diar(audio)
         except Exception as exc:  # pragma: no cover
             raise RuntimeError(f"Diarization error: {exc}") from exc
 
+    def start_diarization(self, audio: NDArray[np.float32]) -> Callable[[], Any]:
+        """Begin diarizing *audio* and return a callable that waits for the result.
+
+        Diarization only needs the waveform, so with DIARIZATION_CONCURRENT it
+        runs on the diarization worker while Whisper transcribes; otherwise it
+        runs when the result is requested.
+        """
+        if not settings.DIARIZATION_CONCURRENT:
+            return lambda: self.perform_diarization(audio)
+        ctx = contextvars.copy_context()
+        future = _get_diarization_executor().submit(
+            ctx.run, self.perform_diarization, audio
+        )
+        return future.result
+
+    def process(
+        self,
+        source: AudioSource,
+        align: bool = False,
+        perform_diarization: bool = False,
+        on_segments: Optional[SegmentsCallback] = None,
+    ) -> dict:
+        """Run transcription plus the optional alignment/diarization steps.
+
+        This is the full pipeline behind both the synchronous endpoint and the
+        background job workers. Plain transcription is streamed; alignment and
+        diarization need the whole waveform, so those requests decode it once
+        and diarize it concurrently with transcription (see
+        :meth:`start_diarization`).
+        *on_segments* receives raw transcript segments as soon as each chunk
+        is transcribed, before alignment/diarization run.
+        """
+        if not (align or perform_diarization):
+            return self.transcribe_stream(source, on_segments)
+
+        with stage("decode"):
+            audio = load_pcm(source)
+        return self.process_audio(audio, align, perform_diarization, on_segments)
+
+    def process_audio(
+        self,
+        audio: NDArray[np.float32],
+        align: bool = False,
+        perform_diarization: bool = False,
+        on_segments: Optional[SegmentsCallback] = None,
+        route: Optional[Route] = None,
+    ) -> dict:
+        """The :meth:`process` pipeline for audio that is already decoded."""
+        diarized = self.start_diarization(audio) if perform_diarization else None
+        result = self._transcribe_loaded(audio, on_segments, route)
+        if align:
+            result = self.align_transcription(result, audio)
+        if diarized is not None:
+            import whisperx
+
+            result = whisperx.assign_word_speakers(diarized(), result)
+        return result
+
+    def process_cached(
+        self,
+        source: AudioSource,
+        align: bool = False,
+        perform_diarization: bool = False,
+        on_segments: Optional[SegmentsCallback] = None,
+    ) -> Tuple[dict, str]:
+        """Like :meth:`process`, but backed by the content-addressed result cache.
+
+        Returns ``(result, cache_status)``. The status is ``"hit"`` for a cached
+        result, ``"partial"`` when a cached raw (or aligned) transcript was
+        reused and only the remaining steps ran, ``"miss"`` otherwise, and
+        ``"off"`` when TRANSCRIPT_CACHE_DIR is unset. Cached transcripts are
+        handed to *on_segments* in one call. Only transcripts made with the
+        default model are stored, so a result from a fallback route is never
+        served later as if WHISPER_MODEL had produced it.
+        """
+        result, status = self._process_cached(
+            source, align, perform_diarization, on_segments
+        )
+        record_cache("transcript", status)
+        return result, status
+
+    def _process_cached(
+        self,
+        source: AudioSource,
+        align: bool,
+        perform_diarization: bool,
+        on_segments: Optional[SegmentsCallback],
+    ) -> Tuple[dict, str]:
+        cache = get_transcript_cache()
+        if cache is None:
+            return self.process(source, align, perform_diarization, on_segments), "off"
+
+        with stage("hash"):
+            digest = content_hash(source)
+        key = transcript_cache_key(digest, align, perform_diarization)
+        cached = cache.get(key)
+        if cached is not None:
+            _replay(cached, on_segments)
+            return cached, "hit"
+
+        if not (align or perform_diarization):
+            route = self.choose_route(source)
+            result = self.transcribe_stream(source, on_segments, route)
+            if route.is_default:
+                cache.set(key, result)
+            return result, "miss"
+        return self._process_from_prefix(
+            cache, source, digest, align, perform_diarization, on_segments
+        )
+
+    def _process_from_prefix(
+        self,
+        cache: DiskCache,
+        source: AudioSource,
+        digest: str,
+        align: bool,
+        perform_diarization: bool,
+        on_segments: Optional[SegmentsCallback],
+    ) -> Tuple[dict, str]:
+        # Reuse the longest cached prefix of transcribe -> align -> diarize.
+        base, base_aligned = _cached_prefix(cache, digest, align, perform_diarization)
+        _replay(base, on_segments)
+        with stage("decode"):
+            audio = load_pcm(source)
+        diarized = self.start_diarization(audio) if perform_diarization else None
+        # A cached base was made by the default model, so results built on it
+        # may be stored; a fresh transcript only if the router kept it there.
+        status, store, writes = "partial", True, {}
+        if base is None:
+            status = "miss"
+            base, store = self._fresh_transcript(cache, digest, audio, on_segments)
+        result = base
+        if align and not base_aligned:
+            result = self.align_transcription(result, audio)
+            writes[transcript_cache_key(digest, True, False)] = result
+        if diarized is not None:
+            import whisperx
+
+            result = whisperx.assign_word_speakers(diarized(), result)
+        if store:
+            writes[transcript_cache_key(digest, align, perform_diarization)] = result
+            _store_all(cache, writes)
+        return result, status
+
+    def _fresh_transcript(
+        self,
+        cache: DiskCache,
+        digest: str,
+        audio: NDArray[np.float32],
+        on_segments: Optional[SegmentsCallback],
+    ) -> Tuple[dict, bool]:
+        """Transcribe *audio*, caching it if the default model made it.
+
+        Returns ``(result, stored)``; the raw transcript is cached right away
+        so it survives a failure in the steps that follow.
+        """
+        route = self.choose_route(audio)
+        result = self._transcribe_loaded(audio, on_segments, route)
+        if route.is_default:
+            cache.set(transcript_cache_key(digest, False, False), result)
+        return result, route.is_default
+
     # ------------------------------------------------------------
     # Housekeeping
     # ------------------------------------------------------------
-    def cleanup_file(self, file_path: str) -> None:
+    @staticmethod
+    def cleanup_file(file_path: str) -> None:
         if os.path.exists(file_path):
             try:
                 os.remove(file_path)
             except OSError:
                 pass
+
+
+# ------------------------------------------------------------
+# Content-addressed result cache
+# ------------------------------------------------------------
+_transcript_cache: Optional[DiskCache] = None
+_transcript_cache_lock = threading.Lock()
+_diarization_executor: Optional[ThreadPoolExecutor] = None
+_diarization_executor_lock = threading.Lock()
+
+
+def _get_diarization_executor() -> ThreadPoolExecutor:
+    # One worker: the shared pipeline is serialized by its registry lock anyway,
+    # and a single queue keeps diarization from competing with itself for cores.
+    global _diarization_executor
+    if _diarization_executor is None:
+        with _diarization_executor_lock:
+            if _diarization_executor is None:
+                _diarization_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="diarization"
+                )
+    return _diarization_executor
+
+
+def get_transcript_cache() -> Optional[DiskCache]:
+    """Return the on-disk transcript cache, or None if TRANSCRIPT_CACHE_DIR is unset."""
+    global _transcript_cache
+    if not settings.TRANSCRIPT_CACHE_DIR:
+        return None
+    if _transcript_cache is None:
+        with _transcript_cache_lock:
+            if _transcript_cache is None:
+                _transcript_cache = DiskCache(
+                    settings.TRANSCRIPT_CACHE_DIR,
+                    max_bytes=settings.TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024,
+                )
+    return _transcript_cache
+
+
+def content_hash(source: AudioSource) -> str:
+    """SHA-256 of the raw bytes of *source* (a path or an upload)."""
+    if isinstance(source, str):
+        with open(source, "rb") as fh:
+            return hash_chunks(iter(lambda: fh.read(1024 * 1024), b""))
+    return hash_chunks(source.chunks())
+
+
+def _cached_prefix(
+    cache: DiskCache, digest: str, align: bool, perform_diarization: bool
+) -> Tuple[Optional[dict], bool]:
+    """Return the longest cached prefix result and whether it is aligned."""
+    if align and perform_diarization:
+        aligned = cache.get(transcript_cache_key(digest, True, False))
+        if aligned is not None:
+            return aligned, True
+    return cache.get(transcript_cache_key(digest, False, False)), False
+
+
+def _replay(result: Optional[dict], on_segments: Optional[SegmentsCallback]) -> None:
+    # Cached transcripts reach *on_segments* in one call.
+    if result is not None and on_segments is not None:
+        on_segments(result.get("segments", []))
+
+
+def _store_all(cache: DiskCache, entries: Dict[str, dict]) -> None:
+    for key, value in entries.items():
+        cache.set(key, value)
+
+
+def transcript_cache_key(digest: str, align: bool, perform_diarization: bool) -> str:
+    return make_key(
+        "transcript",
+        digest,
+        settings.WHISPER_MODEL,
+        settings.WHISPER_COMPUTE_TYPE,
+        bool(align),
+        bool(perform_diarization),
+        preprocess_signature(),
+    )
@@ -0,0 +1,152 @@
+# Background model warm-up inside the server process.
+# Loading models at import time kept uvicorn from answering anything,
+# including liveness probes, until every checkpoint was read; a separate
+# warm-up process loaded them only to throw them away. Instead the server
+# starts right away and a background thread fills the shared registries,
+# with readiness reported separately from liveness.
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from api.services.metrics import REGISTRY
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+def _warm_llm() -> None:
+    # Imports the configured provider's integration and builds the shared
+    # client and tokenizer; no request is sent to the model.
+    from api.services.summarization import SummarizationService
+
+    SummarizationService()
+
+
+def warmup_tasks() -> List[Tuple[str, Callable[[], Any]]]:
+    """The loads requested by ``MODEL_PRELOAD`` and ``ALIGN_PRELOAD_LANGUAGES``.
+
+    Recognized ``MODEL_PRELOAD`` entries are ``whisper``, ``diarization`` and
+    ``llm``.
+    """
+    from api.services.registry import (
+        get_align_model,
+        get_diarization_pipeline,
+        get_whisper_model,
+    )
+
+    loaders: Dict[str, Callable[[], Any]] = {
+        "whisper": get_whisper_model,
+        "diarization": get_diarization_pipeline,
+        "llm": _warm_llm,
+    }
+    tasks = [
+        (kind, loaders[kind]) for kind in settings.MODEL_PRELOAD if kind in loaders
+    ]
+    for language_code in settings.ALIGN_PRELOAD_LANGUAGES:
+        tasks.append(
+            (f"align:{language_code}", lambda code=language_code: get_align_model(code))
+        )
+    return tasks
+
+
+class Warmup:
+    """Runs *tasks* one after another on a daemon thread.
+
+    The process is ready once every task has finished; a failed load is
+    reported but does not hold readiness back, since the model is loaded
+    again on first use.
+    """
+
+    def __init__(self, tasks: List[Tuple[str, Callable[[], Any]]]) -> None:
+        self._tasks = tasks
+        self._state: Dict[str, str] = {name: PENDING for name, _ in tasks}
+        self._errors: Dict[str, str] = {}
+        self._seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+        if not tasks:
+            self._done.set()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None or self._done.is_set():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="model-warmup", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        for name, load in self._tasks:
+            with self._lock:
+                self._state[name] = LOADING
+            started = time.perf_counter()
+            try:
+                load()
+                state = READY
+            except Exception as exc:
+                state = FAILED
+                with self._lock:
+                    self._errors[name] = str(exc)
+            with self._lock:
+                self._state[name] = state
+                self._seconds[name] = time.perf_counter() - started
+        self._done.set()
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        """Per-task state and load time, suitable for JSON emission."""
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "models": {
+                    name: {
+                        "state": state,
+                        "seconds": (
+                            round(self._seconds[name], 2)
+                            if name in self._seconds
+                            else None
+                        ),
+                        **(
+                            {"error": self._errors[name]}
+                            if name in self._errors
+                            else {}
+                        ),
+                    }
+                    for name, state in self._state.items()
+                },
+            }
+
+
+_warmup: Optional[Warmup] = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup() -> Warmup:
+    """Return the process-wide warm-up built from settings (not started)."""
+    global _warmup
+    if _warmup is None:
+        with _warmup_lock:
+            if _warmup is None:
+                _warmup = Warmup(warmup_tasks())
+    return _warmup
+
+
+REGISTRY.gauge(
+    "notetaker_ready",
+    "1 once background model warm-up has finished, else 0.",
+    fn=lambda: 1 if _warmup is None or _warmup.ready else 0,
+)
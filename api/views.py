@@ -1,116 +1,787 @@
-from typing import Any, Dict
+import asyncio
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, List, Optional, Tuple
 
-from django.http import JsonResponse
+from django.http import (
+    FileResponse,
+    HttpRequest,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.conf import settings
+from django.urls import reverse
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.request import Request
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework import status
 
+from api.models import TranscriptionBatch, TranscriptionJob
+from api.services.batching import get_batch_scheduler
+from api.services.bulk import expand_inputs, read_manifest
 from api.serializers import (
+    MultiSummaryRequestSerializer,
     TranscriptionRequestSerializer,
     SummaryRequestSerializer,
 )
+from api.services.jobs import QueueFullError, get_batch_runner, get_job_queue
+from api.services.preprocess import get_router
+from api.services.metrics import (
+    REGISTRY,
+    SUMMARY_TTFT,
+    current_timings,
+    record_cache,
+    stage,
+)
+from api.services.registry import get_align_cache, get_registry
+from api.services.serialization import JsonStreamingResponse, loads
+from api.services.enums import NoteFormat, SummaryMode
+from api.services.layout import LAYOUTS, NESTED, apply_layout
 from api.services.transcription import TranscriptionService
-from api.services.summarization import SummarizationService, NoteFormat
+
+if TYPE_CHECKING:
+    # The LLM stack is imported on the first summarization request, so the
+    # process can serve health checks and transcription without it.
+    from api.services.summarization import SummarizationService
+
+
+ACCEPTED_AUDIO_TYPES = (
+    "audio/mpeg",
+    "audio/wav",
+    "audio/x-wav",
+    "audio/x-m4a",
+)
+
+
+def _parse_transcription_request(request: HttpRequest):
+    """Validate the upload and flags shared by the transcription endpoints.
+
+    Returns `(file, align, perform_diarization)` on success or a JsonResponse
+    describing the problem.
+    """
+    # Parse flags from query or body (mirroring the previous API contract).
+    # Plain Django requests (async views) carry them in GET/POST instead.
+    query = getattr(request, "query_params", request.GET)
+    body = getattr(request, "data", request.POST)
+    opts = TranscriptionRequestSerializer(data=query or body)
+    opts.is_valid(raise_exception=True)
+    align = bool(opts.validated_data.get("align", False))
+    do_diar = bool(opts.validated_data.get("perform_diarization", False))
+
+    file = request.FILES.get("audio_file")
+    if not file:
+        return JsonResponse(
+            {"detail": "Missing file part 'audio_file'."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if file.content_type not in ACCEPTED_AUDIO_TYPES:
+        return JsonResponse(
+            {"detail": "Invalid file type. Accepted types are mp3, wav, m4a."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return file, align, do_diar
+
+
+def _transcript_layout(request: HttpRequest):
+    """`layout` from the query or form: `nested` (default) or `columnar`.
+
+    Returns the layout or a 400 JsonResponse.
+    """
+    query = getattr(request, "query_params", request.GET)
+    body = getattr(request, "data", request.POST)
+    layout = query.get("layout") or body.get("layout") or NESTED
+    if layout not in LAYOUTS:
+        return JsonResponse(
+            {"detail": f"Unknown layout. Accepted layouts are {', '.join(LAYOUTS)}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return layout
 
 
 class TranscribeView(APIView):
-    '''POST /routes/v1/note/transcribe
+    """POST /routes/v1/note/transcribe
 
     Accepts an audio file as `audio_file` and optional flags `align` and
-    `perform_diarization`. Returns the raw/aligned/diarized transcription JSON.
-    '''
+    `perform_diarization`. Returns the raw/aligned/diarized transcription JSON
+    plus `cache`: hit | partial | miss | off for the content-addressed cache.
+    `layout=columnar` returns the transcript as parallel arrays (see
+    api.services.layout) instead of nested segment and word dicts.
+    """
+
+    parser_classes = (MultiPartParser, FormParser, JSONParser)
+
+    def post(self, request: Request):
+        # Reading FILES is where Django spools the upload to memory/temp file.
+        with stage("upload"):
+            parsed = _parse_transcription_request(request)
+        if isinstance(parsed, JsonResponse):
+            return parsed
+        file, align, do_diar = parsed
+        layout = _transcript_layout(request)
+        if isinstance(layout, JsonResponse):
+            return layout
+
+        svc = TranscriptionService()
+        try:
+            # Decode straight from the upload; no shared /tmp path to collide on.
+            result, cache_status = svc.process_cached(
+                file, align=align, perform_diarization=do_diar
+            )
+            return JsonStreamingResponse(
+                {"transcript": apply_layout(result, layout), "cache": cache_status},
+                status=status.HTTP_200_OK,
+            )
+        except Exception as exc:  # pragma: no cover
+            return JsonResponse(
+                {"detail": f"Transcription failed: {exc}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class TranscriptionJobCreateView(APIView):
+    """POST /routes/v1/note/transcribe/jobs
+
+    Same input as `/note/transcribe`, but returns `202 { "job_id": ... }`
+    immediately and processes the upload on the background worker pool.
+    Responds 503 with `Retry-After` when the queue is full.
+    """
+
+    parser_classes = (MultiPartParser, FormParser, JSONParser)
+
+    def post(self, request: Request):
+        parsed = _parse_transcription_request(request)
+        if isinstance(parsed, JsonResponse):
+            return parsed
+        file, align, do_diar = parsed
+
+        try:
+            job = get_job_queue().submit(file, align=align, perform_diarization=do_diar)
+        except QueueFullError as exc:
+            response = JsonResponse(
+                {"detail": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            response["Retry-After"] = str(settings.TRANSCRIPTION_JOB_RETRY_AFTER)
+            return response
+
+        response = JsonResponse(job.to_dict(), status=status.HTTP_202_ACCEPTED)
+        response["Location"] = reverse("transcription-job", args=[job.id])
+        return response
+
+
+class TranscriptionJobDetailView(APIView):
+    """GET /routes/v1/note/transcribe/jobs/<job_id>
+
+    Reports the job status and timestamps (and the error, if it failed).
+    """
+
+    def get(self, request: Request, job_id):
+        job = TranscriptionJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return JsonResponse(
+                {"detail": "Job not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+        return JsonResponse(job.to_dict(), status=status.HTTP_200_OK)
+
+
+class TranscriptionJobResultView(APIView):
+    """GET /routes/v1/note/transcribe/jobs/<job_id>/result
+
+    Returns `{ "transcript": ... }` once the job succeeded (`?layout=columnar`
+    as in `/note/transcribe`); 409 while it is still queued/running or if it
+    failed.
+    """
+
+    def get(self, request: Request, job_id):
+        layout = _transcript_layout(request)
+        if isinstance(layout, JsonResponse):
+            return layout
+        job = TranscriptionJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return JsonResponse(
+                {"detail": "Job not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+        if job.status != TranscriptionJob.Status.SUCCEEDED:
+            return JsonResponse(
+                {"detail": f"Job is {job.status}.", **job.to_dict()},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return JsonStreamingResponse(
+            {"transcript": apply_layout(job.result, layout)}, status=status.HTTP_200_OK
+        )
+
+
+def _batch_inputs(data) -> Any:
+    """Expand the server-side `paths`, `directory` and `manifest` of a batch.
+
+    Returns a list of files, or a JsonResponse when a path is outside
+    BATCH_INPUT_ROOT (or server-side paths are disabled).
+    """
+    items = _batch_paths(data)
+    if not items:
+        return []
+    root = settings.BATCH_INPUT_ROOT
+    if not root:
+        return JsonResponse(
+            {
+                "detail": "Server-side paths are disabled; "
+                "set BATCH_INPUT_ROOT or upload files."
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    root = os.path.realpath(root)
+    outside = [item for item in items if not _under(root, item)]
+    if outside:
+        return JsonResponse(
+            {"detail": f"Path is outside BATCH_INPUT_ROOT: {outside[0]}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    manifest = data.get("manifest")
+    try:
+        listed = read_manifest(manifest) if manifest else []
+    except (OSError, ValueError, KeyError) as exc:
+        return JsonResponse(
+            {"detail": f"Could not read manifest: {exc}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    files = expand_inputs([p for p in items if p != manifest] + listed)
+    if not all(_under(root, f) for f in files):
+        return JsonResponse(
+            {"detail": "Manifest lists paths outside BATCH_INPUT_ROOT."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return files
+
+
+def _batch_paths(data) -> List[str]:
+    # `paths` may be repeated form fields or a JSON string/list.
+    if hasattr(data, "getlist"):
+        items = data.getlist("paths")
+    else:
+        paths = data.get("paths") or []
+        items = [paths] if isinstance(paths, str) else list(paths)
+    return items + [data[key] for key in ("directory", "manifest") if data.get(key)]
+
+
+def _under(root: str, path: str) -> bool:
+    return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+
+class TranscriptionBatchCreateView(APIView):
+    """POST /routes/v1/note/transcribe/batch
+
+    Bulk transcription. Accepts any mix of uploaded `audio_files` (multipart,
+    repeated) and server-side `paths`, `directory` or `manifest` (one path
+    per line, or JSONL with `path`) under BATCH_INPUT_ROOT, plus the usual
+    `align` and `perform_diarization` flags. Returns `202` with the batch
+    status; results are appended to a JSONL file as files finish.
+    """
 
     parser_classes = (MultiPartParser, FormParser, JSONParser)
 
     def post(self, request: Request):
-        # Parse flags from query or body (mirroring the previous API contract)
         opts = TranscriptionRequestSerializer(data=request.query_params or request.data)
         opts.is_valid(raise_exception=True)
-        align = bool(opts.validated_data.get("align", False))
-        do_diar = bool(opts.validated_data.get("perform_diarization", False))
-
-        file = request.FILES.get("audio_file")
-        if not file:
+        uploads = request.FILES.getlist("audio_files")
+        for upload in uploads:
+            if upload.content_type not in ACCEPTED_AUDIO_TYPES:
+                return JsonResponse(
+                    {
+                        "detail": f"Invalid file type for {upload.name}. "
+                        "Accepted types are mp3, wav, m4a."
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        inputs = _batch_inputs(request.data)
+        if isinstance(inputs, JsonResponse):
+            return inputs
+        if not inputs and not uploads:
             return JsonResponse(
-                {"detail": "Missing file part 'audio_file'."},
+                {"detail": "Provide audio_files, paths, directory or manifest."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if file.content_type not in [
-            "audio/mpeg",
-            "audio/wav",
-            "audio/x-wav",
-            "audio/x-m4a",
-        ]:
+        batch = get_batch_runner().submit(
+            inputs,
+            uploads,
+            align=bool(opts.validated_data.get("align", False)),
+            perform_diarization=bool(
+                opts.validated_data.get("perform_diarization", False)
+            ),
+        )
+        response = JsonResponse(batch.to_dict(), status=status.HTTP_202_ACCEPTED)
+        response["Location"] = reverse("transcription-batch", args=[batch.id])
+        return response
+
+
+class TranscriptionBatchDetailView(APIView):
+    """GET /routes/v1/note/transcribe/batch/<batch_id>
+
+    Reports progress (completed/skipped/failed of total) and throughput in
+    audio-hours per hour.
+    """
+
+    def get(self, request: Request, batch_id):
+        batch = TranscriptionBatch.objects.filter(pk=batch_id).first()
+        if batch is None:
             return JsonResponse(
-                {"detail": "Invalid file type. Accepted types are mp3, wav, m4a."},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"detail": "Batch not found."}, status=status.HTTP_404_NOT_FOUND
             )
+        return JsonResponse(batch.to_dict(), status=status.HTTP_200_OK)
 
-        tmp_path = f"/tmp/{file.name}"
-        with open(tmp_path, "wb") as fh:
-            for chunk in file.chunks():
-                fh.write(chunk)
 
-        svc = TranscriptionService()
-        try:
-            result, audio = svc.transcribe(tmp_path)
-            if align:
-                result = svc.align_transcription(result, audio)
-            if do_diar:
-                import whisperx
-                diar = svc.perform_diarization(audio)
-                result = whisperx.assign_word_speakers(diar, result)
-
-            return JsonResponse({"transcript": result}, status=status.HTTP_200_OK, safe=False)
-        except Exception as exc:  # pragma: no cover
+class TranscriptionBatchResultView(APIView):
+    """GET /routes/v1/note/transcribe/batch/<batch_id>/result
+
+    Streams the JSONL results written so far, one line per file.
+    """
+
+    def get(self, request: Request, batch_id):
+        batch = TranscriptionBatch.objects.filter(pk=batch_id).first()
+        if batch is None:
             return JsonResponse(
-                {"detail": f"Transcription failed: {exc}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                {"detail": "Batch not found."}, status=status.HTTP_404_NOT_FOUND
             )
-        finally:
-            svc.cleanup_file(tmp_path)
+        if not os.path.exists(batch.output_path):
+            return JsonResponse(
+                {
+                    "detail": f"Batch is {batch.status}; no results yet.",
+                    **batch.to_dict(),
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+        return FileResponse(
+            open(batch.output_path, "rb"), content_type="application/x-ndjson"
+        )
+
+
+def _summary_options(query) -> Tuple[NoteFormat, SummaryMode]:
+    """Read `format` and `mode` from the query string, with lenient defaults."""
+    fmt_str = query.get("format", NoteFormat.TEXT.value)
+
+    # Normalize the requested format; default to TEXT when unknown
+    try:
+        fmt = NoteFormat(fmt_str)
+    except Exception:
+        fmt = NoteFormat.TEXT
+
+    # Map-reduce over chunks kicks in automatically for long transcripts;
+    # `mode=single|hierarchical` forces one path.
+    try:
+        mode = SummaryMode(query.get("mode", SummaryMode.AUTO.value))
+    except ValueError:
+        mode = SummaryMode.AUTO
+    return fmt, mode
+
 
+def _parse_json_body(request: HttpRequest, serializer_cls):
+    """Decode the JSON body and validate it with *serializer_cls*.
 
-class SummarizeView(APIView):
-    '''POST /routes/v1/note/summarize
+    Returns the validated data or a 400 JsonResponse shaped like DRF's.
+    """
+    try:
+        data = loads(request.body or b"{}")
+    except ValueError as exc:
+        return JsonResponse(
+            {"detail": f"JSON parse error - {exc}"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    body = serializer_cls(data=data)
+    if not body.is_valid():
+        return JsonResponse(body.errors, status=status.HTTP_400_BAD_REQUEST)
+    return body.validated_data
+
+
+def _language_hint(transcript_obj: Any):
+    # If the transcript dict has a language hint, pass it through
+    if isinstance(transcript_obj, dict):
+        return transcript_obj.get("language")
+    return None
+
+
+def _wants_stream(request: HttpRequest) -> bool:
+    if request.GET.get("stream", "").lower() in ("1", "true", "yes"):
+        return True
+    return "text/event-stream" in request.headers.get("Accept", "")
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_note(
+    svc: "SummarizationService",
+    transcript_obj: Any,
+    language: Any,
+    mode: SummaryMode,
+    started: float,
+) -> AsyncIterator[str]:
+    """Server-sent events for a streamed TEXT note.
+
+    Emits `token` events with `{"delta"}` as the model produces them and a
+    final `done` event with the complete `{"note", "ttft_ms", "cache"}`; a
+    cached note is sent as a single `done` event. Failures end the stream
+    with an `error` event carrying `{"detail"}`.
+    """
+    cache, key, cached = await _lookup_text_note(svc, transcript_obj, language, mode)
+    if cached is not None:
+        yield _sse("done", {"note": cached, "ttft_ms": None, "cache": "hit"})
+        return
+
+    parts = []
+    ttft = None
+    try:
+        async for delta in svc.astream_text(
+            transcript_obj, language=language, mode=mode
+        ):
+            if ttft is None:
+                ttft = time.perf_counter() - started
+                SUMMARY_TTFT.observe(ttft)
+            parts.append(delta)
+            yield _sse("token", {"delta": delta})
+    except Exception as exc:
+        yield _sse("error", {"detail": f"An error occurred: {exc}"})
+        return
+    yield await _finish_text_note(cache, key, "".join(parts), ttft)
+
+
+async def _finish_text_note(
+    cache: Any, key: str, note: str, ttft: Optional[float]
+) -> str:
+    # The closing event of a streamed note: `done` (storing the note) or `error`.
+    if not note:
+        return _sse("error", {"detail": "Failed to generate a summary."})
+    if cache is not None:
+        await asyncio.to_thread(cache.set, key, note)
+    return _sse(
+        "done",
+        {
+            "note": note,
+            "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+            "cache": "miss" if cache is not None else "off",
+        },
+    )
+
+
+async def _lookup_text_note(
+    svc: "SummarizationService", transcript_obj: Any, language: Any, mode: SummaryMode
+) -> Tuple[Any, str, Optional[str]]:
+    # Returns (cache, key, cached note); the cache is None when disabled.
+    from api.services.summarization import get_summary_cache
+
+    cache = get_summary_cache()
+    key = svc.cache_key(transcript_obj, NoteFormat.TEXT, language, mode)
+    if cache is None:
+        return None, key, None
+    cached = await asyncio.to_thread(cache.get, key)
+    record_cache("summary", "hit" if cached is not None else "miss")
+    return cache, key, cached
+
+
+class SummarizeView(View):
+    """POST /routes/v1/note/summarize
 
     Accepts JSON with a `transcript` field and optional `format` query param
-    specifying the note format. Returns `{ "note": ... }`.
-    '''
+    specifying the note format. Optional `mode` (auto | single | hierarchical)
+    controls map-reduce summarization of long transcripts. Returns
+    `{ "note": ..., "cache": "hit" | "miss" | "off" }`.
 
-    parser_classes = (JSONParser,)
+    This is a native async view: the LLM call is awaited on the event loop
+    instead of parking a thread, and in-flight LLM calls are capped per
+    process by LLM_MAX_IN_FLIGHT.
 
-    def post(self, request: Request):
-        body = SummaryRequestSerializer(data=request.data)
-        body.is_valid(raise_exception=True)
+    For the Text format, `?stream=true` or `Accept: text/event-stream` returns
+    server-sent events instead (see `_stream_note`); other formats ignore it.
+    """
 
-        transcript_obj = body.validated_data["transcript"]
-        fmt_str = request.query_params.get("format", NoteFormat.TEXT.value)
+    http_method_names = ["post", "options"]
 
-        # Normalize the requested format; default to TEXT when unknown
-        try:
-            fmt = NoteFormat(fmt_str)
-        except Exception:
-            fmt = NoteFormat.TEXT
+    async def post(self, request: HttpRequest):
+        started = time.perf_counter()
+        data = _parse_json_body(request, SummaryRequestSerializer)
+        if isinstance(data, JsonResponse):
+            return data
+        transcript_obj = data["transcript"]
+        fmt, mode = _summary_options(request.GET)
 
         try:
+            from api.services.summarization import SummarizationService
+
             svc = SummarizationService()
-            language = None
-            # If the transcript dict has a language hint, pass it through
-            if isinstance(transcript_obj, dict):
-                language = transcript_obj.get("language")
-            note = svc.summarize(transcript_obj, fmt=fmt, language=language)
+            language = _language_hint(transcript_obj)
+            if fmt == NoteFormat.TEXT and _wants_stream(request):
+                response = StreamingHttpResponse(
+                    _stream_note(svc, transcript_obj, language, mode, started),
+                    content_type="text/event-stream",
+                )
+                response["Cache-Control"] = "no-cache"
+                # Stop reverse proxies (nginx) from buffering the stream.
+                response["X-Accel-Buffering"] = "no"
+                return response
+            note, cache_status = await svc.asummarize_cached(
+                transcript_obj, fmt=fmt, language=language, mode=mode
+            )
             if not note:
                 return JsonResponse(
                     {"detail": "Failed to generate a summary."},
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 )
-            return JsonResponse({"note": note}, status=status.HTTP_200_OK, safe=False)
+            return JsonResponse(
+                {"note": note, "cache": cache_status},
+                status=status.HTTP_200_OK,
+                safe=False,
+            )
+        except Exception as exc:
+            return JsonResponse(
+                {"detail": f"An error occurred: {exc}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class MultiSummarizeView(View):
+    """POST /routes/v1/note/summarize/multi
+
+    Accepts JSON `{ "transcript": ..., "formats": ["Text", "SOAP", ...] }` and
+    optional `mode` query param. Returns every note from one request:
+    `{ "notes": {format: note}, "cache": {format: status}, "strategy": ... }`
+    where strategy is `combined` (one structured call for all formats),
+    `concurrent` (one call per format, in parallel) or `cache`.
+    """
+
+    http_method_names = ["post", "options"]
+
+    async def post(self, request: HttpRequest):
+        data = _parse_json_body(request, MultiSummaryRequestSerializer)
+        if isinstance(data, JsonResponse):
+            return data
+        try:
+            formats = [NoteFormat(f) for f in data["formats"]]
+        except ValueError:
+            accepted = ", ".join(f.value for f in NoteFormat)
+            return JsonResponse(
+                {"detail": f"Unknown format. Accepted formats are {accepted}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        transcript_obj = data["transcript"]
+        _, mode = _summary_options(request.GET)
+
+        try:
+            from api.services.summarization import SummarizationService
+
+            svc = SummarizationService()
+            notes, cache_status, strategy = await svc.asummarize_many(
+                transcript_obj,
+                formats,
+                language=_language_hint(transcript_obj),
+                mode=mode,
+            )
+            if not any(notes.values()):
+                return JsonResponse(
+                    {"detail": "Failed to generate a summary."},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                )
+            return JsonResponse(
+                {"notes": notes, "cache": cache_status, "strategy": strategy},
+                status=status.HTTP_200_OK,
+            )
         except Exception as exc:
             return JsonResponse(
                 {"detail": f"An error occurred: {exc}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+def _pipeline_formats(request: HttpRequest) -> List[NoteFormat]:
+    """`formats` as a comma-separated list from the query or form; defaults to Text."""
+    raw = (
+        request.GET.get("formats")
+        or request.POST.get("formats")
+        or NoteFormat.TEXT.value
+    )
+    return [NoteFormat(f.strip()) for f in raw.split(",") if f.strip()]
+
+
+async def _parse_pipeline_request(request: HttpRequest):
+    """Parse the pipeline's upload and options.
+
+    Returns `(file, align, perform_diarization, layout, formats, mode)` or a
+    400 JsonResponse.
+    """
+    with stage("upload"):
+        parsed = await asyncio.to_thread(_parse_transcription_request, request)
+    if isinstance(parsed, JsonResponse):
+        return parsed
+    layout = _transcript_layout(request)
+    if isinstance(layout, JsonResponse):
+        return layout
+    try:
+        formats = _pipeline_formats(request)
+    except ValueError:
+        accepted = ", ".join(f.value for f in NoteFormat)
+        return JsonResponse(
+            {"detail": f"Unknown format. Accepted formats are {accepted}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    _, mode = _summary_options(request.GET)
+    return (*parsed, layout, formats, mode)
+
+
+class PipelineView(View):
+    """POST /routes/v1/note/pipeline
+
+    Transcribes and summarizes one upload in a single request. Takes the same
+    multipart input as `/note/transcribe` plus `formats` (comma-separated note
+    formats, default `Text`), `mode` and `layout`. Returns `{ "transcript",
+    "notes", "cache": {"transcript", "notes"}, "strategy", "timings" }`.
+
+    Transcript segments are handed to the summarizer as each chunk finishes,
+    so map-phase LLM calls for long recordings run while later audio is still
+    being transcribed. `timings` reports per-stage milliseconds; stages that
+    overlap are timed separately, and `summarize_map` only counts the map work
+    left after transcription finished.
+    """
+
+    http_method_names = ["post", "options"]
+
+    async def post(self, request: HttpRequest):
+        started = time.perf_counter()
+        timings = current_timings()
+        parsed = await _parse_pipeline_request(request)
+        if isinstance(parsed, JsonResponse):
+            return parsed
+        file, align, do_diar, layout, formats, mode = parsed
+        try:
+            result, transcript_status, notes, notes_status, strategy = await self._run(
+                file, align, do_diar, formats, mode
+            )
+        except Exception as exc:
+            return JsonResponse(
+                {"detail": f"Pipeline failed: {exc}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        timings = dict(timings, total=time.perf_counter() - started)
+        return JsonStreamingResponse(
+            {
+                "transcript": apply_layout(result, layout),
+                "notes": {fmt.value: notes.get(fmt.value) for fmt in formats},
+                "cache": {"transcript": transcript_status, "notes": notes_status},
+                "strategy": strategy,
+                "timings": {
+                    f"{name}_ms": round(v * 1000, 1) for name, v in timings.items()
+                },
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    async def _run(
+        self,
+        file: Any,
+        align: bool,
+        do_diar: bool,
+        formats: List[NoteFormat],
+        mode: SummaryMode,
+    ) -> Tuple[dict, str, dict, dict, str]:
+        # Returns (transcript, its cache status, notes, their statuses, strategy).
+        from api.services.summarization import SummarizationService
+
+        loop = asyncio.get_running_loop()
+        segments: "asyncio.Queue[Any]" = asyncio.Queue()
+
+        def push(batch: List[dict]) -> None:
+            # Called from the transcription thread.
+            loop.call_soon_threadsafe(segments.put_nowait, batch)
+
+        async def batches() -> AsyncIterator[List[dict]]:
+            while (batch := await segments.get()) is not None:
+                yield batch
+
+        summarizer = SummarizationService()
+        map_task = asyncio.create_task(summarizer.amap_stream(batches(), mode))
+        try:
+            with stage("transcription"):
+                # The service is built in the worker thread too: it may have
+                # to load Whisper, which must not block the loop.
+                result, transcript_status = await asyncio.to_thread(
+                    lambda: TranscriptionService().process_cached(
+                        file, align=align, perform_diarization=do_diar, on_segments=push
+                    )
+                )
+            # Pushed batches were scheduled before the thread's result, so the
+            # end marker lands after all of them.
+            segments.put_nowait(None)
+            notes, notes_status, strategy = await self._summarize(
+                summarizer, map_task, result, formats, mode
+            )
+        finally:
+            # No-op once the map finished; otherwise stops its LLM calls on a
+            # cache hit or when any step above fails.
+            map_task.cancel()
+        return result, transcript_status, notes, notes_status, strategy
+
+    async def _summarize(
+        self,
+        summarizer: "SummarizationService",
+        map_task: "asyncio.Task[Tuple[str, bool]]",
+        result: dict,
+        formats: List[NoteFormat],
+        mode: SummaryMode,
+    ) -> Tuple[dict, dict, str]:
+        # Cached notes first; the rest are reduced from the streamed map.
+        language = result.get("language")
+        notes = await summarizer.aget_cached_many(
+            result, tuple(formats), language, mode
+        )
+        notes_status = {value: "hit" for value in notes}
+        pending = [fmt for fmt in dict.fromkeys(formats) if fmt.value not in notes]
+        if not pending:
+            return notes, notes_status, "cache"
+        with stage("summarize_map"):
+            text, reduced = await map_task
+        with stage("summarize_reduce"):
+            fresh, strategy = await summarizer.acomplete_formats(
+                summarizer.summary_prompt(text, reduced, language), pending
+            )
+        notes.update(fresh)
+        notes_status.update(
+            await summarizer.aset_cached_many(result, fresh, language, mode)
+        )
+        return notes, notes_status, strategy
+
+
+class ModelCacheStatsView(APIView):
+    """GET /routes/v1/models/cache
+
+    Reports hit/miss/eviction counters and resident size for the shared model
+    registry and the per-language alignment cache, to help size both. With
+    dynamic batching on, `batching` reports batch occupancy and queueing delay;
+    `routing` lists WHISPER_ROUTES with the real-time factor observed for each.
+    """
+
+    def get(self, request: Request):
+        scheduler = get_batch_scheduler()
+        return JsonResponse(
+            {
+                "models": get_registry().stats(),
+                "align": get_align_cache().stats(),
+                "batching": scheduler.stats() if scheduler is not None else None,
+                "routing": get_router().stats(),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class MetricsView(APIView):
+    """GET /routes/v1/metrics
+
+    Process metrics in the Prometheus text format: stage latency histograms,
+    audio seconds transcribed, model loads, cache hits, LLM tokens and queue
+    depths.
+    """
+
+    def get(self, request: Request):
+        return HttpResponse(
+            REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
@@ -0,0 +1,216 @@
+# WebSocket endpoints, served as a plain ASGI app next to Django's HTTP handler
+# (see notetaker/asgi.py); Django itself only speaks HTTP.
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from django.conf import settings
+
+from api.services.audio import (
+    AudioDecodeError,
+    SAMPLE_RATE,
+    StreamDecoder,
+    pcm16_to_float,
+)
+from api.services.live import AudioBacklog, LiveTranscriber
+from api.services.metrics import REGISTRY
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+LIVE_PATH = f"{settings.API_V1_STR.rstrip('/')}/note/transcribe/live"
+ENCODINGS = ("pcm_s16le", "opus")
+
+# Close codes (RFC 6455 and the application range).
+CLOSE_NORMAL = 1000
+CLOSE_POLICY = 1008
+CLOSE_ERROR = 1011
+CLOSE_TRY_AGAIN = 1013
+CLOSE_NOT_FOUND = 4404
+
+_active_sessions = 0
+
+REGISTRY.gauge(
+    "notetaker_live_sessions",
+    "Open live transcription sessions.",
+    fn=lambda: _active_sessions,
+)
+
+
+async def websocket_application(scope: Scope, receive: Receive, send: Send) -> None:
+    if scope["path"].rstrip("/") != LIVE_PATH:
+        await receive()  # websocket.connect
+        await send({"type": "websocket.close", "code": CLOSE_NOT_FOUND})
+        return
+    await live_transcription(scope, receive, send)
+
+
+async def live_transcription(scope: Scope, receive: Receive, send: Send) -> None:
+    """WS /routes/v1/note/transcribe/live
+
+    Query params: `encoding` (pcm_s16le | opus, default pcm_s16le),
+    `sample_rate` (raw PCM only, default 16000) and optional `language`.
+    Binary messages carry audio: raw mono s16le PCM, or a WebM/Ogg Opus stream
+    as produced by MediaRecorder. Send the text message `{"type": "stop"}` to
+    flush the last utterance. The server sends `partial` and `final` messages
+    (`{"type", "segments", "language"}`, segments as in `/note/transcribe`),
+    then `{"type": "done"}` before closing. At most LIVE_MAX_SESSIONS
+    sessions run per process; extra connections are closed with 1013. If
+    transcription falls more than LIVE_MAX_BACKLOG_SECONDS behind, the
+    oldest unprocessed audio is dropped and the utterance in progress is
+    finalized early.
+    """
+    global _active_sessions
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+
+    options = _live_options(scope)
+    if options is None:
+        await _close(
+            send,
+            CLOSE_POLICY,
+            f"Unsupported encoding or sample_rate; use {', '.join(ENCODINGS)}.",
+        )
+        return
+    if _active_sessions >= settings.LIVE_MAX_SESSIONS:
+        await _close(send, CLOSE_TRY_AGAIN, "Too many live sessions; retry later.")
+        return
+
+    encoding, sample_rate, language = options
+    _active_sessions += 1
+    decoder: Optional[StreamDecoder] = None
+    try:
+        # Building the service may load the Whisper model; keep the loop free.
+        session = await asyncio.to_thread(LiveTranscriber, language)
+        decoder = await _start_decoder(encoding, sample_rate)
+        await _run_session(receive, send, session, decoder)
+    except AudioDecodeError as exc:
+        await _close(send, CLOSE_POLICY, f"Audio decode failed: {exc}")
+    except Exception as exc:  # pragma: no cover
+        await _close(send, CLOSE_ERROR, f"Transcription failed: {exc}")
+    finally:
+        _active_sessions -= 1
+        if decoder is not None:
+            decoder.kill()
+
+
+def _live_options(scope: Scope) -> Optional[Tuple[str, int, Optional[str]]]:
+    """``(encoding, sample_rate, language)`` from the query, or None if unsupported."""
+    query = {
+        k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()
+    }
+    encoding = query.get("encoding", "pcm_s16le")
+    try:
+        sample_rate = int(query.get("sample_rate", SAMPLE_RATE))
+    except ValueError:
+        return None
+    if encoding not in ENCODINGS or sample_rate <= 0:
+        return None
+    return encoding, sample_rate, query.get("language") or None
+
+
+async def _start_decoder(encoding: str, sample_rate: int) -> Optional[StreamDecoder]:
+    # Raw PCM at the model's rate needs no ffmpeg; anything else is decoded.
+    if encoding == "opus":
+        decoder = StreamDecoder()
+    elif sample_rate != SAMPLE_RATE:
+        decoder = StreamDecoder(["-f", "s16le", "-ar", str(sample_rate), "-ac", "1"])
+    else:
+        return None
+    try:
+        await decoder.start()
+    except BaseException:
+        decoder.kill()
+        raise
+    return decoder
+
+
+async def _run_session(
+    receive: Receive,
+    send: Send,
+    session: LiveTranscriber,
+    decoder: Optional[StreamDecoder],
+) -> None:
+    # Frames are received on their own task so they never queue up inside the
+    # server while Whisper is busy; the backlog bounds what waits.
+    backlog = AudioBacklog(int(settings.LIVE_MAX_BACKLOG_SECONDS * SAMPLE_RATE))
+    reader = asyncio.create_task(_receive_audio(receive, decoder, backlog))
+    try:
+        while (pending := await backlog.take()) is not None:
+            dropped, pcm = pending
+            messages = await session.skip(dropped) if dropped else []
+            messages.extend(await session.push(pcm))
+            for out in messages:
+                await _send_json(send, out)
+        if not await reader:
+            return  # the client disconnected
+        for out in await session.finish():
+            await _send_json(send, out)
+        await _send_json(send, {"type": "done"})
+        await send({"type": "websocket.close", "code": CLOSE_NORMAL})
+    finally:
+        reader.cancel()
+
+
+async def _receive_audio(
+    receive: Receive, decoder: Optional[StreamDecoder], backlog: AudioBacklog
+) -> bool:
+    """Move client audio into *backlog* until stop (True) or disconnect (False)."""
+    carry = b""
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                backlog.close(discard=True)
+                return False
+            data = message.get("bytes")
+            if data:
+                carry = await _put_audio(data, carry, decoder, backlog)
+            elif _is_stop(message.get("text")):
+                break
+        if decoder is not None:
+            backlog.put(await decoder.close())
+        return True
+    finally:
+        backlog.close()
+
+
+async def _put_audio(
+    data: bytes, carry: bytes, decoder: Optional[StreamDecoder], backlog: AudioBacklog
+) -> bytes:
+    """Queue one binary frame; returns the odd byte held back from raw PCM."""
+    if decoder is not None:
+        await decoder.write(data)
+        backlog.put(decoder.take())
+        return b""
+    data = carry + data
+    carry = data[len(data) - len(data) % 2 :]
+    backlog.put(pcm16_to_float(data[: len(data) - len(carry)]))
+    return carry
+
+
+def _is_stop(text: Optional[str]) -> bool:
+    if not text:
+        return False
+    try:
+        return json.loads(text).get("type") == "stop"
+    except (ValueError, AttributeError):
+        return False
+
+
+async def _send_json(send: Send, data: Any) -> None:
+    await send({"type": "websocket.send", "text": json.dumps(data)})
+
+
+async def _close(send: Send, code: int, detail: str) -> None:
+    try:
+        await _send_json(send, {"type": "error", "detail": detail})
+        await send({"type": "websocket.close", "code": code})
+    except Exception:
+        pass  # the client is already gone
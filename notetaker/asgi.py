@@ -6,4 +6,26 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "notetaker.settings")
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from api.websocket import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Django handles HTTP; WebSocket connections (live transcription) go to
+    # the small ASGI app in api.websocket.
+    if scope["type"] == "websocket":
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
+
+
+# Start warming the shared model registries (MODEL_PRELOAD) in the background,
+# so the server answers health checks right away and reports readiness at
+# /ready once the models are resident, then start the job and batch workers so
+# work queued before a restart resumes.
+from api.services.jobs import get_batch_runner, get_job_queue  # noqa: E402
+from api.services.warmup import get_warmup  # noqa: E402
+
+get_warmup().start()
+get_job_queue().start()
+get_batch_runner().start()
@@ -24,6 +24,11 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     # Custom tiny CORS layer to match previous FastAPI behavior
     "api.middleware.SimpleCORSMiddleware",
+    # Global/per-client cost limits on the note endpoints (429 + Retry-After);
+    # inside the CORS layer so rejections still carry CORS headers
+    "api.middleware.AdmissionControlMiddleware",
+    # Per-stage durations of each request as a Server-Timing header
+    "api.middleware.ServerTimingMiddleware",
 ]
 
 ROOT_URLCONF = "notetaker.urls"
@@ -45,9 +50,14 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": str(BASE_DIR / "db.sqlite3"),
+        # Job workers and request threads share the file; wait out short locks.
+        "OPTIONS": {"timeout": 20},
     }
 }
 
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+USE_TZ = True
+
 STATIC_URL = "static/"
 
 # ---- CORS knobs (to mirror the old app/middlewares.py behavior) ----
@@ -69,9 +79,182 @@ WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "base")
 WHISPER_DEVICE = os.environ.get("WHISPER_DEVICE", "cpu")
 WHISPER_COMPUTE_TYPE = os.environ.get("WHISPER_COMPUTE_TYPE", "int8")
 WHISPER_BATCH_SIZE = int(os.environ.get("WHISPER_BATCH_SIZE", "8"))
+# Batch VAD segments from concurrent requests into shared WHISPER_BATCH_SIZE
+# batches, waiting at most WHISPER_BATCH_WAIT_MS for a batch to fill.
+WHISPER_DYNAMIC_BATCHING = (
+    os.environ.get("WHISPER_DYNAMIC_BATCHING", "False").lower() == "true"
+)
+WHISPER_BATCH_WAIT_MS = float(os.environ.get("WHISPER_BATCH_WAIT_MS", "20"))
+# CTranslate2 threads for the main Whisper model (0 keeps the whisperx default of 4).
+WHISPER_THREADS = int(os.environ.get("WHISPER_THREADS", "0"))
+
+# ---- Admission control (see api/services/admission.py) ----
+# Budgets in cost units: a request costs 1 plus 1 per
+# ADMISSION_AUDIO_SECONDS_PER_UNIT of estimated audio (upload size divided by
+# ADMISSION_AUDIO_BYTES_PER_SECOND, ~128 kbps MP3 by default) or per
+# ADMISSION_TRANSCRIPT_CHARS_PER_UNIT of transcript JSON.
+ADMISSION_CONTROL = os.environ.get("ADMISSION_CONTROL", "True").lower() == "true"
+ADMISSION_CAPACITY = float(os.environ.get("ADMISSION_CAPACITY", "16"))
+ADMISSION_CLIENT_CAPACITY = float(os.environ.get("ADMISSION_CLIENT_CAPACITY", "6"))
+ADMISSION_AUDIO_SECONDS_PER_UNIT = float(
+    os.environ.get("ADMISSION_AUDIO_SECONDS_PER_UNIT", "300")
+)
+ADMISSION_AUDIO_BYTES_PER_SECOND = int(
+    os.environ.get("ADMISSION_AUDIO_BYTES_PER_SECOND", "16000")
+)
+ADMISSION_TRANSCRIPT_CHARS_PER_UNIT = int(
+    os.environ.get("ADMISSION_TRANSCRIPT_CHARS_PER_UNIT", "20000")
+)
+# Request header identifying the client (e.g. X-Client-Id set by a gateway);
+# empty uses the peer address.
+ADMISSION_CLIENT_HEADER = os.environ.get("ADMISSION_CLIENT_HEADER", "")
+# Retry-After (seconds) until request durations have been observed.
+ADMISSION_RETRY_AFTER = int(os.environ.get("ADMISSION_RETRY_AFTER", "5"))
+
+# ---- Audio preprocessing and model routing (see api/services/preprocess.py) ----
+# Drop silent runs (30 ms frame RMS below the threshold) longer than
+# AUDIO_TRIM_MIN_SILENCE_SECONDS before Whisper, keeping AUDIO_TRIM_PAD_SECONDS
+# on each side; output timestamps still refer to the original audio. Off by
+# default: it changes what Whisper sees, so deployments opt in.
+AUDIO_TRIM_SILENCE = os.environ.get("AUDIO_TRIM_SILENCE", "False").lower() == "true"
+AUDIO_TRIM_THRESHOLD = float(os.environ.get("AUDIO_TRIM_THRESHOLD", "0.005"))
+AUDIO_TRIM_MIN_SILENCE_SECONDS = float(
+    os.environ.get("AUDIO_TRIM_MIN_SILENCE_SECONDS", "1.0")
+)
+AUDIO_TRIM_PAD_SECONDS = float(os.environ.get("AUDIO_TRIM_PAD_SECONDS", "0.25"))
+# Comma-separated `model[/compute_type][:max_speech_seconds]`, most preferred
+# first, e.g. "small:30,base:600,tiny/int8"; empty sends everything to
+# WHISPER_MODEL. The route is chosen once per request from the speech duration
+# of the whole recording. With a latency target, routes whose observed
+# real-time factor would exceed it for that speech are skipped.
+WHISPER_ROUTES = [
+    r.strip() for r in os.environ.get("WHISPER_ROUTES", "").split(",") if r.strip()
+]
+WHISPER_LATENCY_TARGET_SECONDS = float(
+    os.environ.get("WHISPER_LATENCY_TARGET_SECONDS", "0")
+)
+
+# ---- Diarization ----
+# Run diarization on its own worker while Whisper transcribes the same audio.
+DIARIZATION_CONCURRENT = (
+    os.environ.get("DIARIZATION_CONCURRENT", "True").lower() == "true"
+)
+# torch intra-op threads (0 keeps torch's default). torch's pool is shared by
+# the whole process, so diarization and alignment get one budget, set once
+# before the first torch model loads, next to Whisper's WHISPER_THREADS.
+TORCH_THREADS = int(os.environ.get("TORCH_THREADS", "0"))
+
+# ---- Streaming audio ingest ----
+# ffmpeg output is read in chunks of this many seconds of 16 kHz mono PCM...
+AUDIO_DECODE_CHUNK_SECONDS = float(os.environ.get("AUDIO_DECODE_CHUNK_SECONDS", "10"))
+# ...and regrouped into windows of about this length for plain transcription.
+AUDIO_STREAM_WINDOW_SECONDS = float(
+    os.environ.get("AUDIO_STREAM_WINDOW_SECONDS", "120")
+)
+
+# ---- Long-form parallel transcription ----
+# Whisper replicas transcribing quiet-point-delimited chunks concurrently;
+# 1 disables the mode. The model registry is sized to keep every replica.
+WHISPER_LONGFORM_WORKERS = int(os.environ.get("WHISPER_LONGFORM_WORKERS", "1"))
+# CTranslate2 threads per replica (0 keeps the whisperx default of 4).
+WHISPER_LONGFORM_THREADS = int(os.environ.get("WHISPER_LONGFORM_THREADS", "0"))
+WHISPER_LONGFORM_CHUNK_SECONDS = float(
+    os.environ.get("WHISPER_LONGFORM_CHUNK_SECONDS", "60")
+)
+
+# ---- Live transcription over WebSocket ----
+# Longest utterance buffered before it is cut at a quiet point and finalized;
+# bounds per-connection memory and the cost of each inference step.
+LIVE_WINDOW_SECONDS = float(os.environ.get("LIVE_WINDOW_SECONDS", "20"))
+# New audio between partial re-transcriptions of the utterance in progress.
+LIVE_PARTIAL_SECONDS = float(os.environ.get("LIVE_PARTIAL_SECONDS", "1.5"))
+# Trailing silence that ends an utterance.
+LIVE_SILENCE_SECONDS = float(os.environ.get("LIVE_SILENCE_SECONDS", "0.6"))
+# Frame RMS (float PCM, 0..1) above which the energy VAD counts speech.
+LIVE_VAD_THRESHOLD = float(os.environ.get("LIVE_VAD_THRESHOLD", "0.01"))
+LIVE_MAX_SESSIONS = int(os.environ.get("LIVE_MAX_SESSIONS", "8"))
+# Received audio allowed to wait for the transcriber; beyond it the oldest is
+# dropped, which bounds both latency and per-connection memory.
+LIVE_MAX_BACKLOG_SECONDS = float(os.environ.get("LIVE_MAX_BACKLOG_SECONDS", "5"))
+
+# ---- Content-addressed transcript cache (empty dir disables it) ----
+TRANSCRIPT_CACHE_DIR = os.environ.get(
+    "TRANSCRIPT_CACHE_DIR", "/tmp/notetaker-cache/transcripts"
+)
+TRANSCRIPT_CACHE_MAX_MB = int(os.environ.get("TRANSCRIPT_CACHE_MAX_MB", "1024"))
+
+# ---- Background transcription jobs (queue stored in DATABASES["default"]) ----
+TRANSCRIPTION_JOB_WORKERS = int(os.environ.get("TRANSCRIPTION_JOB_WORKERS", "2"))
+# Queued + running jobs accepted before POSTs are rejected with 503.
+TRANSCRIPTION_JOB_QUEUE_MAX = int(os.environ.get("TRANSCRIPTION_JOB_QUEUE_MAX", "16"))
+TRANSCRIPTION_JOB_RETRY_AFTER = int(
+    os.environ.get("TRANSCRIPTION_JOB_RETRY_AFTER", "30")
+)
+TRANSCRIPTION_JOB_DIR = os.environ.get("TRANSCRIPTION_JOB_DIR", "/tmp/notetaker-jobs")
+
+# ---- Bulk transcription (API batches and `manage.py transcribe_batch`) ----
+# Reader threads hashing (and, with align/diarize, decoding) upcoming files
+# while Whisper runs.
+BATCH_READERS = int(os.environ.get("BATCH_READERS", "2"))
+# Decoded audio readers may hold ahead of Whisper for align/diarize runs; plain
+# transcription streams each file instead (~230 MB of float32 per hour).
+BATCH_PREFETCH_SECONDS = float(os.environ.get("BATCH_PREFETCH_SECONDS", "3600"))
+BATCH_OUTPUT_DIR = os.environ.get("BATCH_OUTPUT_DIR", "/tmp/notetaker-batches")
+# Server-side paths accepted by the batch API must live under this directory;
+# empty allows uploads only.
+BATCH_INPUT_ROOT = os.environ.get("BATCH_INPUT_ROOT", "")
+
+# ---- Model registry (shared, process-wide) ----
+# Upper bound on resident whisper and diarization models (align models have
+# their own budget, ALIGN_CACHE_MAX_MODELS / ALIGN_CACHE_MAX_MB). Raised at
+# startup to fit the default model, WHISPER_ROUTES, the long-form replicas and
+# diarization, so this only adds room for models loaded on demand.
+MODEL_REGISTRY_MAX_MODELS = int(os.environ.get("MODEL_REGISTRY_MAX_MODELS", "4"))
+# Comma-separated kinds to load in the background after server startup:
+# whisper, diarization, llm (the configured provider's client and tokenizer).
+MODEL_PRELOAD = [
+    k.strip().lower()
+    for k in os.environ.get("MODEL_PRELOAD", "whisper,llm").split(",")
+    if k.strip()
+]
+
+# ---- Alignment model cache (per language, LRU within a memory budget) ----
+ALIGN_CACHE_MAX_MODELS = int(os.environ.get("ALIGN_CACHE_MAX_MODELS", "3"))
+ALIGN_CACHE_MAX_MB = int(os.environ.get("ALIGN_CACHE_MAX_MB", "2048"))
+ALIGN_PRELOAD_LANGUAGES = [
+    lang.strip()
+    for lang in os.environ.get("ALIGN_PRELOAD_LANGUAGES", "").split(",")
+    if lang.strip()
+]
 
 LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-4o-mini")
 USE_LOCAL_MODELS = os.environ.get("USE_LOCAL_MODELS", "False").lower() == "true"
+LLM_REQUEST_TIMEOUT = float(os.environ.get("LLM_REQUEST_TIMEOUT", "360"))
+# Keep-alive connections per shared LLM client (see summarization._get_llm).
+LLM_HTTP_POOL_SIZE = int(os.environ.get("LLM_HTTP_POOL_SIZE", "10"))
+# Concurrent LLM calls allowed per process, sync and async callers combined.
+LLM_MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", "8"))
+# Context size of a local (Ollama) model; 0 keeps the LlamaIndex default.
+LLM_CONTEXT_WINDOW = int(os.environ.get("LLM_CONTEXT_WINDOW", "0"))
+
+# ---- Map-reduce summarization of long transcripts ----
+# Share of the model's free context used per chunk; SUMMARY_CHUNK_TOKENS > 0
+# overrides the derived budget.
+SUMMARY_CHUNK_CONTEXT_FRACTION = float(
+    os.environ.get("SUMMARY_CHUNK_CONTEXT_FRACTION", "0.6")
+)
+SUMMARY_CHUNK_TOKENS = int(os.environ.get("SUMMARY_CHUNK_TOKENS", "0"))
+SUMMARY_MAP_CONCURRENCY = int(os.environ.get("SUMMARY_MAP_CONCURRENCY", "4"))
+# Ask for several formats in one structured call (falls back to one call each).
+SUMMARY_MULTI_COMBINED = (
+    os.environ.get("SUMMARY_MULTI_COMBINED", "True").lower() == "true"
+)
+
+# ---- Summary result cache (in-memory LRU, optional disk tier) ----
+SUMMARY_CACHE_MAX_ENTRIES = int(os.environ.get("SUMMARY_CACHE_MAX_ENTRIES", "256"))
+SUMMARY_CACHE_TTL = float(os.environ.get("SUMMARY_CACHE_TTL", "86400"))
+SUMMARY_CACHE_DIR = os.environ.get("SUMMARY_CACHE_DIR", "")
+SUMMARY_CACHE_MAX_MB = int(os.environ.get("SUMMARY_CACHE_MAX_MB", "256"))
 
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": ["rest_framework.renderers.JSONRenderer"],
@@ -2,18 +2,80 @@ from django.http import JsonResponse
 from django.urls import path
 from django.conf import settings
 
-from api.views import TranscribeView, SummarizeView
+from api.views import (
+    MetricsView,
+    ModelCacheStatsView,
+    MultiSummarizeView,
+    PipelineView,
+    SummarizeView,
+    TranscribeView,
+    TranscriptionBatchCreateView,
+    TranscriptionBatchDetailView,
+    TranscriptionBatchResultView,
+    TranscriptionJobCreateView,
+    TranscriptionJobDetailView,
+    TranscriptionJobResultView,
+)
+from api.services.warmup import get_warmup
 
 # Keep the external path shape identical to the previous app
 API_PREFIX = settings.API_V1_STR.rstrip("/")
 
 
 def health(_request):
+    # Liveness: the process is up, whether or not models are loaded yet.
     return JsonResponse({"status": "ok"})
 
 
+def ready(_request):
+    # Readiness: 503 until background model warm-up (MODEL_PRELOAD) is done.
+    warmup = get_warmup()
+    return JsonResponse(warmup.status(), status=200 if warmup.ready else 503)
+
+
 urlpatterns = [
     path(f"{API_PREFIX}/health", health, name="health"),
+    path(f"{API_PREFIX}/ready", ready, name="ready"),
     path(f"{API_PREFIX}/note/transcribe", TranscribeView.as_view(), name="transcribe"),
+    path(
+        f"{API_PREFIX}/note/transcribe/jobs",
+        TranscriptionJobCreateView.as_view(),
+        name="transcription-jobs",
+    ),
+    path(
+        f"{API_PREFIX}/note/transcribe/jobs/<uuid:job_id>",
+        TranscriptionJobDetailView.as_view(),
+        name="transcription-job",
+    ),
+    path(
+        f"{API_PREFIX}/note/transcribe/jobs/<uuid:job_id>/result",
+        TranscriptionJobResultView.as_view(),
+        name="transcription-job-result",
+    ),
+    path(
+        f"{API_PREFIX}/note/transcribe/batch",
+        TranscriptionBatchCreateView.as_view(),
+        name="transcription-batches",
+    ),
+    path(
+        f"{API_PREFIX}/note/transcribe/batch/<uuid:batch_id>",
+        TranscriptionBatchDetailView.as_view(),
+        name="transcription-batch",
+    ),
+    path(
+        f"{API_PREFIX}/note/transcribe/batch/<uuid:batch_id>/result",
+        TranscriptionBatchResultView.as_view(),
+        name="transcription-batch-result",
+    ),
     path(f"{API_PREFIX}/note/summarize", SummarizeView.as_view(), name="summarize"),
+    path(
+        f"{API_PREFIX}/note/summarize/multi",
+        MultiSummarizeView.as_view(),
+        name="summarize-multi",
+    ),
+    path(f"{API_PREFIX}/note/pipeline", PipelineView.as_view(), name="pipeline"),
+    path(f"{API_PREFIX}/metrics", MetricsView.as_view(), name="metrics"),
+    path(
+        f"{API_PREFIX}/models/cache", ModelCacheStatsView.as_view(), name="model-cache"
+    ),
 ]
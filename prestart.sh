@@ -7,7 +7,7 @@ else
     echo "Skipping model pull."
 fi
 
-python -u scripts/setup_transcription_models.py || true
+python manage.py migrate --noinput
 
 HOST=${HOST:-0.0.0.0}
 PORT=${PORT:-8001}
@@ -15,8 +15,11 @@ else
     echo "Skipping model pull."
 fi
 
-# Warm-up for whisperx
-poetry run python -u scripts/setup_transcription_models.py || true
+# Create/upgrade the SQLite tables backing the transcription job queue
+poetry run python manage.py migrate --noinput
+
+# Models are warmed up inside the server after startup (MODEL_PRELOAD);
+# readiness is reported at /routes/v1/ready.
 
 # Parse args (preserve old UX)
 HOST=${HOST:-0.0.0.0}
@@ -0,0 +1,333 @@
+"""Benchmark the transcription and summarization hot paths.
+
+Usage: python scripts/benchmark.py [--lengths 30,120,600] [--concurrency 1,2,4]
+                                   [--stages transcribe,align,diarize,summarize]
+                                   [--audio FILE ...] [--output PATH]
+
+Audio fixtures are synthesized (speech-like babble with pauses) at each
+length unless real recordings are passed with --audio. Summarization runs
+against a local stub LLM with a fixed --llm-latency unless --real-llm is set.
+For every stage, fixture and concurrency level the report has the latency
+p50/p95, real-time factor (latency per audio second), throughput and the
+process's peak RSS so far, and the whole run is written as JSON together
+with the model settings it ran under, so runs can be compared.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "notetaker.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from llama_index.core.llms.mock import MockLLM  # noqa: E402
+
+from api.services.audio import SAMPLE_RATE, load_pcm  # noqa: E402
+from api.services.summarization import NoteFormat, SummarizationService  # noqa: E402
+from api.services.transcription import TranscriptionService  # noqa: E402
+
+STAGES = ("transcribe", "align", "diarize", "summarize")
+# Typical conversational speaking rate, used to size synthetic transcripts.
+WORDS_PER_SECOND = 2.5
+SENTENCES = (
+    "The patient reports intermittent chest pain over the last two weeks.",
+    "She denies shortness of breath, fever or recent travel.",
+    "Current medications include lisinopril ten milligrams daily.",
+    "Blood pressure today is one hundred thirty over eighty five.",
+    "We discussed lifestyle changes and a follow-up visit in one month.",
+    "An ECG and basic metabolic panel will be ordered before the next visit.",
+)
+
+
+class StubLLM(MockLLM):
+    """MockLLM that waits *latency* seconds per call, standing in for a server."""
+
+    latency: float = 0.0
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> Any:
+        time.sleep(self.latency)
+        return super().complete(prompt, formatted=formatted, **kwargs)
+
+    async def acomplete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> Any:
+        await asyncio.sleep(self.latency)
+        return super().complete(prompt, formatted=formatted, **kwargs)
+
+
+# ------------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------------
+def synth_audio(seconds: float, seed: int = 0) -> np.ndarray:
+    """Speech-like babble: voiced harmonics with syllable-rate amplitude
+    modulation, broken up by short pauses so VAD produces several segments."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    pitch = 120 + 30 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    utterance = (np.sin(2 * np.pi * t / 7.0) > -0.6).astype(np.float32)
+    audio = 0.2 * voiced * syllables * utterance + 0.003 * rng.standard_normal(n)
+    return audio.astype(np.float32)
+
+
+def write_wav(path: str, audio: np.ndarray) -> None:
+    pcm = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as fh:
+        fh.setnchannels(1)
+        fh.setsampwidth(2)
+        fh.setframerate(SAMPLE_RATE)
+        fh.writeframes(pcm.tobytes())
+
+
+def synth_transcript(seconds: float) -> dict:
+    words = int(seconds * WORDS_PER_SECOND)
+    segments, count, i = [], 0, 0
+    while count < words:
+        text = SENTENCES[i % len(SENTENCES)]
+        start = count / WORDS_PER_SECOND
+        count += len(text.split())
+        segments.append(
+            {
+                "text": text,
+                "start": round(start, 2),
+                "end": round(count / WORDS_PER_SECOND, 2),
+            }
+        )
+        i += 1
+    return {"segments": segments, "language": "en"}
+
+
+# ------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def measure(
+    fn: Callable[[], Any], concurrency: int, repeats: int, audio_seconds: float
+) -> Dict[str, Any]:
+    """Run *fn* ``max(repeats, concurrency)`` times on *concurrency* threads."""
+    calls = max(repeats, concurrency)
+    latencies: List[float] = []
+
+    def timed(_: int) -> None:
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(calls)))
+    wall = time.perf_counter() - t0
+    return {
+        "concurrency": concurrency,
+        "calls": calls,
+        "p50_s": round(percentile(latencies, 50), 4),
+        "p95_s": round(percentile(latencies, 95), 4),
+        "mean_s": round(statistics.mean(latencies), 4),
+        "rtf": (
+            round(statistics.mean(latencies) / audio_seconds, 4)
+            if audio_seconds
+            else None
+        ),
+        "throughput_rps": round(calls / wall, 3),
+        "throughput_audio_x": round(calls * audio_seconds / wall, 2),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_stage(
+    name: str,
+    fn: Callable[[], Any],
+    levels: List[int],
+    repeats: int,
+    audio_seconds: float,
+) -> List[Dict[str, Any]]:
+    fn()  # warm-up: model loads and first-call overhead are not measured
+    results = []
+    for concurrency in levels:
+        row = measure(fn, concurrency, repeats, audio_seconds)
+        print(
+            f"  {name:<10} c={concurrency:<3} p50={row['p50_s']}s "
+            f"p95={row['p95_s']}s rtf={row['rtf']}",
+            file=sys.stderr,
+        )
+        results.append(row)
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--lengths", default="30,120", help="synthetic fixture lengths in seconds"
+    )
+    parser.add_argument(
+        "--audio", nargs="*", default=[], help="real recordings to use instead"
+    )
+    parser.add_argument(
+        "--concurrency", default="1,2,4", help="comma-separated concurrency levels"
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=3,
+        help="calls per level (at least the concurrency)",
+    )
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.0, help="stub LLM seconds per call"
+    )
+    parser.add_argument(
+        "--real-llm", action="store_true", help="summarize with the configured LLM"
+    )
+    parser.add_argument(
+        "--output", default=None, help="JSON path (default benchmarks/<timestamp>.json)"
+    )
+    args = parser.parse_args()
+
+    args.stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    return args
+
+
+def make_fixtures(args: argparse.Namespace, workdir: str) -> List[Dict[str, str]]:
+    """Real recordings from --audio, else synthetic ones of each --lengths."""
+    if args.audio:
+        return [{"name": os.path.basename(p), "path": p} for p in args.audio]
+    fixtures = []
+    for i, length in enumerate(float(x) for x in args.lengths.split(",") if x.strip()):
+        path = os.path.join(workdir, f"synthetic-{int(length)}s.wav")
+        write_wav(path, synth_audio(length, seed=i))
+        fixtures.append({"name": f"synthetic-{int(length)}s", "path": path})
+    return fixtures
+
+
+def run_config(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "whisper_model": settings.WHISPER_MODEL,
+        "whisper_device": settings.WHISPER_DEVICE,
+        "whisper_compute_type": settings.WHISPER_COMPUTE_TYPE,
+        "whisper_batch_size": settings.WHISPER_BATCH_SIZE,
+        "whisper_threads": settings.WHISPER_THREADS,
+        "whisper_dynamic_batching": settings.WHISPER_DYNAMIC_BATCHING,
+        "llm": "stub" if not args.real_llm else settings.LLM_MODEL,
+        "llm_latency_s": args.llm_latency if not args.real_llm else None,
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+class Bench:
+    """The services under test and the run options shared by every fixture."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.transcriber: Optional[TranscriptionService] = None
+        if {"transcribe", "align", "diarize"} & set(args.stages):
+            self.transcriber = TranscriptionService()
+        self.summarizer: Optional[SummarizationService] = None
+        if "summarize" in args.stages:
+            self.summarizer = SummarizationService()
+            if not args.real_llm:
+                self.summarizer.llm = StubLLM(max_tokens=256, latency=args.llm_latency)
+
+    def fixture(self, fixture: Dict[str, str]) -> Dict[str, Any]:
+        audio = load_pcm(fixture["path"])
+        seconds = len(audio) / SAMPLE_RATE
+        print(f"{fixture['name']} ({seconds:.1f}s)", file=sys.stderr)
+        entry: Dict[str, Any] = {
+            "name": fixture["name"],
+            "audio_seconds": round(seconds, 2),
+            "stages": {},
+        }
+        result: Optional[dict] = None
+        if self.transcriber is not None:
+            result, _ = self.transcriber.transcribe(fixture["path"])
+
+        for stage in self.args.stages:
+            fn = self.stage_fn(stage, fixture["path"], audio, result)
+            try:
+                entry["stages"][stage] = run_stage(
+                    stage, fn, self.args.concurrency, self.args.repeats, seconds
+                )
+            except Exception as exc:
+                # e.g. diarization without HF_API_KEY; keep the rest of the run.
+                entry["stages"][stage] = {"error": str(exc)}
+                print(f"  {stage:<10} failed: {exc}", file=sys.stderr)
+        return entry
+
+    def stage_fn(
+        self, stage: str, path: str, audio: np.ndarray, result: Optional[dict]
+    ) -> Callable[[], Any]:
+        if stage == "transcribe":
+            return partial(self.transcriber.transcribe, path)
+        if stage == "align":
+            return partial(self.transcriber.align_transcription, result, audio)
+        if stage == "diarize":
+            return partial(self.transcriber.perform_diarization, audio)
+        transcript = synth_transcript(len(audio) / SAMPLE_RATE)
+        return partial(self.summarizer.summarize, transcript, NoteFormat.TEXT, "en")
+
+
+def main() -> None:
+    args = parse_args()
+    workdir = tempfile.TemporaryDirectory(prefix="notetaker-bench-")
+    fixtures = make_fixtures(args, workdir.name)
+    bench = Bench(args)
+    report: Dict[str, Any] = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": run_config(args),
+        "fixtures": [bench.fixture(fixture) for fixture in fixtures],
+    }
+
+    report["peak_rss_mb"] = peak_rss_mb()
+    output = args.output or os.path.join(
+        "benchmarks", datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + ".json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"wrote {output}", file=sys.stderr)
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Compare single-call and parallel long-form transcription speed.
+
+Usage: python scripts/benchmark_longform.py path/to/audio [--workers N] [--threads T]
+
+Reports the real-time factor (processing seconds per audio second, lower is
+better) of the current single ``model.transcribe`` call against the chunked
+LongFormTranscriber on the same decoded audio.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "notetaker.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from api.services.audio import SAMPLE_RATE, iter_windows, load_pcm  # noqa: E402
+from api.services.longform import LongFormTranscriber  # noqa: E402
+from api.services.transcription import TranscriptionService  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("audio", help="audio file to transcribe")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument(
+        "--chunk-seconds", type=float, default=settings.WHISPER_LONGFORM_CHUNK_SECONDS
+    )
+    args = parser.parse_args()
+    # The shared registry is sized from these when it is first built.
+    settings.WHISPER_LONGFORM_WORKERS = args.workers
+    settings.WHISPER_LONGFORM_THREADS = args.threads or 0
+
+    audio = load_pcm(args.audio)
+    duration = len(audio) / SAMPLE_RATE
+
+    svc = TranscriptionService()
+    t0 = time.perf_counter()
+    single = svc.transcribe_audio(audio)
+    single_s = time.perf_counter() - t0
+
+    longform = LongFormTranscriber(workers=args.workers, threads=args.threads)
+    # Load replicas outside the timed region; this compares inference only.
+    for i in range(longform.workers):
+        longform._replica(i)
+    t0 = time.perf_counter()
+    parallel = longform.transcribe(
+        iter_windows([audio], args.chunk_seconds), language=single.get("language")
+    )
+    parallel_s = time.perf_counter() - t0
+
+    print(
+        json.dumps(
+            {
+                "audio_seconds": round(duration, 2),
+                "single": {
+                    "seconds": round(single_s, 2),
+                    "rtf": round(single_s / duration, 4),
+                    "segments": len(single.get("segments", [])),
+                },
+                "longform": {
+                    "workers": longform.workers,
+                    "threads": args.threads,
+                    "chunk_seconds": args.chunk_seconds,
+                    "seconds": round(parallel_s, 2),
+                    "rtf": round(parallel_s / duration, 4),
+                    "segments": len(parallel["segments"]),
+                },
+                "speedup": round(single_s / parallel_s, 2) if parallel_s else None,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Measure API cold start: time to liveness and readiness, and idle RSS.
+
+Usage: python scripts/benchmark_startup.py [--preload whisper,llm] [--runs 3]
+                                           [--port 8765] [--output PATH]
+
+Each run starts ``uvicorn notetaker.asgi:application`` in a fresh process and
+polls ``/health`` and ``/ready``. It records the seconds until each first
+returns 200, the server's RSS at both points, and which heavy packages were
+already imported when the ASGI app finished loading. ``--preload`` overrides
+MODEL_PRELOAD; pass an empty string to measure a server with no warm-up.
+To compare against an older revision, check it out and run this script
+there. Older revisions have no ``/ready``, so only the ``/health`` numbers
+apply.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("torch", "whisperx", "llama_index", "openai", "ollama")
+PROBE = (
+    "import json, os, sys, time; t0 = time.perf_counter(); "
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'notetaker.settings'); "
+    "import notetaker.asgi, notetaker.urls; "
+    "print(json.dumps({'seconds': time.perf_counter() - t0, "
+    "'loaded': [m for m in %r if m in sys.modules]}))"
+) % (HEAVY_MODULES,)
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None  # not Linux, or the process is gone
+
+
+def wait_for(url: str, deadline: float) -> Optional[float]:
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return time.monotonic()
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def one_run(port: int, env: Dict[str, str], timeout: float) -> Dict[str, Any]:
+    base = f"http://127.0.0.1:{port}/routes/v1"
+    started = time.monotonic()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "notetaker.asgi:application",
+            "--port",
+            str(port),
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + timeout
+        live = wait_for(f"{base}/health", deadline)
+        live_rss = rss_mb(server.pid)
+        ready = wait_for(f"{base}/ready", deadline) if live is not None else None
+        return {
+            "health_s": round(live - started, 3) if live is not None else None,
+            "health_rss_mb": live_rss,
+            "ready_s": round(ready - started, 3) if ready is not None else None,
+            "ready_rss_mb": rss_mb(server.pid) if ready is not None else None,
+        }
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def summarize(rows: List[Dict[str, Any]], field: str) -> Optional[float]:
+    values = [row[field] for row in rows if row[field] is not None]
+    return round(statistics.median(values), 3) if values else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--preload", default=None, help="MODEL_PRELOAD for the server under test"
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--timeout", type=float, default=600.0, help="seconds to wait per run"
+    )
+    parser.add_argument(
+        "--output", default=None, help="also write the JSON report here"
+    )
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.preload is not None:
+        env["MODEL_PRELOAD"] = args.preload
+
+    probe = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    imports = (
+        json.loads(probe.stdout)
+        if probe.returncode == 0
+        else {"error": probe.stderr[-2000:]}
+    )
+
+    rows = []
+    for i in range(args.runs):
+        row = one_run(args.port, env, args.timeout)
+        print(f"run {i + 1}: {row}", file=sys.stderr)
+        rows.append(row)
+
+    report = {
+        "model_preload": env.get("MODEL_PRELOAD"),
+        "asgi_import": imports,
+        "runs": rows,
+        "median": {
+            field: summarize(rows, field)
+            for field in ("health_s", "health_rss_mb", "ready_s", "ready_rss_mb")
+        },
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
-Fetch a model from an Ollama server if configured.
+"""Fetch a model from an Ollama server if configured."""
+
 from __future__ import annotations
 
 from ollama import Client
@@ -1,4 +1,9 @@
-Warm up whisperx models so first request is fast.
+"""Download the whisperx checkpoints ahead of time, e.g. while building an image.
+
+The server no longer runs this at startup: it warms its own models in the
+background (MODEL_PRELOAD) and keeps them resident.
+"""
+
 from __future__ import annotations
 
 import os
@@ -20,7 +25,5 @@ if __name__ == "__main__":
         language_code="en",
         device=WHISPER_DEVICE,
     )
-    _ = whisperx.DiarizationPipeline(
-        use_auth_token=HF_API_KEY, device=WHISPER_DEVICE
-    )
+    _ = whisperx.DiarizationPipeline(use_auth_token=HF_API_KEY, device=WHISPER_DEVICE)
     print("Successfully initialized transcription models.")